@@ -0,0 +1,83 @@
+import argparse
+import datetime
+import os
+import random
+import tempfile
+import time
+
+import storage_codecs
+
+# Сравнение форматов хранения на синтетическом реестре тел.
+# Пример: python benchmark_codecs.py --records 200000 --repeat 3
+
+SURNAMES = ['Иванов', 'Петров', 'Сидоров', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Соколов']
+NAMES = ['Иван Иванович', 'Петр Петрович', 'Алексей Владимирович', 'Сергей Николаевич']
+SOURCES = ['Городская больница №1', 'Полиция', 'Скорая помощь', 'Городская больница №2']
+CHAMBERS = ['Холодильная камера 1', 'Холодильная камера 2', 'Холодильная камера 3']
+STATUSES = ['поступило', 'подготовлено', 'выдано']
+
+def make_bodies(count: int):
+    """Синтетические записи в формате BodyManagement"""
+    start = datetime.datetime(2015, 1, 1)
+    bodies = []
+    for body_id in range(1, count + 1):
+        arrival = start + datetime.timedelta(minutes=body_id * 7)
+        status = random.choice(STATUSES)
+        arrival_text = arrival.strftime("%Y-%m-%d %H:%M")
+        release_text = (arrival + datetime.timedelta(days=random.randint(1, 30))).strftime("%Y-%m-%d %H:%M")
+        bodies.append({
+            "id": body_id,
+            "full_name": f"{random.choice(SURNAMES)} {random.choice(NAMES)}",
+            "arrival_date": arrival_text,
+            "source": random.choice(SOURCES),
+            "storage_location": random.choice(CHAMBERS),
+            "storage_slot": random.randint(1, 20) if status != "выдано" else None,
+            "documents": ["Направление из больницы", "Паспорт"],
+            "status": status,
+            "preparation_date": None,
+            "release_date": release_text if status == "выдано" else None,
+            "funeral_service": None,
+            "notes": "",
+            "registration_date": arrival_text,
+            "registered_by": random.randint(1, 20),
+            "history": [{"date": arrival_text, "action": "регистрация", "status": "поступило", "staff_id": 1}]
+        })
+    return bodies
+
+def measure(codec_name: str, bodies, path: str, repeat: int):
+    """Лучшее время сохранения и загрузки, размер файла"""
+    save_times = []
+    load_times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        storage_codecs.save_file(path, bodies, codec_name)
+        save_times.append(time.perf_counter() - started)
+        
+        started = time.perf_counter()
+        loaded = storage_codecs.load_file(path)
+        load_times.append(time.perf_counter() - started)
+    assert loaded == bodies, f"{codec_name}: данные после загрузки отличаются"
+    return min(save_times), min(load_times), os.path.getsize(path)
+
+def main():
+    parser = argparse.ArgumentParser(description='Сравнение форматов хранения данных')
+    parser.add_argument('--records', type=int, default=100000, help='Число записей реестра')
+    parser.add_argument('--repeat', type=int, default=3, help='Число повторов (берется лучшее время)')
+    parser.add_argument('--codecs', nargs='+', choices=list(storage_codecs.CODECS),
+                        default=list(storage_codecs.CODECS))
+    args = parser.parse_args()
+    
+    random.seed(1)
+    bodies = make_bodies(args.records)
+    print(f"Записей: {args.records}; orjson: {'да' if storage_codecs.orjson else 'нет'}, "
+          f"msgpack: {'да' if storage_codecs.msgpack else 'нет (формат недоступен, pip install msgpack)'}")
+    print(f"{'Формат':<14}{'Сохранение, с':>16}{'Загрузка, с':>14}{'Размер, МБ':>13}")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        for codec_name in args.codecs:
+            path = os.path.join(directory, f"bodies.{codec_name}")
+            save_time, load_time, size = measure(codec_name, bodies, path, args.repeat)
+            print(f"{codec_name:<14}{save_time:>16.3f}{load_time:>14.3f}{size / 1024 / 1024:>13.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+import datetime
+import math
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Графики температуры холодильных камер (Matplotlib, backend Agg).
+# Фигуры рисуются в пуле потоков без pyplot, поэтому поток интерфейса
+# не ждет отрисовки. Готовые изображения кэшируются по ключу
+# (камера, начало, конец диапазона, версия журнала проверок); показания
+# датчиков версионируются концом диапазона, округленным до RANGE_STEP_MS,
+# и попадают на график при его сдвиге. Точки проверок
+# рисуются отдельным слоем: при новой проверке восстанавливается
+# сохраненный фон осей (показания датчиков, сетка, допустимый диапазон)
+# и перерисовываются только точки (blitting), а не вся фигура.
+
+# Размер изображения: дюймы и точки на дюйм (800x360 пикселей)
+CHART_SIZE = (8.0, 3.6)
+CHART_DPI = 100
+
+# Граница диапазона округляется, чтобы ключ кэша не менялся каждую секунду
+RANGE_STEP_MS = 5 * 60 * 1000
+
+RANGES_HOURS = {
+    "24 часа": 24,
+    "7 дней": 24 * 7,
+    "30 дней": 24 * 30,
+}
+
+# Изображение: (ширина, высота, байты RGBA)
+ChartImage = Tuple[int, int, bytes]
+
+def range_bounds(hours: int, now_ms: int) -> Tuple[int, int]:
+    """Диапазон [начало, конец) в мс, заканчивающийся не раньше now_ms"""
+    end_ms = math.ceil(now_ms / RANGE_STEP_MS) * RANGE_STEP_MS
+    return end_ms - hours * 3600 * 1000, end_ms
+
+def check_time_ms(check: Dict) -> int:
+    """Время проверки в мс"""
+    return int(datetime.datetime.strptime(check["date"], "%Y-%m-%d %H:%M").timestamp() * 1000)
+
+def check_points(checks: Iterable[Dict], chamber: str, start_ms: int, end_ms: int) -> List[Tuple[int, float]]:
+    """Температура проверок камеры (и проверок всех помещений) в диапазоне"""
+    points = []
+    for check in checks:
+        if check.get("temperature") is None or check.get("chamber") not in (chamber, None):
+            continue
+        ts = check_time_ms(check)
+        if start_ms <= ts < end_ms:
+            points.append((ts, check["temperature"]))
+    return points
+
+def downsample(readings: Sequence[Tuple[int, float]], buckets: int) -> List[Tuple[int, float]]:
+    """Прореживание показаний: минимум и максимум на каждый столбец пикселей"""
+    if len(readings) <= buckets * 2:
+        return list(readings)
+    result = []
+    size = len(readings) / buckets
+    for bucket in range(buckets):
+        chunk = readings[int(bucket * size):int((bucket + 1) * size)]
+        if not chunk:
+            continue
+        low = min(chunk, key=lambda reading: reading[1])
+        high = max(chunk, key=lambda reading: reading[1])
+        result.extend(sorted({low, high}))
+    return result
+
+def to_datetimes(values: Iterable[int]) -> List[datetime.datetime]:
+    return [datetime.datetime.fromtimestamp(ts / 1000) for ts in values]
+
+class TemperatureChart:
+    """Фигура графика камеры за диапазон с отдельным слоем точек проверок"""
+    
+    def __init__(self, chamber: str, start_ms: int, end_ms: int, limits: Tuple[float, float]):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        
+        self.chamber = chamber
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.limits = limits
+        self.figure = Figure(figsize=CHART_SIZE, dpi=CHART_DPI)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.axes = self.figure.add_subplot(1, 1, 1)
+        self.readings: List[Tuple[int, float]] = []
+        self.points: List[Tuple[int, float]] = []
+        self.points_artist = None
+        self.background = None
+        # Фигура не рассчитана на одновременную отрисовку из двух потоков
+        self.lock = threading.Lock()
+    
+    def render(self, readings: Sequence[Tuple[int, float]], points: Sequence[Tuple[int, float]]) -> ChartImage:
+        """Полная отрисовка фигуры"""
+        with self.lock:
+            width = self.canvas.get_width_height()[0]
+            self.readings = downsample(readings, width)
+            self.points = list(points)
+            self.draw_static()
+            return self.draw_points()
+    
+    def add_points(self, points: Sequence[Tuple[int, float]]) -> ChartImage:
+        """Добавление точек проверок: перерисовка только слоя точек"""
+        with self.lock:
+            self.points.extend(points)
+            low, high = self.axes.get_ylim()
+            outside = any(not (self.start_ms <= ts < self.end_ms and low <= value <= high)
+                          for ts, value in points)
+            # Точка вне осей требует нового масштаба - фон рисуется заново
+            if self.background is None or outside:
+                self.draw_static()
+            return self.draw_points()
+    
+    def draw_static(self):
+        """Фон: показания датчиков, допустимый диапазон, оси; сохраняется для blitting"""
+        axes = self.axes
+        axes.clear()
+        low, high = self.limits
+        values = [value for _, value in self.readings] + [value for _, value in self.points] + [low, high]
+        margin = max(1.0, (max(values) - min(values)) * 0.1)
+        axes.set_ylim(min(values) - margin, max(values) + margin)
+        axes.set_xlim(*to_datetimes((self.start_ms, self.end_ms)))
+        axes.axhspan(low, high, color='#4CAF50', alpha=0.12, label='Допустимый диапазон')
+        if self.readings:
+            axes.plot(to_datetimes(ts for ts, _ in self.readings), [value for _, value in self.readings],
+                      color='#1f77b4', linewidth=1, label='Датчик')
+        axes.set_title(self.chamber, fontsize=11)
+        axes.set_ylabel('°C')
+        axes.grid(True, alpha=0.3)
+        self.figure.autofmt_xdate()
+        # Слой точек исключен из фона (animated) и рисуется отдельно
+        self.points_artist, = axes.plot([], [], 'o', color='#e53935', markersize=5,
+                                        animated=True, label='Проверки')
+        axes.legend(loc='upper left', fontsize=8)
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(axes.bbox)
+    
+    def draw_points(self) -> ChartImage:
+        """Восстановление фона и отрисовка слоя точек"""
+        self.canvas.restore_region(self.background)
+        self.points_artist.set_data(to_datetimes(ts for ts, _ in self.points),
+                                    [value for _, value in self.points])
+        self.axes.draw_artist(self.points_artist)
+        self.canvas.blit(self.axes.bbox)
+        width, height = self.canvas.get_width_height()
+        return width, height, bytes(self.canvas.buffer_rgba())
+
+class ChartCache:
+    """Готовые изображения и фигуры графиков с LRU-вытеснением"""
+    
+    def __init__(self, max_images: int = 32, max_charts: int = 4):
+        self.max_images = max_images
+        self.max_charts = max_charts
+        self._images = OrderedDict()
+        self._charts = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def get_image(self, key: Tuple) -> Optional[Any]:
+        with self.lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+            return image
+    
+    def put_image(self, key: Tuple, image: Any):
+        with self.lock:
+            self._images[key] = image
+            self._images.move_to_end(key)
+            while len(self._images) > self.max_images:
+                self._images.popitem(last=False)
+    
+    def chart(self, chamber: str, start_ms: int, end_ms: int,
+              limits: Tuple[float, float]) -> TemperatureChart:
+        """Фигура камеры за диапазон (создается при первом обращении)"""
+        key = (chamber, start_ms, end_ms)
+        with self.lock:
+            chart = self._charts.get(key)
+            if chart is None:
+                chart = self._charts[key] = TemperatureChart(chamber, start_ms, end_ms, limits)
+            self._charts.move_to_end(key)
+            while len(self._charts) > self.max_charts:
+                self._charts.popitem(last=False)
+            return chart
+    
+    def existing_chart(self, chamber: str, start_ms: int, end_ms: int) -> Optional[TemperatureChart]:
+        with self.lock:
+            return self._charts.get((chamber, start_ms, end_ms))
@@ -0,0 +1,177 @@
+import bisect
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Сжатие старой истории санитарных проверок. Проверки старше горизонта
+# сворачиваются в дневные итоги по типу проверки и помещению: число
+# проверок, минимум, максимум и сумма температуры, сумма оценок чистоты,
+# число нарушений и итоги по инспекторам. Нарушения сохраняются дословно
+# (с ID и датой проверки). Отчеты складывают итоги с журналом недавних
+# проверок, поэтому сжатая история обходится за O(дней), а не O(проверок).
+
+DEFAULT_HORIZON_DAYS = 90
+
+# (день ГГГГ-ММ-ДД, тип проверки, помещение)
+RollupKey = Tuple[str, str, Optional[str]]
+
+def rollup_key(record: Dict) -> RollupKey:
+    """Ключ итога для проверки или итога"""
+    return record["date"][:10], record["check_type"], record.get("chamber")
+
+def new_rollup(key: RollupKey) -> Dict:
+    """Пустой дневной итог"""
+    day, check_type, chamber = key
+    return {
+        "date": day,
+        "check_type": check_type,
+        "chamber": chamber,
+        "count": 0,
+        "temperature_count": 0,
+        "temperature_min": None,
+        "temperature_max": None,
+        "temperature_sum": 0.0,
+        "cleanliness_count": 0,
+        "cleanliness_sum": 0,
+        "violation_count": 0,
+        "last_check": None,
+        "max_check_id": 0,
+        "inspectors": [],
+        "violations": []
+    }
+
+def add_check(rollup: Dict, check: Dict):
+    """Учет проверки в дневном итоге"""
+    rollup["count"] += 1
+    
+    temperature = check.get("temperature")
+    if temperature is not None:
+        rollup["temperature_count"] += 1
+        rollup["temperature_sum"] += temperature
+        if rollup["temperature_min"] is None or temperature < rollup["temperature_min"]:
+            rollup["temperature_min"] = temperature
+        if rollup["temperature_max"] is None or temperature > rollup["temperature_max"]:
+            rollup["temperature_max"] = temperature
+    
+    cleanliness = check.get("cleanliness_score")
+    if cleanliness is not None:
+        rollup["cleanliness_count"] += 1
+        rollup["cleanliness_sum"] += cleanliness
+    
+    violations = check.get("violations", [])
+    rollup["violation_count"] += len(violations)
+    for violation in violations:
+        rollup["violations"].append(dict(violation, check_id=check["id"], check_date=check["date"]))
+    
+    if rollup["last_check"] is None or check["date"] > rollup["last_check"]:
+        rollup["last_check"] = check["date"]
+    rollup["max_check_id"] = max(rollup["max_check_id"], check["id"])
+    
+    # Итоги по инспекторам (для аналитики по сотрудникам); за день их единицы
+    inspector_id = check.get("inspector_id")
+    for entry in rollup["inspectors"]:
+        if entry["inspector_id"] == inspector_id:
+            break
+    else:
+        entry = {"inspector_id": inspector_id, "checks": 0, "cleanliness_sum": 0,
+                 "cleanliness_count": 0, "violations": 0}
+        rollup["inspectors"].append(entry)
+    entry["checks"] += 1
+    if cleanliness is not None:
+        entry["cleanliness_sum"] += cleanliness
+        entry["cleanliness_count"] += 1
+    entry["violations"] += len(violations)
+
+def mean_temperature(rollup: Dict) -> Optional[float]:
+    if not rollup["temperature_count"]:
+        return None
+    return rollup["temperature_sum"] / rollup["temperature_count"]
+
+def mean_cleanliness(rollup: Dict) -> Optional[float]:
+    if not rollup["cleanliness_count"]:
+        return None
+    return rollup["cleanliness_sum"] / rollup["cleanliness_count"]
+
+def split_checks(checks: Iterable[Dict], cutoff_date: str) -> Tuple[List[Dict], List[Dict]]:
+    """Разделение журнала: проверки ранее cutoff_date (ГГГГ-ММ-ДД) и остальные"""
+    old = []
+    recent = []
+    for check in checks:
+        (old if check["date"] < cutoff_date else recent).append(check)
+    return old, recent
+
+class CheckRollups:
+    """Дневные итоги сжатых проверок, упорядоченные по дате"""
+    
+    def __init__(self, records: Iterable[Dict] = ()):
+        self.records: List[Dict] = []
+        self.dates: List[str] = []
+        self.by_key: Dict[RollupKey, Dict] = {}
+        for record in records:
+            self.by_key[rollup_key(record)] = record
+        self.sort()
+    
+    def __len__(self):
+        return len(self.records)
+    
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self.records)
+    
+    def sort(self):
+        """Упорядочивание итогов по дате (для выборок за период)"""
+        self.records = sorted(self.by_key.values(), key=lambda record: record["date"])
+        self.dates = [record["date"] for record in self.records]
+    
+    def absorb(self, checks: Iterable[Dict]) -> int:
+        """Свертка проверок в дневные итоги, возвращает число проверок"""
+        count = 0
+        for check in checks:
+            key = rollup_key(check)
+            rollup = self.by_key.get(key)
+            if rollup is None:
+                rollup = self.by_key[key] = new_rollup(key)
+            add_check(rollup, check)
+            count += 1
+        self.sort()
+        return count
+    
+    def in_period(self, start_date: str = None, end_date: str = None) -> List[Dict]:
+        """Итоги за период (даты ГГГГ-ММ-ДД включительно) по бинарному поиску"""
+        low = bisect.bisect_left(self.dates, start_date) if start_date else 0
+        high = bisect.bisect_right(self.dates, end_date) if end_date else len(self.dates)
+        return self.records[low:high]
+    
+    def totals(self, start_date: str = None, end_date: str = None) -> Dict:
+        """Сводка по итогам за период: O(дней)"""
+        records = self.in_period(start_date, end_date)
+        summary = new_rollup(("", "", None))
+        for record in records:
+            for field in ("count", "temperature_count", "temperature_sum",
+                          "cleanliness_count", "cleanliness_sum", "violation_count"):
+                summary[field] += record[field]
+            for field, better in (("temperature_min", min), ("temperature_max", max)):
+                if record[field] is not None:
+                    summary[field] = record[field] if summary[field] is None else better(summary[field], record[field])
+        return {
+            "days": len({record["date"] for record in records}),
+            "first_date": records[0]["date"] if records else None,
+            "last_date": records[-1]["date"] if records else None,
+            "checks": summary["count"],
+            "violations": summary["violation_count"],
+            "temperature_min": summary["temperature_min"],
+            "temperature_max": summary["temperature_max"],
+            "mean_temperature": mean_temperature(summary),
+            "mean_cleanliness": mean_cleanliness(summary)
+        }
+    
+    def covers(self, date: str) -> bool:
+        """Дата не позже последнего сжатого дня (проверка относится к сжатой истории)"""
+        return bool(self.dates) and date[:10] <= self.dates[-1]
+    
+    def max_check_id(self) -> int:
+        """Наибольший ID сжатой проверки (ID не используются повторно)"""
+        return max((record["max_check_id"] for record in self.records), default=0)
+    
+    def latest_checks(self) -> Iterator[Dict]:
+        """Последняя проверка каждого итога - для построения графика проверок"""
+        for record in self.records:
+            yield {"check_type": record["check_type"], "chamber": record["chamber"],
+                   "date": record["last_check"]}
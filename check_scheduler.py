@@ -0,0 +1,135 @@
+import heapq
+import itertools
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from date_columns import NO_DATE, format_date, parse_date
+
+# График санитарных проверок. Для каждого правила (тип проверки + камера)
+# хранится срок следующей проверки, а ближайшие напоминания лежат в куче,
+# поэтому таймеру интерфейса достаточно одного ожидания до вершины кучи.
+# Время везде в минутах (см. date_columns.parse_date).
+
+# Повторное напоминание о просроченной проверке
+REMINDER_INTERVAL_MINUTES = 60
+
+DEFAULT_RULES = [
+    {"check_type": "Ежедневная", "chamber": "Холодильная камера 1", "interval_hours": 24},
+    {"check_type": "Ежедневная", "chamber": "Холодильная камера 2", "interval_hours": 24},
+    {"check_type": "Ежедневная", "chamber": "Холодильная камера 3", "interval_hours": 24},
+    {"check_type": "Еженедельная", "chamber": None, "interval_hours": 24 * 7},
+]
+
+RuleKey = Tuple[str, Optional[str]]
+
+class CheckScheduler:
+    """Планировщик санитарных проверок на основе кучи сроков"""
+    
+    def __init__(self, data_file="check_schedule.json"):
+        self.data_file = data_file
+        self.rules = self.load_data()
+        self.intervals: Dict[RuleKey, int] = {
+            (rule["check_type"], rule["chamber"]): rule["interval_hours"] * 60 for rule in self.rules
+        }
+        self.last_check: Dict[RuleKey, int] = {}
+        self.due: Dict[RuleKey, int] = {}
+        # Время ближайшего оповещения по правилу; записи кучи, не совпадающие
+        # с этим значением, устарели и пропускаются
+        self.alert_at: Dict[RuleKey, int] = {}
+        # Порядковый номер разрешает равенство сроков без сравнения ключей
+        self.heap: List[Tuple[int, int, RuleKey]] = []
+        self.sequence = itertools.count()
+    
+    def load_data(self) -> List[Dict]:
+        """Загрузка правил (при первом запуске - значения по умолчанию)"""
+        if os.path.exists(self.data_file):
+            with open(self.data_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        rules = [dict(rule) for rule in DEFAULT_RULES]
+        with open(self.data_file, 'w', encoding='utf-8') as f:
+            json.dump(rules, f, ensure_ascii=False, indent=2)
+        return rules
+    
+    def matching_rules(self, check_type: str, chamber: Optional[str]) -> List[RuleKey]:
+        """Правила, которые закрывает проверка (проверка без камеры - все камеры)"""
+        return [key for key in self.intervals
+                if key[0] == check_type and (chamber is None or key[1] is None or key[1] == chamber)]
+    
+    def rebuild(self, checks: Iterable[Dict], now: int):
+        """Построение графика по журналу проверок: O(n) проход и O(n log n) куча"""
+        latest: Dict[Tuple[str, Optional[str]], int] = {}
+        for check in checks:
+            key = (check["check_type"], check.get("chamber"))
+            date = parse_date(check["date"])
+            if date > latest.get(key, NO_DATE):
+                latest[key] = date
+        
+        self.last_check = {}
+        for (check_type, chamber), date in latest.items():
+            for key in self.matching_rules(check_type, chamber):
+                if date > self.last_check.get(key, NO_DATE):
+                    self.last_check[key] = date
+        
+        self.due = {}
+        self.alert_at = {}
+        self.heap = []
+        for key, interval in self.intervals.items():
+            last = self.last_check.get(key)
+            # Правило без единой проверки считается просроченным сразу
+            self.due[key] = last + interval if last is not None else now
+            self.alert_at[key] = self.due[key]
+            self.heap.append((self.due[key], next(self.sequence), key))
+        heapq.heapify(self.heap)
+    
+    def schedule(self, key: RuleKey, alert_time: int):
+        """Постановка оповещения по правилу в кучу"""
+        self.alert_at[key] = alert_time
+        heapq.heappush(self.heap, (alert_time, next(self.sequence), key))
+    
+    def on_check_recorded(self, check: Dict):
+        """Сдвиг сроков правил после новой проверки"""
+        date = parse_date(check["date"])
+        for key in self.matching_rules(check["check_type"], check.get("chamber")):
+            self.last_check[key] = date
+            self.due[key] = date + self.intervals[key]
+            self.schedule(key, self.due[key])
+    
+    def next_alert_time(self) -> Optional[int]:
+        """Время ближайшего оповещения (вершина кучи без устаревших записей)"""
+        while self.heap:
+            alert_time, _, key = self.heap[0]
+            if self.alert_at.get(key) == alert_time:
+                return alert_time
+            heapq.heappop(self.heap)
+        return None
+    
+    def pop_overdue(self, now: int) -> List[Dict]:
+        """Снятие наступивших оповещений и планирование повторных"""
+        overdue = []
+        while self.heap and self.heap[0][0] <= now:
+            alert_time, _, key = heapq.heappop(self.heap)
+            if self.alert_at.get(key) != alert_time:
+                continue
+            overdue.append({
+                "check_type": key[0],
+                "chamber": key[1],
+                "due": self.due[key],
+                "last_check": self.last_check.get(key)
+            })
+            self.schedule(key, now + REMINDER_INTERVAL_MINUTES)
+        return overdue
+    
+    def schedule_rows(self) -> List[Dict]:
+        """График проверок, упорядоченный по сроку"""
+        rows = []
+        for key in sorted(self.due, key=lambda item: self.due[item]):
+            last = self.last_check.get(key)
+            rows.append({
+                "check_type": key[0],
+                "chamber": key[1],
+                "due": format_date(self.due[key], with_time=True),
+                "due_minutes": self.due[key],
+                "last_check": format_date(last, with_time=True) if last is not None else None
+            })
+        return rows
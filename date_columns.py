@@ -0,0 +1,170 @@
+import bisect
+import datetime
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Даты в данных хранятся строками "ГГГГ-ММ-ДД" или "ГГГГ-ММ-ДД ЧЧ:ММ".
+# Для отчетов они один раз разбираются в целые числа - минуты от
+# 0001-01-01 - и хранятся в колонках array('q'), выровненных по
+# позициям записей в списке менеджера. Для выбранных полей поддерживаются
+# отсортированные индексы, по которым выборка за период делается бисекцией.
+
+NO_DATE = -1
+MINUTES_PER_DAY = 24 * 60
+
+BODY_DATE_FIELDS = ("arrival_date", "registration_date", "preparation_date", "release_date")
+BODY_INDEXED_FIELDS = ("arrival_date", "registration_date", "release_date")
+CHECK_DATE_FIELDS = ("date",)
+CHECK_INDEXED_FIELDS = ("date",)
+
+def parse_date(value: Optional[str]) -> int:
+    """Строка даты в минуты от начала летоисчисления (NO_DATE, если даты нет)"""
+    if not value:
+        return NO_DATE
+    try:
+        day = datetime.date(int(value[0:4]), int(value[5:7]), int(value[8:10])).toordinal()
+        minutes = 0
+        if len(value) >= 16:
+            minutes = int(value[11:13]) * 60 + int(value[14:16])
+    except (ValueError, IndexError):
+        return NO_DATE
+    return day * MINUTES_PER_DAY + minutes
+
+def format_date(minutes: int, with_time: bool = False) -> str:
+    """Минуты обратно в строку даты"""
+    if minutes == NO_DATE:
+        return ""
+    day = datetime.date.fromordinal(minutes // MINUTES_PER_DAY)
+    if not with_time:
+        return day.strftime("%Y-%m-%d")
+    rest = minutes % MINUTES_PER_DAY
+    return f"{day.strftime('%Y-%m-%d')} {rest // 60:02d}:{rest % 60:02d}"
+
+def day_of(minutes: int) -> int:
+    """Порядковый номер дня для значения колонки"""
+    return minutes // MINUTES_PER_DAY
+
+def period_bounds(start_date: str, end_date: str):
+    """Полуинтервал [начало, конец) в минутах для дат периода включительно"""
+    start = parse_date(start_date[:10])
+    end = parse_date(end_date[:10])
+    if start == NO_DATE or end == NO_DATE:
+        return None
+    return start, end + MINUTES_PER_DAY
+
+class SortedDateIndex:
+    """Отсортированный индекс дат: пары (дата, позиция записи)
+    
+    Пары упорядочены по дате, а записи с одинаковой датой - по позиции:
+    на этом порядке основано продолжение постраничного обхода (pagination).
+    """
+    
+    def __init__(self):
+        self.keys: List[int] = []
+        self.positions: List[int] = []
+    
+    def __len__(self):
+        return len(self.keys)
+    
+    def build(self, column: array):
+        """Построение индекса по колонке (O(n log n))"""
+        pairs = sorted((value, position) for position, value in enumerate(column) if value != NO_DATE)
+        self.keys = [value for value, _ in pairs]
+        self.positions = [position for _, position in pairs]
+    
+    def add(self, value: int, position: int):
+        """Добавление записи; новые даты обычно попадают в конец за O(1)"""
+        if value == NO_DATE:
+            return
+        if not self.keys or (value, position) > (self.keys[-1], self.positions[-1]):
+            self.keys.append(value)
+            self.positions.append(position)
+            return
+        low, high = self.run(value)
+        index = bisect.bisect_right(self.positions, position, low, high)
+        self.keys.insert(index, value)
+        self.positions.insert(index, position)
+    
+    def remove(self, value: int, position: int):
+        """Удаление записи из индекса"""
+        if value == NO_DATE:
+            return
+        low, high = self.run(value)
+        index = bisect.bisect_left(self.positions, position, low, high)
+        if index < high and self.positions[index] == position:
+            del self.keys[index]
+            del self.positions[index]
+    
+    def run(self, value: int) -> Tuple[int, int]:
+        """Границы [low, high) пар с датой value (позиции внутри упорядочены)"""
+        return bisect.bisect_left(self.keys, value), bisect.bisect_right(self.keys, value)
+    
+    def range(self, start: int, end: int) -> List[int]:
+        """Позиции записей с датой в полуинтервале [start, end) за O(log n + k)"""
+        low = bisect.bisect_left(self.keys, start)
+        high = bisect.bisect_left(self.keys, end)
+        return self.positions[low:high]
+    
+    def count(self, start: int, end: int) -> int:
+        """Количество записей в полуинтервале за O(log n)"""
+        return bisect.bisect_left(self.keys, end) - bisect.bisect_left(self.keys, start)
+
+class DateColumns:
+    """Колонки разобранных дат для списка записей"""
+    
+    def __init__(self, fields: Sequence[str], indexed_fields: Sequence[str] = ()):
+        self.fields = tuple(fields)
+        self.columns: Dict[str, array] = {field: array('q') for field in self.fields}
+        self.indexes: Dict[str, SortedDateIndex] = {field: SortedDateIndex() for field in indexed_fields}
+    
+    def __len__(self):
+        return len(self.columns[self.fields[0]]) if self.fields else 0
+    
+    def rebuild(self, records: Iterable[Dict]):
+        """Разбор всех дат при загрузке данных"""
+        self.columns = {field: array('q') for field in self.fields}
+        for record in records:
+            for field in self.fields:
+                self.columns[field].append(parse_date(record.get(field)))
+        for field, index in self.indexes.items():
+            index.build(self.columns[field])
+    
+    def append(self, record: Dict):
+        """Добавление дат новой записи"""
+        position = len(self)
+        for field in self.fields:
+            value = parse_date(record.get(field))
+            self.columns[field].append(value)
+            if field in self.indexes:
+                self.indexes[field].add(value, position)
+    
+    def update(self, index: int, record: Dict):
+        """Обновление дат записи после изменения"""
+        for field in self.fields:
+            old_value = self.columns[field][index]
+            value = parse_date(record.get(field))
+            if value == old_value:
+                continue
+            self.columns[field][index] = value
+            if field in self.indexes:
+                self.indexes[field].remove(old_value, index)
+                self.indexes[field].add(value, index)
+    
+    def column(self, field: str) -> array:
+        """Колонка значений для поля"""
+        return self.columns[field]
+    
+    def snapshot(self, fields: Sequence[str] = None) -> Dict[str, array]:
+        """Копии колонок для фоновых расчетов (копирование массива целых без разбора дат)"""
+        return {field: array('q', self.columns[field]) for field in (fields or self.fields)}
+    
+    def positions_in_period(self, field: str, start_date: str, end_date: str) -> List[int]:
+        """Позиции записей с датой поля в периоде (даты включительно)"""
+        bounds = period_bounds(start_date, end_date)
+        if bounds is None:
+            return []
+        return self.indexes[field].range(*bounds)
+    
+    def values(self, index: int) -> List[int]:
+        """Все даты одной записи"""
+        return [self.columns[field][index] for field in self.fields]
@@ -0,0 +1,156 @@
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Электронный архив документов (сканы, фотографии, сформированные акты).
+# Файлы хранятся по SHA-256 содержимого: objects/ab/abcdef..., поэтому
+# одинаковые сканы хранятся один раз, а каталоги не разрастаются до
+# сотен тысяч файлов. Метаданные вложений индексированы по ID тела.
+# Миниатюры создаются при первом просмотре и кэшируются на диске
+# (thumbs/) и в памяти (ThumbnailCache с LRU-вытеснением).
+
+HASH_CHUNK_SIZE = 1024 * 1024
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tif', '.tiff'}
+THUMBNAIL_SIZE = 96
+
+class DocumentArchive:
+    """Хранилище вложений с адресацией по содержимому"""
+    
+    def __init__(self, root: str = "archive"):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.thumbs_dir = os.path.join(root, "thumbs")
+        self.index_file = os.path.join(root, "index.json")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        
+        # ID тела -> список вложений; число ссылок на каждый объект
+        self.by_body: Dict[int, List[Dict]] = self.load_index()
+        self.references = Counter(
+            entry["sha256"] for entries in self.by_body.values() for entry in entries
+        )
+    
+    def load_index(self) -> Dict[int, List[Dict]]:
+        if os.path.exists(self.index_file):
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                return {int(body_id): entries for body_id, entries in json.load(f).items()}
+        return {}
+    
+    def save_index(self):
+        """Запись индекса через временный файл (без порчи при сбое)"""
+        fd, temp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self.by_body, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.index_file)
+    
+    def object_path(self, digest: str) -> str:
+        """Путь объекта: первые два символа хэша - подкаталог"""
+        return os.path.join(self.objects_dir, digest[:2], digest)
+    
+    def thumbnail_path(self, digest: str, size: int = THUMBNAIL_SIZE) -> str:
+        """Путь миниатюры объекта"""
+        return os.path.join(self.thumbs_dir, digest[:2], f"{digest}_{size}.png")
+    
+    def store(self, source_path: str) -> str:
+        """Сохранение файла в хранилище, возвращает SHA-256
+        
+        Файл читается один раз: хэш считается во время копирования во
+        временный файл, который затем переименовывается в объект.
+        Если такой объект уже есть, копия удаляется.
+        """
+        fd, temp_path = tempfile.mkstemp(dir=self.objects_dir, suffix='.tmp')
+        digest = hashlib.sha256()
+        try:
+            with open(source_path, 'rb') as source, os.fdopen(fd, 'wb') as target:
+                while True:
+                    block = source.read(HASH_CHUNK_SIZE)
+                    if not block:
+                        break
+                    digest.update(block)
+                    target.write(block)
+            
+            sha256 = digest.hexdigest()
+            path = self.object_path(sha256)
+            if os.path.exists(path):
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return sha256
+    
+    def attach(self, body_id: int, source_path: str, title: str = None,
+               staff_id: Optional[int] = None) -> Dict:
+        """Прикрепление файла к телу"""
+        sha256 = self.store(source_path)
+        name = os.path.basename(source_path)
+        entry = {
+            "sha256": sha256,
+            "name": name,
+            "title": title or os.path.splitext(name)[0],
+            "size": os.path.getsize(self.object_path(sha256)),
+            "added": datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
+            "added_by": staff_id
+        }
+        self.by_body.setdefault(body_id, []).append(entry)
+        self.references[sha256] += 1
+        self.save_index()
+        return entry
+    
+    def detach(self, body_id: int, sha256: str) -> bool:
+        """Удаление вложения тела; объект удаляется, когда на него нет ссылок"""
+        entries = self.by_body.get(body_id, [])
+        for index, entry in enumerate(entries):
+            if entry["sha256"] == sha256:
+                del entries[index]
+                break
+        else:
+            return False
+        
+        self.references[sha256] -= 1
+        if self.references[sha256] <= 0:
+            del self.references[sha256]
+            for path in (self.object_path(sha256), self.thumbnail_path(sha256)):
+                if os.path.exists(path):
+                    os.remove(path)
+        self.save_index()
+        return True
+    
+    def attachments(self, body_id: int) -> List[Dict]:
+        """Вложения тела"""
+        return list(self.by_body.get(body_id, []))
+    
+    def export(self, sha256: str, target_path: str):
+        """Копия объекта под исходным именем (для открытия и печати)"""
+        shutil.copyfile(self.object_path(sha256), target_path)
+    
+    @staticmethod
+    def is_image(entry: Dict) -> bool:
+        """Есть ли у вложения миниатюра"""
+        return os.path.splitext(entry["name"])[1].lower() in IMAGE_EXTENSIONS
+
+class ThumbnailCache:
+    """Миниатюры в памяти с вытеснением давно не показанных (LRU)"""
+    
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+    
+    def get(self, key: str) -> Optional[Any]:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+    
+    def put(self, key: str, value: Any):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
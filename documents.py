@@ -0,0 +1,196 @@
+import datetime
+import os
+import re
+import string
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+import report_engine
+from report_export import format_cell, get_pdf_font
+
+# Генерация документов по шаблонам: акт приема-передачи тела,
+# судебно-медицинское заключение и акт выдачи тела.
+# Шаблон - текст с полями вида {body.full_name}; первая строка - заголовок.
+# Шаблоны можно переопределить файлами <вид>.txt в каталоге templates.
+# Разобранный шаблон кэшируется, шрифт и стили PDF создаются один раз
+# на процесс, поэтому пакетная генерация в пуле процессов не повторяет
+# разбор и регистрацию шрифтов для каждого документа.
+
+TEMPLATE_DIR = "templates"
+
+DOCUMENT_KINDS = {
+    "acceptance": "Акт приема-передачи",
+    "conclusion": "Судебно-медицинское заключение",
+    "release": "Акт выдачи",
+}
+
+DEFAULT_TEMPLATES = {
+    "acceptance": """АКТ ПРИЕМА-ПЕРЕДАЧИ ТЕЛА № {number}
+Дата составления: {date}
+
+ФИО умершего: {body.full_name}
+Дата и время поступления: {body.arrival_date}
+Источник поступления: {body.source}
+Место хранения: {body.storage_place}
+Принятые документы: {body.documents}
+
+Тело принял: {staff.full_name}, {staff.position}
+Подпись: ____________________""",
+
+    "conclusion": """СУДЕБНО-МЕДИЦИНСКОЕ ЗАКЛЮЧЕНИЕ № {number}
+Дата составления: {date}
+
+ФИО умершего: {body.full_name}
+Дата поступления: {body.arrival_date}
+Источник поступления: {body.source}
+Дата подготовки тела: {body.preparation_date}
+
+Результаты исследования:
+{body.notes}
+
+Эксперт: {staff.full_name}, {staff.position}
+Подпись: ____________________""",
+
+    "release": """АКТ ВЫДАЧИ ТЕЛА № {number}
+Дата составления: {date}
+
+ФИО умершего: {body.full_name}
+Дата поступления: {body.arrival_date}
+Дата выдачи: {body.release_date}
+
+Ритуальная служба: {coordination.service_name}
+Представитель: {coordination.contact_person}, тел. {coordination.contact_phone}
+Запланированная дата: {coordination.planned_date}
+Предъявленные документы: {coordination.documents_provided}
+
+Тело выдал: {staff.full_name}, {staff.position}
+Подпись выдавшего: ____________________
+Подпись получателя: ____________________""",
+}
+
+# Разобранный шаблон: (текст, путь поля или None, формат)
+CompiledTemplate = Tuple[Tuple[str, Optional[Tuple[str, ...]], str], ...]
+
+# Значение незаполненного поля
+MISSING_VALUE = "—"
+
+@lru_cache(maxsize=64)
+def compile_template(text: str) -> CompiledTemplate:
+    """Разбор шаблона в последовательность фрагментов (с кэшированием)"""
+    parts = []
+    for literal, field_name, format_spec, _ in string.Formatter().parse(text):
+        path = tuple(field_name.split('.')) if field_name else None
+        parts.append((literal, path, format_spec or ""))
+    return tuple(parts)
+
+def load_template(kind: str, template_dir: str = TEMPLATE_DIR) -> str:
+    """Текст шаблона: файл из каталога шаблонов или шаблон по умолчанию"""
+    path = os.path.join(template_dir, f"{kind}.txt")
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    return DEFAULT_TEMPLATES[kind]
+
+def resolve(context: Dict, path: Tuple[str, ...]):
+    """Значение поля по пути вида ('body', 'full_name')"""
+    value = context
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+def render(compiled: CompiledTemplate, context: Dict) -> str:
+    """Подстановка данных в разобранный шаблон"""
+    chunks = []
+    for literal, path, format_spec in compiled:
+        chunks.append(literal)
+        if path is None:
+            continue
+        value = resolve(context, path)
+        if value is None or value == "" or value == []:
+            chunks.append(MISSING_VALUE)
+        elif format_spec:
+            chunks.append(format(value, format_spec))
+        else:
+            chunks.append(format_cell(value))
+    return "".join(chunks)
+
+def render_document(kind: str, context: Dict, template_dir: str = TEMPLATE_DIR) -> str:
+    """Текст документа указанного вида"""
+    return render(compile_template(load_template(kind, template_dir)), context)
+
+def responsible_staff_id(kind: str, body: Dict) -> Optional[int]:
+    """Сотрудник, подписывающий документ: принявший, подготовивший или выдавший тело"""
+    if kind == "acceptance":
+        return body.get("registered_by")
+    status = "подготовлено" if kind == "conclusion" else "выдано"
+    for operation in reversed(body.get("history", [])):
+        if operation.get("status") == status:
+            return operation.get("staff_id")
+    return None
+
+def document_context(kind: str,
+                     body: Dict,
+                     coordination: Optional[Dict] = None,
+                     staff: Optional[Dict] = None,
+                     storage_place: str = None) -> Dict:
+    """Данные для подстановки в шаблон (только словари - передаются в процессы пула)"""
+    prefix = {"acceptance": "АП", "conclusion": "СМЗ", "release": "АВ"}[kind]
+    return {
+        "number": f"{prefix}-{body['id']}",
+        "date": datetime.datetime.now().strftime("%Y-%m-%d"),
+        "body": dict(body, storage_place=storage_place or body.get("storage_location")),
+        "coordination": coordination or {},
+        "staff": staff or {},
+    }
+
+def document_file_name(kind: str, body: Dict) -> str:
+    """Имя файла документа"""
+    name = f"{DOCUMENT_KINDS[kind]}_ID{body['id']}_{body['full_name']}"
+    return re.sub(r'[^\w.-]+', '_', name).strip('_') + '.pdf'
+
+@lru_cache(maxsize=1)
+def _pdf_styles():
+    """Стили документа с кириллическим шрифтом (один раз на процесс)"""
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    
+    font_name = get_pdf_font()
+    sample = getSampleStyleSheet()
+    title_style = ParagraphStyle('DocumentTitle', parent=sample['Title'], fontName=font_name, fontSize=14)
+    body_style = ParagraphStyle('DocumentBody', parent=sample['Normal'], fontName=font_name,
+                                fontSize=11, leading=16)
+    return title_style, body_style
+
+def write_pdf(path: str, text: str):
+    """Запись текста документа в PDF (первая строка - заголовок)"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+    
+    title_style, body_style = _pdf_styles()
+    lines = text.split('\n')
+    flowables = [Paragraph(escape(lines[0]), title_style), Spacer(1, 12)]
+    for line in lines[1:]:
+        if line.strip():
+            flowables.append(Paragraph(escape(line), body_style))
+        else:
+            flowables.append(Spacer(1, 8))
+    
+    doc = SimpleDocTemplate(path, pagesize=A4, title=lines[0],
+                            leftMargin=50, rightMargin=50, topMargin=50, bottomMargin=50)
+    doc.build(flowables)
+
+def write_document(kind: str, context: Dict, path: str, template_dir: str = TEMPLATE_DIR) -> str:
+    """Формирование одного документа (вызывается и в процессах пула)"""
+    write_pdf(path, render_document(kind, context, template_dir))
+    return path
+
+# Число документов, начиная с которого пакет формируется в пуле процессов
+BATCH_PARALLEL_THRESHOLD = 8
+
+def generate_batch(jobs: Sequence[Tuple[str, Dict, str]], template_dir: str = TEMPLATE_DIR) -> List[str]:
+    """Пакетное формирование документов: задания (вид, данные, путь)"""
+    parallel = len(jobs) >= BATCH_PARALLEL_THRESHOLD and (os.cpu_count() or 1) > 1
+    partitions = [(kind, context, path, template_dir) for kind, context, path in jobs]
+    return report_engine.map_reduce(write_document, partitions, list, parallel)
@@ -0,0 +1,106 @@
+import difflib
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from date_columns import NO_DATE, day_of, parse_date
+
+# Поиск возможных дубликатов тел (один человек, поступивший, например,
+# и из больницы, и из полиции). Полное попарное сравнение реестра - O(n²),
+# поэтому записи раскладываются по блокам: нормализованная фамилия + день
+# поступления, а также имя и отчество + день (на случай опечатки в фамилии).
+# Кандидаты берутся только из блоков в окне ±window_days дней и сравниваются
+# по схожести ФИО (difflib).
+
+DEFAULT_WINDOW_DAYS = 3
+DEFAULT_THRESHOLD = 0.85
+
+def normalize_name(full_name: str) -> str:
+    """ФИО в нижнем регистре, ё -> е, без знаков препинания"""
+    text = full_name.lower().replace('ё', 'е')
+    return ' '.join(re.sub(r'[^\w\s-]', ' ', text).split())
+
+def blocking_names(normalized: str) -> List[str]:
+    """Ключи блоков по имени: фамилия и (если есть) имя с отчеством"""
+    parts = normalized.split()
+    if not parts:
+        return []
+    keys = ['s:' + parts[0]]
+    if len(parts) >= 3:
+        keys.append('n:' + ' '.join(parts[1:]))
+    return keys
+
+class DuplicateDetector:
+    """Индекс блоков для поиска похожих записей тел"""
+    
+    def __init__(self, window_days: int = DEFAULT_WINDOW_DAYS, threshold: float = DEFAULT_THRESHOLD):
+        self.window_days = window_days
+        self.threshold = threshold
+        # (ключ имени, день поступления) -> ID тел
+        self.blocks: Dict[Tuple[str, int], List[int]] = {}
+        self.names: Dict[int, str] = {}
+    
+    def rebuild(self, bodies: Iterable[Dict]):
+        """Построение индекса по реестру: O(n)"""
+        self.blocks = {}
+        self.names = {}
+        for body in bodies:
+            self.add(body)
+    
+    def add(self, body: Dict):
+        """Добавление тела в индекс"""
+        normalized = normalize_name(body["full_name"])
+        self.names[body["id"]] = normalized
+        day = self.arrival_day(body.get("arrival_date"))
+        for key in blocking_names(normalized):
+            self.blocks.setdefault((key, day), []).append(body["id"])
+    
+    @staticmethod
+    def arrival_day(arrival_date: Optional[str]) -> int:
+        """День поступления (NO_DATE - дата не указана или не разобрана)"""
+        minutes = parse_date(arrival_date)
+        return NO_DATE if minutes == NO_DATE else day_of(minutes)
+    
+    def candidates(self, full_name: str, arrival_date: Optional[str],
+                   exclude_id: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Похожие тела: список (ID, схожесть) по убыванию схожести"""
+        normalized = normalize_name(full_name)
+        day = self.arrival_day(arrival_date)
+        days = [NO_DATE] if day == NO_DATE else range(day - self.window_days, day + self.window_days + 1)
+        
+        seen = set()
+        # Схожесть считается один раз на различное ФИО в блоках
+        scores = {normalized: 1.0}
+        matcher = difflib.SequenceMatcher(None, '', normalized)
+        result = []
+        for key in blocking_names(normalized):
+            for candidate_day in days:
+                for body_id in self.blocks.get((key, candidate_day), ()):
+                    if body_id in seen or body_id == exclude_id:
+                        continue
+                    seen.add(body_id)
+                    other = self.names[body_id]
+                    score = scores.get(other)
+                    if score is None:
+                        score = scores[other] = self.similarity(matcher, other)
+                    if score >= self.threshold:
+                        result.append((body_id, score))
+        result.sort(key=lambda item: (-item[1], item[0]))
+        return result
+    
+    def similarity(self, matcher: difflib.SequenceMatcher, other: str) -> float:
+        """Схожесть ФИО с быстрым отсевом по верхним оценкам difflib"""
+        # SequenceMatcher кэширует разбор второй строки,
+        # поэтому искомое ФИО задано как seq2, а кандидат - как seq1
+        matcher.set_seq1(other)
+        if matcher.real_quick_ratio() < self.threshold or matcher.quick_ratio() < self.threshold:
+            return 0.0
+        return matcher.ratio()
+    
+    def duplicate_pairs(self, bodies: Iterable[Dict]) -> List[Tuple[int, int, float]]:
+        """Все пары возможных дубликатов (ID меньшего, ID большего, схожесть)"""
+        pairs = []
+        for body in bodies:
+            for other_id, score in self.candidates(body["full_name"], body.get("arrival_date"), body["id"]):
+                if other_id > body["id"]:
+                    pairs.append((body["id"], other_id, score))
+        return pairs
@@ -1,31 +1,226 @@
 import sys
+import itertools
 import json
+import multiprocessing
 import datetime
 import os
+import tempfile
+from array import array
 from typing import Dict, List, Optional
 from PyQt5.QtWidgets import *
 from PyQt5.QtCore import *
 from PyQt5.QtGui import *
 
+import charts
+import check_rollups
+import documents
+import pagination
+import report_engine
+import report_export
+import replication
+import reports
+import sites
+import storage_codecs
+import ui_watchdog
+from check_scheduler import CheckScheduler
+from document_archive import THUMBNAIL_SIZE, DocumentArchive, ThumbnailCache
+from duplicates import DuplicateDetector
+from staff_analytics import StaffAnalytics
+from telemetry import DEFAULT_LIMITS, TelemetryIngestService, TelemetryStore
+from date_columns import (BODY_DATE_FIELDS, BODY_INDEXED_FIELDS, CHECK_DATE_FIELDS,
+                          CHECK_INDEXED_FIELDS, MINUTES_PER_DAY, DateColumns, format_date,
+                          parse_date)
+from release_calendar import (ACTIVE_STATUS, COMPLETED_STATUS, DEFAULT_DAILY_CAPACITY, STATUSES,
+                              ReleaseCalendar, outstanding_documents, release_day)
+from report_cache import ReportCache
+from shifts import ShiftSchedule, format_interval
+from snapshots import SnapshotStore
+
 # Классы для работы с данными (остаются без изменений)
+class StorageRegistry:
+    """Класс для учета мест хранения в холодильных камерах"""
+    
+    DEFAULT_CHAMBERS = [
+        {"name": "Холодильная камера 1", "capacity": 20},
+        {"name": "Холодильная камера 2", "capacity": 20},
+        {"name": "Холодильная камера 3", "capacity": 20},
+        {"name": "Временное хранение", "capacity": 10},
+    ]
+    
+    def __init__(self, data_file="storage.json", codec: str = storage_codecs.DEFAULT_CODEC):
+        self.data_file = data_file
+        self.codec = codec
+        self.chambers = self.load_data()
+        
+        # Занятость ячеек: битовая маска на камеру (бит N - ячейка N+1),
+        # число занятых ячеек и владельцы ячеек
+        self.occupancy = {chamber["name"]: 0 for chamber in self.chambers}
+        self.occupied_count = {chamber["name"]: 0 for chamber in self.chambers}
+        self.slot_owners = {chamber["name"]: {} for chamber in self.chambers}
+        self.capacities = {chamber["name"]: chamber["capacity"] for chamber in self.chambers}
+    
+    def load_data(self) -> List[Dict]:
+        """Загрузка списка камер (при первом запуске - значения по умолчанию)"""
+        chambers = storage_codecs.load_file(self.data_file)
+        if chambers is not None:
+            return chambers
+        chambers = [dict(chamber) for chamber in self.DEFAULT_CHAMBERS]
+        self.save_data(chambers)
+        return chambers
+    
+    def save_data(self, chambers: List[Dict] = None):
+        storage_codecs.save_file(self.data_file, chambers if chambers is not None else self.chambers,
+                                 self.codec)
+    
+    def chamber_names(self) -> List[str]:
+        """Названия камер в порядке конфигурации"""
+        return [chamber["name"] for chamber in self.chambers]
+    
+    def rebuild(self, bodies: List[Dict]):
+        """Восстановление занятости по списку тел (один проход при загрузке)"""
+        for name in self.occupancy:
+            self.occupancy[name] = 0
+            self.occupied_count[name] = 0
+            self.slot_owners[name] = {}
+        
+        # Сначала занимаем сохраненные ячейки, затем раздаем свободные
+        # телам, зарегистрированным до появления учета ячеек
+        unassigned = []
+        for body in bodies:
+            chamber = body.get("storage_location")
+            if body.get("status") == "выдано" or chamber not in self.occupancy:
+                continue
+            slot = body.get("storage_slot")
+            if slot and self.is_free(chamber, slot):
+                self.occupy(chamber, slot, body["id"])
+            else:
+                unassigned.append(body)
+        
+        for body in unassigned:
+            body["storage_slot"] = self.allocate(body["storage_location"], body["id"])
+    
+    def first_free_slot(self, chamber: str) -> Optional[int]:
+        """Ближайшая свободная ячейка камеры (нумерация с 1)"""
+        mask = self.occupancy[chamber]
+        # Младший нулевой бит маски - первая свободная ячейка
+        index = (~mask & (mask + 1)).bit_length() - 1
+        if index >= self.capacities[chamber]:
+            return None
+        return index + 1
+    
+    def is_free(self, chamber: str, slot: int) -> bool:
+        """Проверка, свободна ли ячейка"""
+        if chamber not in self.occupancy or not 1 <= slot <= self.capacities[chamber]:
+            return False
+        return not self.occupancy[chamber] >> (slot - 1) & 1
+    
+    def occupy(self, chamber: str, slot: int, body_id: int):
+        """Занятие конкретной ячейки"""
+        self.occupancy[chamber] |= 1 << (slot - 1)
+        self.occupied_count[chamber] += 1
+        self.slot_owners[chamber][slot] = body_id
+    
+    def allocate(self, chamber: str, body_id: int) -> Optional[int]:
+        """Занятие ближайшей свободной ячейки камеры"""
+        if chamber not in self.occupancy:
+            return None
+        slot = self.first_free_slot(chamber)
+        if slot is not None:
+            self.occupy(chamber, slot, body_id)
+        return slot
+    
+    def release(self, chamber: str, slot: Optional[int]):
+        """Освобождение ячейки"""
+        if chamber not in self.occupancy or not slot:
+            return
+        if self.occupancy[chamber] >> (slot - 1) & 1:
+            self.occupancy[chamber] &= ~(1 << (slot - 1))
+            self.occupied_count[chamber] -= 1
+            self.slot_owners[chamber].pop(slot, None)
+    
+    def suggest_slot(self, preferred: str = None):
+        """Предложение места хранения: (камера, ячейка) или (None, None)"""
+        names = self.chamber_names()
+        if preferred in self.occupancy:
+            names.remove(preferred)
+            names.insert(0, preferred)
+        for name in names:
+            slot = self.first_free_slot(name)
+            if slot is not None:
+                return name, slot
+        return None, None
+    
+    def load_report(self) -> List[Dict]:
+        """Загруженность камер по поддерживаемым счетчикам"""
+        report = []
+        for name in self.chamber_names():
+            capacity = self.capacities[name]
+            occupied = self.occupied_count[name]
+            report.append({
+                "name": name,
+                "capacity": capacity,
+                "occupied": occupied,
+                "free": capacity - occupied,
+                "load": (occupied / capacity * 100) if capacity > 0 else 0
+            })
+        return report
+
 class BodyManagement:
     """Класс для управления учетов тел"""
     
-    def __init__(self, data_file="bodies.json"):
+    def __init__(self, data_file="bodies.json", storage_file="storage.json",
+                 codec: str = storage_codecs.DEFAULT_CODEC):
         self.data_file = data_file
+        # Формат сохранения (см. storage_codecs)
+        self.codec = codec
         self.bodies = self.load_data()
+        # Счетчик версий данных, увеличивается при каждом изменении
+        self.version = 0
+        
+        # Позиции записей по ID для поиска без перебора
+        self.positions = {body["id"]: index for index, body in enumerate(self.bodies)}
+        # ID новых записей: следующий после наибольшего известного (с учетом полученных)
+        self.next_id = max(self.positions, default=0) + 1
+        # ID станции-автора новых записей и пространство ID станции (назначаются репликацией)
+        self.station_id = None
+        self.id_space = replication.LOCAL_ID_SPACE
+        # Менеджер координаций, поддерживающий связь тело-координация
+        self.coordinator = None
+        # Подписчики на изменения: callback(событие, запись)
+        self.listeners = []
+        
+        # Разобранные даты, выровненные по позициям в self.bodies
+        self.date_columns = DateColumns(BODY_DATE_FIELDS, BODY_INDEXED_FIELDS)
+        self.date_columns.rebuild(self.bodies)
+        
+        # Учет ячеек холодильных камер
+        self.storage = StorageRegistry(storage_file, codec)
+        self.storage.rebuild(self.bodies)
+        
+        # Индекс блоков для поиска возможных дубликатов
+        self.duplicates = DuplicateDetector()
+        self.duplicates.rebuild(self.bodies)
+        
+        # Снимки для фоновых отчетов: записи после этой точки
+        # не изменяются на месте, а заменяются копиями
+        self.snapshots = SnapshotStore()
     
     def load_data(self) -> List[Dict]:
-        """Загрузка данных из файла"""
-        if os.path.exists(self.data_file):
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return []
+        """Загрузка данных из файла (формат определяется по содержимому)"""
+        return storage_codecs.load_file(self.data_file, [])
     
     def save_data(self):
         """Сохранение данных в файл"""
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.bodies, f, ensure_ascii=False, indent=2)
+        storage_codecs.save_file(self.data_file, self.bodies, self.codec)
+    
+    def add_listener(self, callback):
+        """Подписка на изменения данных"""
+        self.listeners.append(callback)
+    
+    def notify(self, event: str, record: Dict):
+        """Оповещение подписчиков об изменении"""
+        for callback in self.listeners:
+            callback(event, record)
     
     def register_body(self, 
                      full_name: str,
@@ -33,10 +228,22 @@ class BodyManagement:
                      source: str,
                      storage_location: str,
                      documents: List[str],
-                     status: str = "поступило") -> Dict:
+                     status: str = "поступило",
+                     storage_slot: Optional[int] = None,
+                     staff_id: Optional[int] = None) -> Dict:
         """Регистрация нового тела"""
         
-        body_id = len(self.bodies) + 1
+        body_id = replication.next_record_id(self.next_id - 1, self.id_space)
+        self.next_id = body_id + 1
+        
+        # Занимаем выбранную ячейку или ближайшую свободную
+        if status != "выдано":
+            if storage_slot and self.storage.is_free(storage_location, storage_slot):
+                self.storage.occupy(storage_location, storage_slot, body_id)
+            else:
+                storage_slot = self.storage.allocate(storage_location, body_id)
+        else:
+            storage_slot = None
         
         body_data = {
             "id": body_id,
@@ -44,73 +251,217 @@ class BodyManagement:
             "arrival_date": arrival_date,
             "source": source,
             "storage_location": storage_location,
+            "storage_slot": storage_slot,
             "documents": documents,
             "status": status,
             "preparation_date": None,
             "release_date": None,
             "funeral_service": None,
             "notes": "",
-            "registration_date": datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+            "registration_date": datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
+            "registered_by": staff_id,
+            "station": self.station_id,
+            "history": []
         }
+        body_data["history"].append({
+            "date": body_data["registration_date"],
+            "action": "регистрация",
+            "status": status,
+            "staff_id": staff_id
+        })
         
+        # Координация могла быть заведена на этот ID раньше регистрации тела
+        if self.coordinator:
+            body_data["funeral_service"] = self.coordinator.latest_for_body(body_id)
+        
+        self.positions[body_id] = len(self.bodies)
         self.bodies.append(body_data)
+        self.snapshots.mark_dirty(self.positions[body_id])
+        self.date_columns.append(body_data)
+        self.duplicates.add(body_data)
+        self.version += 1
         self.save_data()
+        self.notify("body_registered", body_data)
         return body_data
     
-    def update_body_status(self, body_id: int, new_status: str, notes: str = ""):
+    def update_body_status(self, body_id: int, new_status: str, notes: str = "",
+                           staff_id: Optional[int] = None):
         """Обновление статуса тела"""
-        for body in self.bodies:
-            if body["id"] == body_id:
-                body["status"] = new_status
-                if notes:
-                    body["notes"] = notes
-                if new_status == "подготовлено":
-                    body["preparation_date"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
-                elif new_status == "выдано":
-                    body["release_date"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
-                self.save_data()
-                return True
-        return False
+        index = self.positions.get(body_id)
+        if index is None:
+            return False
+        
+        # Копия записи: прежняя версия могла попасть в снимок фонового отчета
+        body = dict(self.bodies[index])
+        # Выдача освобождает ячейку, возврат из выдачи занимает ее снова
+        if new_status == "выдано" and body["status"] != "выдано":
+            self.storage.release(body["storage_location"], body.get("storage_slot"))
+            body["storage_slot"] = None
+        elif new_status != "выдано" and body["status"] == "выдано":
+            body["storage_slot"] = self.storage.allocate(body["storage_location"], body_id)
+        body["status"] = new_status
+        if notes:
+            body["notes"] = notes
+        if new_status == "подготовлено":
+            body["preparation_date"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        elif new_status == "выдано":
+            body["release_date"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        body["history"] = body.get("history", []) + [{
+            "date": datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
+            "action": "смена статуса",
+            "status": new_status,
+            "staff_id": staff_id
+        }]
+        self.bodies[index] = body
+        self.snapshots.mark_dirty(index)
+        self.date_columns.update(index, body)
+        self.version += 1
+        self.save_data()
+        self.notify("body_updated", body)
+        return True
+    
+    def link_coordination(self, body_id: int, coordination_id: int) -> bool:
+        """Привязка координации с ритуальной службой к телу"""
+        index = self.positions.get(body_id)
+        if index is None:
+            return False
+        body = dict(self.bodies[index])
+        body["funeral_service"] = coordination_id
+        self.bodies[index] = body
+        self.snapshots.mark_dirty(index)
+        self.version += 1
+        self.save_data()
+        self.notify("coordination_linked", body)
+        return True
+    
+    def apply_replicated(self, event: str, body: Dict, save: bool = True):
+        """Запись тела, полученная с другой станции: вставка или замена по ID
+        
+        ReplicationConflict - ID занят телом, зарегистрированным другой станцией.
+        """
+        body = dict(body)
+        index = self.positions.get(body["id"])
+        replication.check_conflict(self.bodies[index] if index is not None else None, body)
+        if index is not None:
+            previous = self.bodies[index]
+            location, slot = previous["storage_location"], previous.get("storage_slot")
+            if self.storage.slot_owners.get(location, {}).get(slot) == body["id"]:
+                self.storage.release(location, slot)
+        
+        # Ячейка, занятая на этой станции другим телом, назначается заново
+        if body["status"] != "выдано" and body["storage_location"] in self.storage.occupancy:
+            slot = body.get("storage_slot")
+            if slot and self.storage.is_free(body["storage_location"], slot):
+                self.storage.occupy(body["storage_location"], slot, body["id"])
+            else:
+                body["storage_slot"] = self.storage.allocate(body["storage_location"], body["id"])
+        
+        if index is None:
+            index = self.positions[body["id"]] = len(self.bodies)
+            self.bodies.append(body)
+            self.date_columns.append(body)
+            self.duplicates.add(body)
+            self.next_id = max(self.next_id, body["id"] + 1)
+        else:
+            self.bodies[index] = body
+            self.date_columns.update(index, body)
+        self.snapshots.mark_dirty(index)
+        self.version += 1
+        if save:
+            self.save_data()
+        self.notify(event, body)
     
     def get_body_by_id(self, body_id: int) -> Optional[Dict]:
         """Получение информации о теле по ID"""
-        for body in self.bodies:
-            if body["id"] == body_id:
-                return body
-        return None
+        index = self.positions.get(body_id)
+        if index is None:
+            return None
+        return self.bodies[index]
     
     def list_bodies(self, status_filter: str = None) -> List[Dict]:
         """Список тел с возможностью фильтрации по статусу"""
         if status_filter:
             return [body for body in self.bodies if body["status"] == status_filter]
         return self.bodies
+    
+    def iter_pages(self,
+                   page_size: int = pagination.DEFAULT_PAGE_SIZE,
+                   sort_key: str = "id",
+                   status_filter: str = None,
+                   cursor: str = None,
+                   descending: bool = False):
+        """Постраничный обход тел (sort_key - id или индексированное поле даты)"""
+        predicate = (lambda body: body["status"] == status_filter) if status_filter else None
+        return pagination.iter_pages(self.bodies, self.positions, page_size, sort_key,
+                                     self.date_columns.indexes.get(sort_key) if sort_key != "id" else None,
+                                     cursor, predicate, descending)
+    
+    def find_duplicates(self, full_name: str, arrival_date: str) -> List[tuple]:
+        """Возможные дубликаты нового тела: список (тело, схожесть)"""
+        return [(self.get_body_by_id(body_id), score)
+                for body_id, score in self.duplicates.candidates(full_name, arrival_date)]
+    
+    def snapshot(self):
+        """Неизменяемый снимок списка тел текущей версии"""
+        return self.snapshots.snapshot(self.bodies, self.version)
+    
+    def bodies_in_period(self, date_field: str, start_date: str, end_date: str) -> List[Dict]:
+        """Тела с датой поступления или выдачи в периоде (по индексу дат)"""
+        positions = self.date_columns.positions_in_period(date_field, start_date, end_date)
+        return [self.bodies[position] for position in positions]
 
 class SanitaryControl:
     """Класс для контроля санитарных норм"""
     
-    def __init__(self, data_file="sanitary.json"):
+    def __init__(self, data_file="sanitary.json", codec: str = storage_codecs.DEFAULT_CODEC,
+                 rollup_file="sanitary_daily.json"):
         self.data_file = data_file
+        self.rollup_file = rollup_file
+        self.codec = codec
         self.checks = self.load_data()
+        # Дневные итоги проверок, сжатых по горизонту (см. compact)
+        self.rollups = check_rollups.CheckRollups(storage_codecs.load_file(self.rollup_file, []))
+        # ID сжатых проверок не используются повторно
+        self.next_id = max([check["id"] for check in self.checks] + [self.rollups.max_check_id()]) + 1
+        self.version = 0
+        self.positions = {check["id"]: index for index, check in enumerate(self.checks)}
+        self.station_id = None
+        self.id_space = replication.LOCAL_ID_SPACE
+        self.listeners = []
+        self.date_columns = DateColumns(CHECK_DATE_FIELDS, CHECK_INDEXED_FIELDS)
+        self.date_columns.rebuild(self.checks)
+        self.snapshots = SnapshotStore()
     
     def load_data(self):
-        if os.path.exists(self.data_file):
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return []
+        return storage_codecs.load_file(self.data_file, [])
     
     def save_data(self):
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.checks, f, ensure_ascii=False, indent=2)
+        storage_codecs.save_file(self.data_file, self.checks, self.codec)
+    
+    def save_rollups(self):
+        storage_codecs.save_file(self.rollup_file, self.rollups.records, self.codec)
+    
+    def add_listener(self, callback):
+        """Подписка на изменения данных"""
+        self.listeners.append(callback)
+    
+    def notify(self, event: str, record: Dict):
+        """Оповещение подписчиков об изменении"""
+        for callback in self.listeners:
+            callback(event, record)
     
     def record_check(self, 
                     check_type: str,
                     temperature: float,
                     cleanliness_score: int,
                     inspector: str,
-                    notes: str = "") -> Dict:
+                    notes: str = "",
+                    inspector_id: Optional[int] = None,
+                    chamber: Optional[str] = None) -> Dict:
         """Запись санитарной проверки"""
         
-        check_id = len(self.checks) + 1
+        check_id = replication.next_record_id(self.next_id - 1, self.id_space)
+        self.next_id = check_id + 1
         
         check_data = {
             "id": check_id,
@@ -119,44 +470,199 @@ class SanitaryControl:
             "temperature": temperature,
             "cleanliness_score": cleanliness_score,
             "inspector": inspector,
+            "inspector_id": inspector_id,
+            "chamber": chamber,
             "notes": notes,
+            "station": self.station_id,
             "violations": []
         }
         
+        self.positions[check_id] = len(self.checks)
         self.checks.append(check_data)
+        self.snapshots.mark_dirty(self.positions[check_id])
+        self.date_columns.append(check_data)
+        self.version += 1
         self.save_data()
+        self.notify("check_recorded", check_data)
         return check_data
     
     def add_violation(self, check_id: int, violation: str, corrective_action: str):
         """Добавление нарушения к проверке"""
-        for check in self.checks:
-            if check["id"] == check_id:
-                check["violations"].append({
-                    "violation": violation,
-                    "corrective_action": corrective_action,
-                    "date": datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
-                })
-                self.save_data()
-                return True
-        return False
+        index = self.positions.get(check_id)
+        if index is None:
+            return False
+        
+        check = dict(self.checks[index])
+        check["violations"] = check["violations"] + [{
+            "violation": violation,
+            "corrective_action": corrective_action,
+            "date": datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        }]
+        self.checks[index] = check
+        self.snapshots.mark_dirty(index)
+        self.version += 1
+        self.save_data()
+        self.notify("violation_added", check)
+        return True
+    
+    def apply_replicated(self, event: str, check: Dict, save: bool = True):
+        """Проверка, полученная с другой станции: вставка или замена по ID
+        
+        ReplicationConflict - ID занят проверкой другой станции.
+        """
+        index = self.positions.get(check["id"])
+        replication.check_conflict(self.checks[index] if index is not None else None, check)
+        if index is None and self.rollups.covers(check["date"]):
+            # Проверка сжатой истории не возвращается в журнал: новая
+            # сворачивается в итоги, изменения уже сжатой пропускаются
+            if event == "check_recorded":
+                self.rollups.absorb([check])
+                self.next_id = max(self.next_id, check["id"] + 1)
+                self.version += 1
+                self.save_rollups()
+            return
+        if index is None:
+            index = self.positions[check["id"]] = len(self.checks)
+            self.checks.append(check)
+            self.date_columns.append(check)
+            self.next_id = max(self.next_id, check["id"] + 1)
+        else:
+            self.checks[index] = check
+            self.date_columns.update(index, check)
+        self.snapshots.mark_dirty(index)
+        self.version += 1
+        if save:
+            self.save_data()
+        self.notify(event, check)
+    
+    def iter_pages(self,
+                   page_size: int = pagination.DEFAULT_PAGE_SIZE,
+                   sort_key: str = "id",
+                   cursor: str = None,
+                   descending: bool = False):
+        """Постраничный обход проверок (sort_key - id или date)"""
+        return pagination.iter_pages(self.checks, self.positions, page_size, sort_key,
+                                     self.date_columns.indexes.get(sort_key) if sort_key != "id" else None,
+                                     cursor, None, descending)
+    
+    def snapshot(self):
+        """Неизменяемый снимок журнала проверок текущей версии"""
+        return self.snapshots.snapshot(self.checks, self.version)
+    
+    def checks_in_period(self, start_date: str, end_date: str) -> List[Dict]:
+        """Проверки за период (по индексу дат)"""
+        positions = self.date_columns.positions_in_period('date', start_date, end_date)
+        return [self.checks[position] for position in positions]
+    
+    def history_totals(self, start_date: str = None, end_date: str = None) -> Dict:
+        """Сводка по сжатой истории за период (по дневным итогам)"""
+        return self.rollups.totals(start_date, end_date)
+    
+    def compact(self, horizon_days: int = check_rollups.DEFAULT_HORIZON_DAYS) -> int:
+        """Свертка проверок старше horizon_days дней в дневные итоги
+        
+        Возвращает число свернутых проверок. Итоги записываются раньше
+        журнала: при сбое между записями проверки будут учтены дважды,
+        но не потеряются.
+        """
+        cutoff = (datetime.date.today() - datetime.timedelta(days=horizon_days)).isoformat()
+        old, recent = check_rollups.split_checks(self.checks, cutoff)
+        if not old:
+            return 0
+        
+        self.rollups.absorb(old)
+        self.checks = recent
+        self.positions = {check["id"]: index for index, check in enumerate(self.checks)}
+        self.date_columns.rebuild(self.checks)
+        self.snapshots.reset()
+        self.version += 1
+        self.save_rollups()
+        self.save_data()
+        self.notify("checks_compacted", {"count": len(old), "cutoff": cutoff})
+        return len(old)
 
 class StaffManagement:
     """Класс для управления персоналом"""
     
-    def __init__(self, data_file="staff.json"):
+    def __init__(self, data_file="staff.json", codec: str = storage_codecs.DEFAULT_CODEC,
+                 schedules_file="shifts.json"):
         self.data_file = data_file
+        self.codec = codec
+        self.schedules_file = schedules_file
         self.staff = self.load_data()
-        self.schedules = []
+        # График смен: деревья интервалов для пересечений и покрытия
+        self.schedules = ShiftSchedule(storage_codecs.load_file(schedules_file, []))
+        self.version = 0
+        self.positions = {employee["id"]: index for index, employee in enumerate(self.staff)}
+        self.next_id = max(self.positions, default=0) + 1
+        self.station_id = None
+        self.id_space = replication.LOCAL_ID_SPACE
+        self.listeners = []
+        
+        # Индекс имен: полное ФИО и краткая форма "Фамилия И.О." -> ID
+        self.name_index = {}
+        for employee in self.staff:
+            self.index_name(employee)
     
     def load_data(self):
-        if os.path.exists(self.data_file):
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return []
+        return storage_codecs.load_file(self.data_file, [])
     
     def save_data(self):
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.staff, f, ensure_ascii=False, indent=2)
+        storage_codecs.save_file(self.data_file, self.staff, self.codec)
+        self.save_schedules()
+    
+    def save_schedules(self):
+        storage_codecs.save_file(self.schedules_file, self.schedules.records(), self.codec)
+    
+    def add_listener(self, callback):
+        """Подписка на изменения данных"""
+        self.listeners.append(callback)
+    
+    def notify(self, event: str, record: Dict):
+        """Оповещение подписчиков об изменении"""
+        for callback in self.listeners:
+            callback(event, record)
+    
+    @staticmethod
+    def name_keys(full_name: str) -> List[str]:
+        """Варианты написания имени для поиска сотрудника"""
+        parts = full_name.replace('ё', 'е').replace('Ё', 'Е').split()
+        if not parts:
+            return []
+        keys = [' '.join(parts).lower()]
+        if len(parts) > 1:
+            initials = ''.join(f"{part[0]}." for part in parts[1:])
+            keys.append(f"{parts[0]} {initials}".lower())
+        return keys
+    
+    def index_name(self, employee: Dict):
+        """Добавление сотрудника в индекс имен"""
+        for key in self.name_keys(employee["full_name"]):
+            self.name_index.setdefault(key, employee["id"])
+    
+    def find_employee_id(self, name: str) -> Optional[int]:
+        """Поиск ID сотрудника по полному или краткому ФИО"""
+        # "Сидоров А.И." и "Сидоров А. И." приводятся к одному виду
+        normalized = ' '.join(name.replace('. ', '.').split())
+        for key in self.name_keys(normalized):
+            if key in self.name_index:
+                return self.name_index[key]
+        return self.name_index.get(normalized.replace('ё', 'е').lower())
+    
+    def iter_pages(self,
+                   page_size: int = pagination.DEFAULT_PAGE_SIZE,
+                   cursor: str = None,
+                   status_filter: str = None):
+        """Постраничный обход сотрудников в порядке ID"""
+        predicate = (lambda employee: employee["status"] == status_filter) if status_filter else None
+        return pagination.iter_pages(self.staff, self.positions, page_size, "id", None, cursor, predicate)
+    
+    def get_employee_by_id(self, employee_id: int) -> Optional[Dict]:
+        """Получение сотрудника по ID"""
+        index = self.positions.get(employee_id)
+        if index is None:
+            return None
+        return self.staff[index]
     
     def add_employee(self,
                     full_name: str,
@@ -166,35 +672,159 @@ class StaffManagement:
         """Добавление сотрудника"""
         
         employee_data = {
-            "id": len(self.staff) + 1,
+            "id": replication.next_record_id(self.next_id - 1, self.id_space),
             "full_name": full_name,
             "position": position,
             "contact": contact,
             "qualifications": qualifications,
             "hire_date": datetime.datetime.now().strftime("%Y-%m-%d"),
-            "status": "активен"
+            "status": "активен",
+            "station": self.station_id
         }
         
+        self.next_id = employee_data["id"] + 1
+        self.positions[employee_data["id"]] = len(self.staff)
         self.staff.append(employee_data)
+        self.index_name(employee_data)
+        self.version += 1
         self.save_data()
+        self.notify("employee_added", employee_data)
         return employee_data
+    
+    def add_shift(self, staff_id: int, start: str, end: str, notes: str = "") -> Dict:
+        """Добавление смены (ValueError - неверное время или пересечение со сменами сотрудника)"""
+        if self.get_employee_by_id(staff_id) is None:
+            raise ValueError(f"Сотрудник с ID {staff_id} не найден")
+        start_minutes, end_minutes = self.schedules.validate(start, end)
+        conflicts = self.schedules.conflicts(staff_id, start_minutes, end_minutes)
+        if conflicts:
+            busy = ', '.join(f"{shift['start']} – {shift['end']}" for shift in conflicts)
+            raise ValueError(f"Смена пересекается с другими сменами сотрудника: {busy}")
+        
+        shift = {
+            "id": replication.next_record_id(self.schedules.last_id, self.id_space),
+            "staff_id": staff_id,
+            "start": start,
+            "end": end,
+            "notes": notes,
+            "station": self.station_id
+        }
+        self.schedules.add(shift)
+        self.version += 1
+        self.save_schedules()
+        self.notify("shift_added", shift)
+        return shift
+    
+    def remove_shift(self, shift_id: int) -> Optional[Dict]:
+        """Удаление смены"""
+        shift = self.schedules.remove(shift_id)
+        if shift is None:
+            return None
+        self.version += 1
+        self.save_schedules()
+        self.notify("shift_removed", shift)
+        return shift
+    
+    def on_duty(self, moment: str) -> List[Dict]:
+        """Сотрудники на смене в момент времени (ГГГГ-ММ-ДД ЧЧ:ММ)"""
+        employees = []
+        for shift in self.schedules.on_duty(parse_date(moment)):
+            employee = self.get_employee_by_id(shift["staff_id"])
+            if employee is not None and employee not in employees:
+                employees.append(employee)
+        return employees
+    
+    def coverage_gaps(self, position: str, start: str, end: str) -> List[str]:
+        """Периоды [start, end), когда на смене нет сотрудника с должностью"""
+        def has_position(staff_id: int) -> bool:
+            employee = self.get_employee_by_id(staff_id)
+            return employee is not None and employee["position"] == position
+        
+        gaps = self.schedules.coverage_gaps(parse_date(start), parse_date(end), has_position)
+        return [format_interval(gap) for gap in gaps]
+    
+    def apply_replicated(self, event: str, employee: Dict, save: bool = True):
+        """Сотрудник, полученный с другой станции: вставка или замена по ID
+        
+        ReplicationConflict - ID занят сотрудником или сменой другой станции.
+        """
+        if event in ("shift_added", "shift_removed"):
+            self.apply_replicated_shift(event, employee, save)
+            return
+        index = self.positions.get(employee["id"])
+        replication.check_conflict(self.staff[index] if index is not None else None, employee)
+        if index is None:
+            self.positions[employee["id"]] = len(self.staff)
+            self.staff.append(employee)
+            self.next_id = max(self.next_id, employee["id"] + 1)
+        else:
+            self.staff[index] = employee
+        self.index_name(employee)
+        self.version += 1
+        if save:
+            self.save_data()
+        self.notify(event, employee)
+    
+    def apply_replicated_shift(self, event: str, shift: Dict, save: bool = True):
+        """Смена, добавленная или удаленная на другой станции (без проверки пересечений)"""
+        replication.check_conflict(self.schedules.get(shift["id"]), shift)
+        self.schedules.remove(shift["id"])
+        if event == "shift_added":
+            self.schedules.add(shift)
+        self.version += 1
+        if save:
+            self.save_schedules()
+        self.notify(event, shift)
 
 class FuneralServiceCoordination:
     """Класс для координации с ритуальными службами"""
     
-    def __init__(self, data_file="funeral_services.json"):
+    def __init__(self, data_file="funeral_services.json", body_manager: BodyManagement = None,
+                 codec: str = storage_codecs.DEFAULT_CODEC, daily_capacity: int = DEFAULT_DAILY_CAPACITY):
         self.data_file = data_file
+        self.codec = codec
         self.coordinations = self.load_data()
+        self.version = 0
+        self.station_id = None
+        self.id_space = replication.LOCAL_ID_SPACE
+        
+        self.listeners = []
+        
+        # Индексы: позиция координации по ID и координации каждого тела;
+        # календарь выдач по planned_date со счетчиками документов
+        self.positions = {}
+        self.by_body: Dict[int, List[int]] = {}
+        self.calendar = ReleaseCalendar(daily_capacity)
+        for index, coordination in enumerate(self.coordinations):
+            self.positions[coordination["id"]] = index
+            self.by_body.setdefault(coordination["body_id"], []).append(index)
+            self.calendar.add(coordination)
+        self.next_id = max(self.positions, default=0) + 1
+        
+        # Обратная связь: поле funeral_service тела указывает на последнюю координацию
+        self.body_manager = body_manager
+        if body_manager is not None:
+            body_manager.coordinator = self
+            for body_id in self.by_body:
+                body = body_manager.get_body_by_id(body_id)
+                if body is not None:
+                    body["funeral_service"] = self.latest_for_body(body_id)
+            body_manager.add_listener(self.on_body_event)
     
     def load_data(self):
-        if os.path.exists(self.data_file):
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return []
+        return storage_codecs.load_file(self.data_file, [])
     
     def save_data(self):
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.coordinations, f, ensure_ascii=False, indent=2)
+        storage_codecs.save_file(self.data_file, self.coordinations, self.codec)
+    
+    def add_listener(self, callback):
+        """Подписка на изменения данных"""
+        self.listeners.append(callback)
+    
+    def notify(self, event: str, record: Dict):
+        """Оповещение подписчиков об изменении"""
+        for callback in self.listeners:
+            callback(event, record)
     
     def register_coordination(self,
                             body_id: int,
@@ -206,7 +836,7 @@ class FuneralServiceCoordination:
         """Регистрация координации с ритуальной службой"""
         
         coordination_data = {
-            "id": len(self.coordinations) + 1,
+            "id": replication.next_record_id(self.next_id - 1, self.id_space),
             "body_id": body_id,
             "service_name": service_name,
             "contact_person": contact_person,
@@ -215,32 +845,452 @@ class FuneralServiceCoordination:
             "documents_needed": documents_needed,
             "documents_provided": [],
             "coordination_date": datetime.datetime.now().strftime("%Y-%m-%d"),
-            "status": "в процессе"
+            "status": "в процессе",
+            "station": self.station_id
         }
         
+        self.next_id = coordination_data["id"] + 1
+        index = len(self.coordinations)
         self.coordinations.append(coordination_data)
+        self.positions[coordination_data["id"]] = index
+        self.by_body.setdefault(body_id, []).append(index)
+        self.calendar.add(coordination_data)
+        self.version += 1
         self.save_data()
+        self.notify("coordination_registered", coordination_data)
+        
+        if self.body_manager is not None:
+            self.body_manager.link_coordination(body_id, coordination_data["id"])
         return coordination_data
+    
+    def apply_replicated(self, event: str, coordination: Dict, save: bool = True):
+        """Координация, полученная с другой станции: вставка или замена по ID
+        
+        Связь с телом приходит отдельной записью тела (coordination_linked).
+        ReplicationConflict - ID занят координацией другой станции.
+        """
+        index = self.positions.get(coordination["id"])
+        replication.check_conflict(self.coordinations[index] if index is not None else None, coordination)
+        if index is None:
+            index = self.positions[coordination["id"]] = len(self.coordinations)
+            self.coordinations.append(coordination)
+            self.next_id = max(self.next_id, coordination["id"] + 1)
+            self.by_body.setdefault(coordination["body_id"], []).append(index)
+        else:
+            previous = self.coordinations[index]
+            if previous["body_id"] != coordination["body_id"]:
+                self.by_body[previous["body_id"]].remove(index)
+                self.by_body.setdefault(coordination["body_id"], []).append(index)
+            self.coordinations[index] = coordination
+        self.calendar.update(coordination)
+        self.version += 1
+        if save:
+            self.save_data()
+        self.notify(event, coordination)
+    
+    def update_coordination(self, coordination_id: int, **changes) -> Optional[Dict]:
+        """Изменение полей координации (копия записи) с пересчетом календаря"""
+        index = self.positions.get(coordination_id)
+        if index is None:
+            return None
+        coordination = dict(self.coordinations[index], **changes)
+        self.coordinations[index] = coordination
+        self.calendar.update(coordination)
+        self.version += 1
+        self.save_data()
+        self.notify("coordination_updated", coordination)
+        return coordination
+    
+    def mark_document_provided(self, coordination_id: int, document: str) -> Optional[Dict]:
+        """Отметка о предоставлении документа"""
+        coordination = self.get_coordination_by_id(coordination_id)
+        if coordination is None or document in coordination.get("documents_provided", []):
+            return None
+        return self.update_coordination(coordination_id,
+                                        documents_provided=coordination.get("documents_provided", []) + [document])
+    
+    def reschedule(self, coordination_id: int, planned_date: str) -> Optional[Dict]:
+        """Перенос выдачи на другую дату"""
+        return self.update_coordination(coordination_id, planned_date=planned_date)
+    
+    def update_status(self, coordination_id: int, status: str) -> Optional[Dict]:
+        """Смена статуса: завершенные и отмененные координации уходят из календаря"""
+        return self.update_coordination(coordination_id, status=status)
+    
+    def on_body_event(self, event: str, body: Dict):
+        """Выдача тела завершает его действующие координации"""
+        if event != "body_updated" or body["status"] != "выдано":
+            return
+        for coordination in self.get_coordinations_for_body(body["id"]):
+            if coordination["status"] == ACTIVE_STATUS:
+                self.update_status(coordination["id"], COMPLETED_STATUS)
+    
+    def iter_pages(self,
+                   page_size: int = pagination.DEFAULT_PAGE_SIZE,
+                   cursor: str = None,
+                   status_filter: str = None):
+        """Постраничный обход координаций в порядке ID"""
+        predicate = (lambda coord: coord["status"] == status_filter) if status_filter else None
+        return pagination.iter_pages(self.coordinations, self.positions, page_size, "id", None, cursor, predicate)
+    
+    def get_coordination_by_id(self, coordination_id: int) -> Optional[Dict]:
+        """Получение координации по ID"""
+        index = self.positions.get(coordination_id)
+        if index is None:
+            return None
+        return self.coordinations[index]
+    
+    def get_coordinations_for_body(self, body_id: int) -> List[Dict]:
+        """Все координации, связанные с телом"""
+        return [self.coordinations[index] for index in self.by_body.get(body_id, [])]
+    
+    def latest_for_body(self, body_id: int) -> Optional[int]:
+        """ID последней координации тела"""
+        indexes = self.by_body.get(body_id)
+        if not indexes:
+            return None
+        return self.coordinations[indexes[-1]]["id"]
 
 # Классы для графического интерфейса
+# Размер страницы при подгрузке таблиц тел и проверок и при обходе данных в отчетах
+BODY_TABLE_PAGE_SIZE = 200
+SANITARY_TABLE_PAGE_SIZE = 200
+REPORT_PAGE_SIZE = 1000
+# Формат файлов данных: json (по умолчанию), json-compact или msgpack (нужен пакет msgpack)
+STORAGE_CODEC = os.environ.get('MORGUE_STORAGE_CODEC', storage_codecs.DEFAULT_CODEC)
+# Лимит выдач тел в день для календаря координаций
+RELEASE_DAILY_CAPACITY = int(os.environ.get('MORGUE_RELEASE_CAPACITY', DEFAULT_DAILY_CAPACITY))
+# Порог задержки цикла событий, после которого она записывается в журнал
+UI_STALL_THRESHOLD_MS = int(os.environ.get('MORGUE_UI_STALL_MS', ui_watchdog.DEFAULT_THRESHOLD_MS))
+
+class ExportWorker(QObject):
+    """Фоновый экспорт отчета в XLSX/PDF"""
+    
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(str, int)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    
+    def __init__(self, export_format: str, path: str, title: str, columns, records):
+        super().__init__()
+        self.export_format = export_format
+        self.path = path
+        self.title = title
+        self.columns = columns
+        self.records = records
+        self._cancel_requested = False
+    
+    def cancel(self):
+        """Запрос на отмену экспорта (проверяется между порциями строк)"""
+        self._cancel_requested = True
+    
+    def run(self):
+        """Выполнение экспорта в рабочем потоке"""
+        exporter = report_export.EXPORTERS[self.export_format]
+        header = [title for _, title in self.columns]
+        rows = report_export.iter_rows(self.records, self.columns)
+        
+        try:
+            written = exporter(self.path, self.title, header, rows,
+                               total=len(self.records),
+                               progress=self.progress.emit,
+                               is_cancelled=lambda: self._cancel_requested)
+        except report_export.ExportCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.finished.emit(self.path, written)
+
+class DocumentWorker(QObject):
+    """Фоновое формирование документов (пакет - в пуле процессов)"""
+    
+    finished = pyqtSignal(int, str)
+    failed = pyqtSignal(str)
+    
+    def __init__(self, jobs, target: str):
+        super().__init__()
+        self.jobs = jobs
+        self.target = target
+    
+    def run(self):
+        """Формирование документов в рабочем потоке"""
+        try:
+            paths = documents.generate_batch(self.jobs)
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.finished.emit(len(paths), self.target)
+
+class ReportSignals(QObject):
+    """Сигналы фонового построения отчета"""
+    
+    finished = pyqtSignal(str, object, object, str)
+    failed = pyqtSignal(str, str)
+
+class ReportTask(QRunnable):
+    """Построение отчета в пуле потоков по снимку данных"""
+    
+    def __init__(self, report_type: str, params: tuple, versions: tuple, builder, args: tuple):
+        super().__init__()
+        self.report_type = report_type
+        self.params = params
+        self.versions = versions
+        self.builder = builder
+        self.args = args
+        self.signals = ReportSignals()
+    
+    def run(self):
+        """Построение отчета в потоке пула"""
+        try:
+            report = self.builder(*self.args)
+        except Exception as e:
+            self.signals.failed.emit(self.report_type, str(e))
+            return
+        self.signals.finished.emit(self.report_type, self.params, self.versions, report)
+
+class ThumbnailSignals(QObject):
+    """Сигнал готовности миниатюры вложения"""
+    
+    ready = pyqtSignal(str, QImage)
+
+class ThumbnailTask(QRunnable):
+    """Создание миниатюры в пуле потоков (QImage можно использовать вне потока интерфейса)"""
+    
+    def __init__(self, digest: str, source: str, target: str, signals: ThumbnailSignals):
+        super().__init__()
+        self.digest = digest
+        self.source = source
+        self.target = target
+        self.signals = signals
+    
+    def run(self):
+        """Чтение миниатюры с диска или уменьшение исходного изображения"""
+        if os.path.exists(self.target):
+            image = QImage(self.target)
+        else:
+            # Масштабирование при декодировании: полноразмерный скан
+            # в память не загружается
+            reader = QImageReader(self.source)
+            size = reader.size()
+            if size.isValid():
+                reader.setScaledSize(size.scaled(THUMBNAIL_SIZE, THUMBNAIL_SIZE, Qt.KeepAspectRatio))
+            image = reader.read()
+            if not image.isNull():
+                os.makedirs(os.path.dirname(self.target), exist_ok=True)
+                image.save(self.target, 'PNG')
+        self.signals.ready.emit(self.digest, image)
+
+class ChartSignals(QObject):
+    """Сигналы отрисовки графика температуры"""
+    
+    ready = pyqtSignal(object, QImage)
+    failed = pyqtSignal(object, str)
+
+class ChartTask(QRunnable):
+    """Отрисовка графика температуры в пуле потоков (Agg, без pyplot)"""
+    
+    def __init__(self, key: tuple, cache, telemetry_store, limits, points, incremental: bool,
+                 signals: ChartSignals):
+        super().__init__()
+        self.key = key
+        self.cache = cache
+        self.telemetry_store = telemetry_store
+        self.limits = limits
+        self.points = points
+        self.incremental = incremental
+        self.signals = signals
+    
+    def run(self):
+        """Полная отрисовка или дорисовка новых точек проверок"""
+        chamber, start_ms, end_ms, _ = self.key
+        try:
+            chart = self.cache.chart(chamber, start_ms, end_ms, self.limits)
+            if self.incremental:
+                width, height, data = chart.add_points(self.points)
+            else:
+                readings = self.telemetry_store.read_range(chamber, start_ms, end_ms)
+                width, height, data = chart.render(readings, self.points)
+        except ImportError:
+            self.signals.failed.emit(self.key, 'Для построения графиков требуется Matplotlib')
+            return
+        except Exception as e:
+            self.signals.failed.emit(self.key, f'Не удалось построить график: {e}')
+            return
+        image = QImage(data, width, height, QImage.Format_RGBA8888).copy()
+        self.signals.ready.emit(self.key, image)
+
+class ReplicationSignals(QObject):
+    """Результат обмена с другими станциями"""
+    
+    pulled = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+class ReplicationTask(QRunnable):
+    """Обмен лентами изменений в пуле потоков (записи применяются в потоке интерфейса)"""
+    
+    def __init__(self, feed, transports, last_seen: Dict[str, int], signals: ReplicationSignals):
+        super().__init__()
+        self.feed = feed
+        self.transports = transports
+        self.last_seen = last_seen
+        self.signals = signals
+    
+    def run(self):
+        """Передача своих изменений и получение чужих"""
+        entries = []
+        try:
+            for transport in self.transports:
+                transport.push(self.feed)
+                entries.extend(transport.pull(self.last_seen))
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.pulled.emit(entries)
+
+class TelemetryBridge(QObject):
+    """Передача событий телеметрии из потока приема в поток интерфейса"""
+    
+    alert = pyqtSignal(str, float, object)
+
 class MainWindow(QMainWindow):
     """Главное окно приложения"""
     
-    def __init__(self):
+    def __init__(self, site_registry: sites.SiteRegistry = None):
         super().__init__()
         
+        # Отделение, с каталогом данных которого работает окно
+        self.site_registry = site_registry or sites.SiteRegistry()
+        self.site = self.site_registry.current_site()
+        self.site_summary_cache = sites.SiteSummaryCache()
+        
         # Инициализация менеджеров данных
-        self.body_manager = BodyManagement()
-        self.sanitary_control = SanitaryControl()
-        self.staff_manager = StaffManagement()
-        self.funeral_coordinator = FuneralServiceCoordination()
+        self.body_manager = BodyManagement(self.site_path('bodies'), self.site_path('storage'),
+                                           codec=STORAGE_CODEC)
+        self.sanitary_control = SanitaryControl(self.site_path('sanitary'), codec=STORAGE_CODEC,
+                                                rollup_file=self.site_path('sanitary_daily'))
+        self.staff_manager = StaffManagement(self.site_path('staff'), codec=STORAGE_CODEC,
+                                             schedules_file=self.site_path('shifts'))
+        self.funeral_coordinator = FuneralServiceCoordination(self.site_path('funeral_services'),
+                                                              body_manager=self.body_manager,
+                                                              codec=STORAGE_CODEC,
+                                                              daily_capacity=RELEASE_DAILY_CAPACITY)
+        
+        # Кэш отчетов, привязанный к версиям данных менеджеров
+        self.report_cache = ReportCache()
+        
+        # Аналитика по сотрудникам: старые проверки привязываются
+        # к сотрудникам по ФИО инспектора, затем итоги считаются один раз
+        self.link_inspectors()
+        self.staff_analytics = StaffAnalytics()
+        self.staff_analytics.rebuild(self.sanitary_control.checks, self.body_manager.bodies,
+                                     self.sanitary_control.rollups)
+        self.sanitary_control.add_listener(self.staff_analytics.on_sanitary_event)
+        self.body_manager.add_listener(self.staff_analytics.on_body_event)
+        
+        # График проверок: один таймер на ближайший срок
+        self.check_scheduler = CheckScheduler(self.site_path('check_schedule'))
+        self.check_scheduler.rebuild(
+            itertools.chain(self.sanitary_control.rollups.latest_checks(), self.sanitary_control.checks),
+            self.current_minute()
+        )
+        self.sanitary_control.add_listener(self.on_sanitary_event)
+        self.schedule_timer = QTimer(self)
+        self.schedule_timer.setSingleShot(True)
+        self.schedule_timer.timeout.connect(self.on_schedule_timer)
+        self.tray_icon = None
+        
+        # Прием показаний датчиков температуры
+        self.telemetry_store = TelemetryStore(self.site_path('telemetry'))
+        self.telemetry_bridge = TelemetryBridge()
+        self.telemetry_bridge.alert.connect(self.on_telemetry_alert)
+        self.telemetry_service = TelemetryIngestService(
+            self.telemetry_store, on_alert=self.telemetry_bridge.alert.emit,
+            chambers=self.body_manager.storage.chamber_names()
+        )
+        
+        # Пул потоков для отчетов: строятся по снимкам данных, а не по
+        # изменяемым спискам менеджеров
+        self.report_pool = QThreadPool(self)
+        self.report_pool.setMaxThreadCount(2)
+        self.report_tasks = {}
+        self.requested_report = None
+        
+        # Репликация: изменения менеджеров пишутся в ленту станции,
+        # обмен с другими станциями - по таймеру (настройки в replication.json).
+        # Без номера станции (ID записей могли бы совпасть) и без токена
+        # для обмена по сети обмен не включается
+        self.replication_config = replication.load_config(self.site_path('replication'))
+        self.replication_error = None
+        try:
+            id_space = replication.check_config(self.replication_config)
+        except ValueError as e:
+            self.replication_error = str(e)
+            self.replication_config = {}
+            id_space = replication.LOCAL_ID_SPACE
+        self.replicator = replication.Replicator(self.site_path('changes'),
+                                                 self.site_path('replication_state'), id_space)
+        for collection, manager in (('bodies', self.body_manager), ('checks', self.sanitary_control),
+                                    ('staff', self.staff_manager), ('coordinations', self.funeral_coordinator)):
+            self.replicator.track(collection, manager)
+        self.replication_transports = replication.make_transports(self.replication_config,
+                                                                  self.replicator.station_id)
+        self.replication_server = None
+        self.replication_running = False
+        self.replication_signals = ReplicationSignals()
+        self.replication_signals.pulled.connect(self.on_replication_pulled)
+        self.replication_signals.failed.connect(self.on_replication_failed)
+        self.replication_timer = QTimer(self)
+        self.replication_timer.timeout.connect(self.start_replication)
+        
+        # Графики температуры: отрисовка в пуле потоков, кэш изображений
+        self.chart_cache = charts.ChartCache()
+        self.chart_signals = ChartSignals()
+        self.chart_signals.ready.connect(self.on_chart_ready)
+        self.chart_signals.failed.connect(self.on_chart_failed)
+        # Ключ показываемого графика и ключ идущей полной отрисовки
+        self.chart_key = None
+        self.chart_pending = None
+        self.chart_stale = False
+        
+        # Электронный архив вложений и миниатюры открытой карточки тела
+        self.document_archive = DocumentArchive(self.site_path('archive'))
+        self.thumbnail_cache = ThumbnailCache()
+        self.thumbnail_signals = ThumbnailSignals()
+        self.thumbnail_signals.ready.connect(self.on_thumbnail_ready)
+        self.thumbnail_pending = set()
+        self.attachment_list = None
+        
+        # Текущий фоновый экспорт
+        self.export_thread = None
+        self.export_worker = None
+        
+        # Текущее фоновое формирование документов
+        self.document_thread = None
+        self.document_worker = None
+        
+        # Контроль отзывчивости: пульс цикла событий и задержки с их обработчиками
+        self.latency_monitor = ui_watchdog.LatencyMonitor(threshold_ms=UI_STALL_THRESHOLD_MS,
+                                                          log_file=self.site_path('ui_stalls'),
+                                                          handler_files=[__file__])
+        self.latency_timer = QTimer(self)
+        self.latency_timer.setTimerType(Qt.PreciseTimer)
+        self.latency_timer.timeout.connect(self.latency_monitor.beat)
         
         self.init_ui()
         self.create_test_data()
+        self.arm_schedule_timer()
+        self.start_telemetry()
+        self.start_replication_service()
+        self.start_latency_monitor()
+    
+    def site_path(self, name: str) -> str:
+        """Путь файла данных текущего отделения"""
+        return sites.site_path(self.site['data_dir'], name)
     
     def init_ui(self):
         """Инициализация пользовательского интерфейса"""
-        self.setWindowTitle('Система администрирования морга')
+        self.setWindowTitle(f'Система администрирования морга — {self.site["name"]}')
         self.setGeometry(100, 100, 1200, 700)
         
         # Установка стиля
@@ -307,6 +1357,19 @@ class MainWindow(QMainWindow):
         title_label.setAlignment(Qt.AlignCenter)
         main_layout.addWidget(title_label)
         
+        # Выбор отделения
+        site_layout = QHBoxLayout()
+        site_layout.addWidget(QLabel('Отделение:'))
+        self.site_combo = QComboBox()
+        self.site_combo.addItems(self.site_registry.names())
+        self.site_combo.setCurrentText(self.site['name'])
+        self.site_combo.activated.connect(self.on_site_selected)
+        site_layout.addWidget(self.site_combo, 1)
+        btn_new_site = QPushButton('➕ Новое отделение')
+        btn_new_site.clicked.connect(self.show_new_site_dialog)
+        site_layout.addWidget(btn_new_site)
+        main_layout.addLayout(site_layout)
+        
         # Создание вкладок
         self.tab_widget = QTabWidget()
         main_layout.addWidget(self.tab_widget)
@@ -317,6 +1380,8 @@ class MainWindow(QMainWindow):
         self.create_staff_management_tab()
         self.create_funeral_coordination_tab()
         self.create_reports_tab()
+        self.create_temperature_tab()
+        self.tab_widget.currentChanged.connect(self.on_tab_changed)
         
         # Статус бар
         self.statusBar().showMessage('Готово к работе')
@@ -359,6 +1424,11 @@ class MainWindow(QMainWindow):
         self.body_table.setSelectionBehavior(QTableWidget.SelectRows)
         self.body_table.setEditTriggers(QTableWidget.NoEditTriggers)
         self.body_table.doubleClicked.connect(self.edit_body)
+        # Следующая страница подгружается при прокрутке до конца таблицы,
+        # а пока полосы прокрутки нет - сразу, до заполнения видимой области
+        self.body_pages = None
+        self.body_table.verticalScrollBar().valueChanged.connect(self.on_body_table_scrolled)
+        self.body_table.verticalScrollBar().rangeChanged.connect(lambda *_: self.fill_body_table())
         
         layout.addWidget(self.body_table)
         
@@ -386,16 +1456,28 @@ class MainWindow(QMainWindow):
         btn_refresh.clicked.connect(self.refresh_sanitary_table)
         toolbar.addWidget(btn_refresh)
         
+        btn_schedule = QPushButton('📅 График проверок')
+        btn_schedule.clicked.connect(self.show_check_schedule)
+        toolbar.addWidget(btn_schedule)
+        
+        btn_compact = QPushButton('🗜 Сжать историю')
+        btn_compact.clicked.connect(self.compact_check_history)
+        toolbar.addWidget(btn_compact)
+        
         layout.addLayout(toolbar)
         
         # Таблица с проверками
         self.sanitary_table = QTableWidget()
-        self.sanitary_table.setColumnCount(7)
+        self.sanitary_table.setColumnCount(8)
         self.sanitary_table.setHorizontalHeaderLabels([
-            'ID', 'Дата', 'Тип проверки', 'Температура', 
+            'ID', 'Дата', 'Тип проверки', 'Помещение', 'Температура', 
             'Оценка чистоты', 'Инспектор', 'Нарушения'
         ])
         self.sanitary_table.setSelectionBehavior(QTableWidget.SelectRows)
+        # Страницы проверок подгружаются так же, как страницы тел
+        self.sanitary_pages = None
+        self.sanitary_table.verticalScrollBar().valueChanged.connect(self.on_sanitary_table_scrolled)
+        self.sanitary_table.verticalScrollBar().rangeChanged.connect(lambda *_: self.fill_sanitary_table())
         
         layout.addWidget(self.sanitary_table)
         
@@ -407,6 +1489,37 @@ class MainWindow(QMainWindow):
         self.tab_widget.addTab(tab, '🧼 Санитарный контроль')
         self.refresh_sanitary_table()
     
+    def create_temperature_tab(self):
+        """Вкладка графиков температуры холодильных камер"""
+        tab = QWidget()
+        layout = QVBoxLayout(tab)
+        
+        toolbar = QHBoxLayout()
+        toolbar.addWidget(QLabel('Камера:'))
+        self.chart_chamber_combo = QComboBox()
+        self.chart_chamber_combo.addItems(self.body_manager.storage.chamber_names())
+        self.chart_chamber_combo.currentIndexChanged.connect(self.request_chart)
+        toolbar.addWidget(self.chart_chamber_combo, 1)
+        
+        toolbar.addWidget(QLabel('Период:'))
+        self.chart_range_combo = QComboBox()
+        self.chart_range_combo.addItems(list(charts.RANGES_HOURS))
+        self.chart_range_combo.currentIndexChanged.connect(self.request_chart)
+        toolbar.addWidget(self.chart_range_combo)
+        
+        btn_refresh = QPushButton('🔄 Обновить')
+        btn_refresh.clicked.connect(self.request_chart)
+        toolbar.addWidget(btn_refresh)
+        layout.addLayout(toolbar)
+        
+        self.chart_label = QLabel('График появится после выбора камеры')
+        self.chart_label.setAlignment(Qt.AlignCenter)
+        self.chart_label.setMinimumHeight(360)
+        layout.addWidget(self.chart_label, 1)
+        
+        self.chart_tab = tab
+        self.tab_widget.addTab(tab, '📈 Температура')
+    
     def create_staff_management_tab(self):
         """Вкладка управления персоналом"""
         tab = QWidget()
@@ -419,6 +1532,10 @@ class MainWindow(QMainWindow):
         btn_new_employee.clicked.connect(self.show_new_employee_dialog)
         toolbar.addWidget(btn_new_employee)
         
+        btn_shifts = QPushButton('📅 График смен')
+        btn_shifts.clicked.connect(self.show_shift_schedule_dialog)
+        toolbar.addWidget(btn_shifts)
+        
         btn_refresh = QPushButton('🔄 Обновить')
         btn_refresh.clicked.connect(self.refresh_staff_table)
         toolbar.addWidget(btn_refresh)
@@ -451,18 +1568,38 @@ class MainWindow(QMainWindow):
         btn_new_coordination.clicked.connect(self.show_new_coordination_dialog)
         toolbar.addWidget(btn_new_coordination)
         
+        btn_document = QPushButton('📄 Документ получен')
+        btn_document.clicked.connect(self.mark_coordination_document)
+        toolbar.addWidget(btn_document)
+        
+        btn_reschedule = QPushButton('📅 Перенести')
+        btn_reschedule.clicked.connect(self.reschedule_coordination)
+        toolbar.addWidget(btn_reschedule)
+        
+        btn_status = QPushButton('✏️ Статус')
+        btn_status.clicked.connect(self.change_coordination_status)
+        toolbar.addWidget(btn_status)
+        
+        btn_calendar = QPushButton('📆 Календарь выдач')
+        btn_calendar.clicked.connect(self.show_release_calendar_dialog)
+        toolbar.addWidget(btn_calendar)
+        
         btn_refresh = QPushButton('🔄 Обновить')
         btn_refresh.clicked.connect(self.refresh_coordination_table)
         toolbar.addWidget(btn_refresh)
         
         layout.addLayout(toolbar)
         
+        # Загрузка сегодняшнего дня и недостающие документы (счетчики календаря)
+        self.release_summary_label = QLabel()
+        layout.addWidget(self.release_summary_label)
+        
         # Таблица с координациями
         self.coordination_table = QTableWidget()
-        self.coordination_table.setColumnCount(7)
+        self.coordination_table.setColumnCount(9)
         self.coordination_table.setHorizontalHeaderLabels([
-            'ID', 'ID тела', 'Ритуальная служба', 'Контактное лицо', 
-            'Запланированная дата', 'Статус', 'Документы'
+            'ID', 'ID тела', 'ФИО', 'Статус тела', 'Ритуальная служба', 
+            'Контактное лицо', 'Запланированная дата', 'Статус', 'Документы'
         ])
         self.coordination_table.setSelectionBehavior(QTableWidget.SelectRows)
         
@@ -495,8 +1632,74 @@ class MainWindow(QMainWindow):
         btn_daily_report.clicked.connect(self.generate_daily_report)
         report_buttons.addWidget(btn_daily_report, 1, 1)
         
+        btn_storage_report = QPushButton('🧊 Загруженность камер')
+        btn_storage_report.clicked.connect(self.generate_storage_report)
+        report_buttons.addWidget(btn_storage_report, 2, 0)
+        
+        btn_staff_report = QPushButton('👥 Аналитика по сотрудникам')
+        btn_staff_report.clicked.connect(self.generate_staff_report)
+        report_buttons.addWidget(btn_staff_report, 2, 1)
+        
+        btn_release_acts = QPushButton('🖨 Акты выдачи за сегодня')
+        btn_release_acts.clicked.connect(self.generate_release_acts)
+        report_buttons.addWidget(btn_release_acts, 3, 0)
+        
+        btn_duplicates = QPushButton('🔍 Возможные дубликаты')
+        btn_duplicates.clicked.connect(self.generate_duplicates_report)
+        report_buttons.addWidget(btn_duplicates, 3, 1)
+        
+        btn_network_report = QPushButton('🌐 Сводка по отделениям')
+        btn_network_report.clicked.connect(self.generate_network_report)
+        report_buttons.addWidget(btn_network_report, 4, 0)
+        
+        btn_latency_report = QPushButton('⏱ Отзывчивость интерфейса')
+        btn_latency_report.clicked.connect(self.show_latency_report)
+        report_buttons.addWidget(btn_latency_report, 4, 1)
+        
         layout.addLayout(report_buttons)
         
+        # Статистика за период
+        period_layout = QHBoxLayout()
+        period_layout.addWidget(QLabel('Период с:'))
+        self.period_start_input = QDateEdit()
+        self.period_start_input.setCalendarPopup(True)
+        self.period_start_input.setDisplayFormat('yyyy-MM-dd')
+        self.period_start_input.setDate(QDate.currentDate().addMonths(-1))
+        period_layout.addWidget(self.period_start_input)
+        
+        period_layout.addWidget(QLabel('по:'))
+        self.period_end_input = QDateEdit()
+        self.period_end_input.setCalendarPopup(True)
+        self.period_end_input.setDisplayFormat('yyyy-MM-dd')
+        self.period_end_input.setDate(QDate.currentDate())
+        period_layout.addWidget(self.period_end_input)
+        
+        btn_period_report = QPushButton('📆 Статистика за период')
+        btn_period_report.clicked.connect(self.generate_period_report)
+        period_layout.addWidget(btn_period_report)
+        period_layout.addStretch()
+        
+        layout.addLayout(period_layout)
+        
+        # Экспорт отчетов
+        export_layout = QHBoxLayout()
+        export_layout.addWidget(QLabel('Экспорт данных:'))
+        self.export_dataset_input = QComboBox()
+        self.export_dataset_input.addItems(['Тела', 'Санитарные проверки', 
+                                            'Сотрудники', 'Координации'])
+        export_layout.addWidget(self.export_dataset_input)
+        
+        btn_export_xlsx = QPushButton('💾 Экспорт в XLSX')
+        btn_export_xlsx.clicked.connect(lambda: self.start_export('xlsx'))
+        export_layout.addWidget(btn_export_xlsx)
+        
+        btn_export_pdf = QPushButton('💾 Экспорт в PDF')
+        btn_export_pdf.clicked.connect(lambda: self.start_export('pdf'))
+        export_layout.addWidget(btn_export_pdf)
+        export_layout.addStretch()
+        
+        layout.addLayout(export_layout)
+        
         # Область для вывода отчетов
         self.report_text = QTextEdit()
         self.report_text.setReadOnly(True)
@@ -510,11 +1713,34 @@ class MainWindow(QMainWindow):
         
         status_filter = self.status_filter.currentText()
         if status_filter == 'Все':
-            bodies = self.body_manager.list_bodies()
+            self.body_pages = self.body_manager.iter_pages(BODY_TABLE_PAGE_SIZE)
         else:
-            bodies = self.body_manager.list_bodies(status_filter)
+            self.body_pages = self.body_manager.iter_pages(BODY_TABLE_PAGE_SIZE, status_filter=status_filter)
         
-        for body in bodies:
+        self.load_next_body_page()
+        self.body_table.resizeColumnsToContents()
+    
+    def on_body_table_scrolled(self, value: int):
+        """Подгрузка следующей страницы при достижении конца таблицы"""
+        if self.body_pages is not None and value >= self.body_table.verticalScrollBar().maximum():
+            self.load_next_body_page()
+    
+    def fill_body_table(self):
+        """Подгрузка страниц, пока строки не заполнят видимую область таблицы
+        
+        Без полосы прокрутки следующую страницу нельзя запросить прокруткой.
+        """
+        if (self.body_pages is not None and self.body_table.isVisible()
+                and self.body_table.verticalScrollBar().maximum() == 0):
+            self.load_next_body_page()
+    
+    def load_next_body_page(self):
+        """Добавление в таблицу следующей страницы тел"""
+        page = next(self.body_pages, None)
+        if page is None or page.next_cursor is None:
+            self.body_pages = None
+        
+        for body in page or []:
             row = self.body_table.rowCount()
             self.body_table.insertRow(row)
             
@@ -524,19 +1750,43 @@ class MainWindow(QMainWindow):
             self.body_table.setItem(row, 1, QTableWidgetItem(body['full_name']))
             self.body_table.setItem(row, 2, QTableWidgetItem(body['arrival_date']))
             self.body_table.setItem(row, 3, QTableWidgetItem(body['source']))
-            self.body_table.setItem(row, 4, QTableWidgetItem(body['storage_location']))
+            self.body_table.setItem(row, 4, QTableWidgetItem(self.format_storage_place(body)))
             self.body_table.setItem(row, 5, QTableWidgetItem(body['status']))
             self.body_table.setItem(row, 6, QTableWidgetItem(documents))
             self.body_table.setItem(row, 7, QTableWidgetItem(body.get('notes', '')))
         
-        self.body_table.resizeColumnsToContents()
-        self.statusBar().showMessage(f'Загружено записей: {len(bodies)}')
+        loaded = self.body_table.rowCount()
+        more = ' (прокрутите вниз для загрузки)' if self.body_pages is not None else ''
+        self.statusBar().showMessage(f'Загружено записей: {loaded}{more}')
+        # Полоса прокрутки пересчитывается после обработки событий
+        if self.body_pages is not None:
+            QTimer.singleShot(0, self.fill_body_table)
     
     def refresh_sanitary_table(self):
         """Обновление таблицы санитарных проверок"""
         self.sanitary_table.setRowCount(0)
+        self.sanitary_pages = self.sanitary_control.iter_pages(SANITARY_TABLE_PAGE_SIZE)
+        self.load_next_sanitary_page()
+        self.sanitary_table.resizeColumnsToContents()
+    
+    def on_sanitary_table_scrolled(self, value: int):
+        """Подгрузка следующей страницы проверок при достижении конца таблицы"""
+        if self.sanitary_pages is not None and value >= self.sanitary_table.verticalScrollBar().maximum():
+            self.load_next_sanitary_page()
+    
+    def fill_sanitary_table(self):
+        """Подгрузка страниц проверок до заполнения видимой области таблицы"""
+        if (self.sanitary_pages is not None and self.sanitary_table.isVisible()
+                and self.sanitary_table.verticalScrollBar().maximum() == 0):
+            self.load_next_sanitary_page()
+    
+    def load_next_sanitary_page(self):
+        """Добавление в таблицу следующей страницы проверок"""
+        page = next(self.sanitary_pages, None)
+        if page is None or page.next_cursor is None:
+            self.sanitary_pages = None
         
-        for check in self.sanitary_control.checks:
+        for check in page or []:
             row = self.sanitary_table.rowCount()
             self.sanitary_table.insertRow(row)
             
@@ -545,12 +1795,15 @@ class MainWindow(QMainWindow):
             self.sanitary_table.setItem(row, 0, QTableWidgetItem(str(check['id'])))
             self.sanitary_table.setItem(row, 1, QTableWidgetItem(check['date']))
             self.sanitary_table.setItem(row, 2, QTableWidgetItem(check['check_type']))
-            self.sanitary_table.setItem(row, 3, QTableWidgetItem(str(check['temperature'])))
-            self.sanitary_table.setItem(row, 4, QTableWidgetItem(str(check['cleanliness_score'])))
-            self.sanitary_table.setItem(row, 5, QTableWidgetItem(check['inspector']))
-            self.sanitary_table.setItem(row, 6, QTableWidgetItem(violations))
-        
-        self.sanitary_table.resizeColumnsToContents()
+            self.sanitary_table.setItem(row, 3, QTableWidgetItem(check.get('chamber') or 'Все помещения'))
+            self.sanitary_table.setItem(row, 4, QTableWidgetItem(str(check['temperature'])))
+            cleanliness = check['cleanliness_score']
+            self.sanitary_table.setItem(row, 5, QTableWidgetItem(str(cleanliness) if cleanliness is not None else '—'))
+            self.sanitary_table.setItem(row, 6, QTableWidgetItem(check['inspector']))
+            self.sanitary_table.setItem(row, 7, QTableWidgetItem(violations))
+        
+        if self.sanitary_pages is not None:
+            QTimer.singleShot(0, self.fill_sanitary_table)
     
     def refresh_staff_table(self):
         """Обновление таблицы сотрудников"""
@@ -577,17 +1830,166 @@ class MainWindow(QMainWindow):
             row = self.coordination_table.rowCount()
             self.coordination_table.insertRow(row)
             
-            docs = ', '.join(coord.get('documents_needed', []))
+            needed = coord.get('documents_needed', [])
+            missing = outstanding_documents(coord)
+            docs = f"{len(needed) - len(missing)} из {len(needed)}"
+            if missing:
+                docs += f" (нет: {', '.join(missing)})"
+            # Связанное тело берется из индекса по ID
+            body = self.body_manager.get_body_by_id(coord['body_id'])
+            body_name = body['full_name'] if body else '—'
+            body_status = body['status'] if body else 'не найдено'
             
             self.coordination_table.setItem(row, 0, QTableWidgetItem(str(coord['id'])))
             self.coordination_table.setItem(row, 1, QTableWidgetItem(str(coord['body_id'])))
-            self.coordination_table.setItem(row, 2, QTableWidgetItem(coord['service_name']))
-            self.coordination_table.setItem(row, 3, QTableWidgetItem(coord['contact_person']))
-            self.coordination_table.setItem(row, 4, QTableWidgetItem(coord['planned_date']))
-            self.coordination_table.setItem(row, 5, QTableWidgetItem(coord['status']))
-            self.coordination_table.setItem(row, 6, QTableWidgetItem(docs))
+            self.coordination_table.setItem(row, 2, QTableWidgetItem(body_name))
+            self.coordination_table.setItem(row, 3, QTableWidgetItem(body_status))
+            self.coordination_table.setItem(row, 4, QTableWidgetItem(coord['service_name']))
+            self.coordination_table.setItem(row, 5, QTableWidgetItem(coord['contact_person']))
+            self.coordination_table.setItem(row, 6, QTableWidgetItem(coord['planned_date']))
+            self.coordination_table.setItem(row, 7, QTableWidgetItem(coord['status']))
+            self.coordination_table.setItem(row, 8, QTableWidgetItem(docs))
         
         self.coordination_table.resizeColumnsToContents()
+        self.refresh_release_summary()
+    
+    def refresh_release_summary(self):
+        """Сводка календаря выдач на сегодня"""
+        calendar = self.funeral_coordinator.calendar
+        today = datetime.date.today().strftime("%Y-%m-%d")
+        text = (f"Сегодня выдач: {calendar.booked(today)} из {calendar.capacity}, "
+                f"готовы к выдаче: {len(calendar.ready(today))}. "
+                f"Не хватает документов: {calendar.outstanding_total} "
+                f"в {calendar.incomplete} координациях")
+        overbooked = calendar.overbooked(today)
+        if overbooked:
+            text += f". ⚠️ Превышен лимит: {', '.join(overbooked)}"
+        self.release_summary_label.setText(text)
+    
+    def selected_coordination(self) -> Optional[Dict]:
+        """Координация выбранной строки таблицы"""
+        row = self.coordination_table.currentRow()
+        item = self.coordination_table.item(row, 0) if row >= 0 else None
+        if item is None:
+            QMessageBox.warning(self, 'Ошибка', 'Выберите координацию в таблице')
+            return None
+        return self.funeral_coordinator.get_coordination_by_id(int(item.text()))
+    
+    def mark_coordination_document(self):
+        """Отметка о получении документа по выбранной координации"""
+        coordination = self.selected_coordination()
+        if coordination is None:
+            return
+        missing = outstanding_documents(coordination)
+        if not missing:
+            QMessageBox.information(self, 'Документы', 'Все документы уже предоставлены')
+            return
+        document, ok = QInputDialog.getItem(self, 'Документ получен', 'Документ:', missing, 0, False)
+        if ok and self.funeral_coordinator.mark_document_provided(coordination['id'], document):
+            self.refresh_coordination_table()
+    
+    def confirm_release_booking(self, planned_date: str, coordination_id: int = None) -> bool:
+        """Предупреждение о записи сверх лимита дня"""
+        calendar = self.funeral_coordinator.calendar
+        if release_day(planned_date) is None:
+            QMessageBox.warning(self, 'Ошибка', 'Дата выдачи указывается в формате ГГГГ-ММ-ДД')
+            return False
+        if not calendar.booking_conflict(planned_date, coordination_id):
+            return True
+        booked = calendar.booked(release_day(planned_date))
+        reply = QMessageBox.question(
+            self, 'Лимит выдач',
+            f'На {release_day(planned_date)} уже запланировано выдач: {booked} (лимит {calendar.capacity}).\n'
+            'Все равно записать?',
+            QMessageBox.Yes | QMessageBox.No
+        )
+        return reply == QMessageBox.Yes
+    
+    def reschedule_coordination(self):
+        """Перенос выдачи по выбранной координации"""
+        coordination = self.selected_coordination()
+        if coordination is None:
+            return
+        planned_date, ok = QInputDialog.getText(self, 'Перенос выдачи', 'Новая дата (ГГГГ-ММ-ДД):',
+                                                QLineEdit.Normal, coordination['planned_date'])
+        planned_date = planned_date.strip()
+        if not ok or not self.confirm_release_booking(planned_date, coordination['id']):
+            return
+        self.funeral_coordinator.reschedule(coordination['id'], planned_date)
+        self.refresh_coordination_table()
+    
+    def change_coordination_status(self):
+        """Смена статуса выбранной координации"""
+        coordination = self.selected_coordination()
+        if coordination is None:
+            return
+        current = STATUSES.index(coordination['status']) if coordination['status'] in STATUSES else 0
+        status, ok = QInputDialog.getItem(self, 'Статус координации', 'Статус:', list(STATUSES), current, False)
+        if ok and status != coordination['status']:
+            if status == ACTIVE_STATUS and not self.confirm_release_booking(coordination['planned_date'],
+                                                                            coordination['id']):
+                return
+            self.funeral_coordinator.update_status(coordination['id'], status)
+            self.refresh_coordination_table()
+    
+    def show_release_calendar_dialog(self):
+        """Календарь выдач на две недели и готовые к выдаче сегодня"""
+        calendar = self.funeral_coordinator.calendar
+        dialog = QDialog(self)
+        dialog.setWindowTitle('Календарь выдач')
+        dialog.setModal(True)
+        dialog.resize(700, 550)
+        
+        layout = QVBoxLayout(dialog)
+        
+        today = datetime.date.today()
+        days = [(today + datetime.timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range(14)]
+        overview = {day["date"]: day for day in calendar.overview(days[0], days[-1])}
+        
+        table = QTableWidget()
+        table.setColumnCount(5)
+        table.setHorizontalHeaderLabels(['Дата', 'Записано', 'Свободно', 'Готовы', 'Нет документов'])
+        table.setRowCount(len(days))
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        for row, day in enumerate(days):
+            info = overview.get(day, {"booked": 0, "ready": 0, "outstanding_documents": 0})
+            values = [day, f"{info['booked']} из {calendar.capacity}", str(calendar.free(day)),
+                      str(info['ready']), str(info['outstanding_documents'])]
+            if info['booked'] > calendar.capacity:
+                values[2] = f"⚠️ перебор {info['booked'] - calendar.capacity}"
+            for column, value in enumerate(values):
+                table.setItem(row, column, QTableWidgetItem(value))
+        table.resizeColumnsToContents()
+        layout.addWidget(table)
+        
+        # Готовые к выдаче сегодня и ожидающие документы
+        lines = []
+        for title, coordination_ids in (('Готовы к выдаче сегодня', calendar.ready(days[0])),
+                                        ('Ждут документов', calendar.not_ready(days[0]))):
+            lines.append(f"{title}: {len(coordination_ids)}")
+            for coordination_id in coordination_ids:
+                coordination = self.funeral_coordinator.get_coordination_by_id(coordination_id)
+                body = self.body_manager.get_body_by_id(coordination['body_id'])
+                line = (f"  #{coordination_id} {body['full_name'] if body else '—'} — "
+                        f"{coordination['service_name']}")
+                missing = outstanding_documents(coordination)
+                if missing:
+                    line += f" (нет: {', '.join(missing)})"
+                lines.append(line)
+        undated = calendar.undated()
+        if undated:
+            lines.append(f"Без даты выдачи: {', '.join(f'#{coordination_id}' for coordination_id in undated)}")
+        
+        ready_text = QTextEdit()
+        ready_text.setReadOnly(True)
+        ready_text.setPlainText('\n'.join(lines))
+        layout.addWidget(ready_text)
+        
+        btn_close = QPushButton('Закрыть')
+        btn_close.clicked.connect(dialog.accept)
+        layout.addWidget(btn_close)
+        
+        dialog.exec_()
     
     def show_new_body_dialog(self):
         """Диалог регистрации нового тела"""
@@ -612,15 +2014,32 @@ class MainWindow(QMainWindow):
         self.body_source_input.addItems(['Больница', 'Полиция', 'СК', 'Частное лицо', 'Другое'])
         form_layout.addRow('Источник:', self.body_source_input)
         
+        # Место хранения: предлагается ближайшая свободная ячейка
+        storage = self.body_manager.storage
+        suggested_chamber, _ = storage.suggest_slot()
+        
         self.body_location_input = QComboBox()
-        self.body_location_input.addItems(['Холодильная камера 1', 'Холодильная камера 2', 
-                                          'Холодильная камера 3', 'Временное хранение'])
+        self.body_location_input.addItems(storage.chamber_names())
+        if suggested_chamber:
+            self.body_location_input.setCurrentText(suggested_chamber)
         form_layout.addRow('Место хранения:', self.body_location_input)
         
+        self.body_slot_input = QSpinBox()
+        form_layout.addRow('Ячейка:', self.body_slot_input)
+        
+        self.body_slot_info = QLabel()
+        form_layout.addRow('', self.body_slot_info)
+        
+        self.body_location_input.currentTextChanged.connect(self.update_slot_suggestion)
+        self.update_slot_suggestion(self.body_location_input.currentText())
+        
         self.body_docs_input = QTextEdit()
         self.body_docs_input.setMaximumHeight(80)
         form_layout.addRow('Документы (каждый с новой строки):', self.body_docs_input)
         
+        self.body_staff_input = self.create_staff_combo()
+        form_layout.addRow('Принял:', self.body_staff_input)
+        
         self.body_notes_input = QTextEdit()
         self.body_notes_input.setMaximumHeight(60)
         form_layout.addRow('Примечания:', self.body_notes_input)
@@ -640,12 +2059,54 @@ class MainWindow(QMainWindow):
         
         dialog.exec_()
     
+    def update_slot_suggestion(self, chamber: str):
+        """Подстановка ближайшей свободной ячейки выбранной камеры"""
+        storage = self.body_manager.storage
+        if chamber not in storage.capacities:
+            return
+        
+        capacity = storage.capacities[chamber]
+        free = capacity - storage.occupied_count[chamber]
+        slot = storage.first_free_slot(chamber)
+        
+        self.body_slot_input.setRange(1, max(capacity, 1))
+        if slot is not None:
+            self.body_slot_input.setValue(slot)
+            self.body_slot_info.setText(f'Свободно ячеек: {free} из {capacity}')
+        else:
+            other_chamber, other_slot = storage.suggest_slot()
+            if other_chamber:
+                self.body_slot_info.setText(f'Камера заполнена. Свободно: {other_chamber}, ячейка {other_slot}')
+            else:
+                self.body_slot_info.setText('Все камеры заполнены')
+    
+    def create_staff_combo(self, editable: bool = False) -> QComboBox:
+        """Выпадающий список сотрудников (данные элемента - ID сотрудника)"""
+        combo = QComboBox()
+        combo.setEditable(editable)
+        combo.addItem('—', None)
+        for employee in self.staff_manager.staff:
+            if employee.get('status') == 'активен':
+                combo.addItem(employee['full_name'], employee['id'])
+        return combo
+    
+    def link_inspectors(self):
+        """Привязка проверок без ID инспектора к сотрудникам по ФИО"""
+        for check in self.sanitary_control.checks:
+            if check.get('inspector_id') is None and check.get('inspector'):
+                check['inspector_id'] = self.staff_manager.find_employee_id(check['inspector'])
+    
+    def format_storage_place(self, body: Dict) -> str:
+        """Место хранения с номером ячейки"""
+        return reports.format_storage_place(body)
+    
     def save_new_body(self, dialog):
         """Сохранение нового тела"""
         name = self.body_name_input.text().strip()
         arrival = self.body_arrival_input.text().strip()
         source = self.body_source_input.currentText()
         location = self.body_location_input.currentText()
+        slot = self.body_slot_input.value()
         notes = self.body_notes_input.toPlainText().strip()
         
         docs_text = self.body_docs_input.toPlainText().strip()
@@ -655,12 +2116,41 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, 'Ошибка', 'Поле "ФИО" обязательно для заполнения')
             return
         
+        # Предупреждение о похожих записях с близкой датой поступления
+        duplicates = self.body_manager.find_duplicates(name, arrival)
+        if duplicates:
+            lines = [f"ID {body['id']}: {body['full_name']}, поступление {body['arrival_date']}, "
+                     f"{body['source']} (схожесть {score:.0%})"
+                     for body, score in duplicates[:5]]
+            answer = QMessageBox.question(
+                self, 'Возможный дубликат',
+                'Найдены похожие записи:\n\n' + '\n'.join(lines) + '\n\nВсе равно зарегистрировать?',
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+            )
+            if answer != QMessageBox.Yes:
+                return
+        
         body = self.body_manager.register_body(
-            name, arrival, source, location, documents, "поступило"
+            name, arrival, source, location, documents, "поступило", slot,
+            self.body_staff_input.currentData()
         )
         
         if body:
-            QMessageBox.information(self, 'Успешно', f'Тело зарегистрировано! ID: {body["id"]}')
+            # Занятая ячейка не мешает регистрации: тело получает ближайшую
+            # свободную ячейку камеры или регистрируется без ячейки
+            if body["storage_slot"] is None:
+                other_chamber, other_slot = self.body_manager.storage.suggest_slot()
+                hint = (f'Свободно: {other_chamber}, ячейка {other_slot}' if other_chamber
+                        else 'Все камеры заполнены')
+                QMessageBox.warning(self, 'Внимание',
+                                    f'Тело зарегистрировано без ячейки (ID: {body["id"]}): '
+                                    f'в "{location}" нет свободных ячеек. {hint}')
+            elif body["storage_slot"] != slot:
+                QMessageBox.warning(self, 'Внимание',
+                                    f'Тело зарегистрировано (ID: {body["id"]}), но ячейка {slot} '
+                                    f'в "{location}" занята: назначена ячейка {body["storage_slot"]}')
+            else:
+                QMessageBox.information(self, 'Успешно', f'Тело зарегистрировано! ID: {body["id"]}')
             dialog.accept()
             self.refresh_body_table()
     
@@ -681,7 +2171,7 @@ class MainWindow(QMainWindow):
         dialog = QDialog(self)
         dialog.setWindowTitle(f'Редактирование тела ID: {body_id}')
         dialog.setModal(True)
-        dialog.resize(400, 300)
+        dialog.resize(520, 560)
         
         layout = QVBoxLayout(dialog)
         
@@ -693,20 +2183,68 @@ class MainWindow(QMainWindow):
                            f'Текущий статус: {body["status"]}')
         form_layout.addRow('Информация:', info_label)
         
+        # Связанные координации с ритуальными службами
+        coordinations = self.funeral_coordinator.get_coordinations_for_body(body_id)
+        if coordinations:
+            coordination_lines = []
+            for coord in coordinations:
+                provided = len(coord.get('documents_provided', []))
+                needed = len(coord.get('documents_needed', []))
+                coordination_lines.append(
+                    f"{coord['service_name']} ({coord['contact_person']}, {coord['contact_phone']})\n"
+                    f"Дата: {coord['planned_date']}, статус: {coord['status']}, "
+                    f"документы: {provided} из {needed}"
+                )
+            coordination_label = QLabel('\n\n'.join(coordination_lines))
+        else:
+            coordination_label = QLabel('нет')
+        form_layout.addRow('Ритуальная служба:', coordination_label)
+        
         # Статус
         self.status_combo = QComboBox()
         self.status_combo.addItems(['поступило', 'подготовлено', 'выдано'])
         self.status_combo.setCurrentText(body['status'])
         form_layout.addRow('Новый статус:', self.status_combo)
         
+        self.edit_staff_input = self.create_staff_combo()
+        form_layout.addRow('Сотрудник:', self.edit_staff_input)
+        
         # Примечания
         self.edit_notes_input = QTextEdit()
         self.edit_notes_input.setPlainText(body.get('notes', ''))
         self.edit_notes_input.setMaximumHeight(100)
         form_layout.addRow('Примечания:', self.edit_notes_input)
         
+        # Вложения из электронного архива (миниатюры подгружаются в фоне)
+        self.attachment_list = QListWidget()
+        self.attachment_list.setViewMode(QListView.IconMode)
+        self.attachment_list.setIconSize(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        self.attachment_list.setResizeMode(QListView.Adjust)
+        self.attachment_list.setMaximumHeight(THUMBNAIL_SIZE + 60)
+        self.attachment_list.itemDoubleClicked.connect(self.open_attachment)
+        self.fill_attachment_list(body_id)
+        form_layout.addRow('Вложения:', self.attachment_list)
+        
+        btn_attach = QPushButton('📎 Прикрепить файлы')
+        btn_attach.clicked.connect(lambda: self.attach_files(body_id))
+        form_layout.addRow('', btn_attach)
+        
         layout.addLayout(form_layout)
         
+        # Документы по телу
+        document_layout = QHBoxLayout()
+        btn_acceptance = QPushButton('📄 Акт приема-передачи')
+        btn_acceptance.clicked.connect(lambda: self.create_document('acceptance', body_id))
+        btn_conclusion = QPushButton('🔬 Заключение')
+        btn_conclusion.clicked.connect(lambda: self.create_document('conclusion', body_id))
+        btn_release = QPushButton('📤 Акт выдачи')
+        btn_release.clicked.connect(lambda: self.create_document('release', body_id))
+        
+        document_layout.addWidget(btn_acceptance)
+        document_layout.addWidget(btn_conclusion)
+        document_layout.addWidget(btn_release)
+        layout.addLayout(document_layout)
+        
         # Кнопки
         button_layout = QHBoxLayout()
         btn_save = QPushButton('Сохранить')
@@ -719,13 +2257,77 @@ class MainWindow(QMainWindow):
         layout.addLayout(button_layout)
         
         dialog.exec_()
+        self.attachment_list = None
+    
+    def fill_attachment_list(self, body_id: int):
+        """Заполнение списка вложений карточки тела"""
+        self.attachment_list.clear()
+        file_icon = self.style().standardIcon(QStyle.SP_FileIcon)
+        for entry in self.document_archive.attachments(body_id):
+            item = QListWidgetItem(entry['title'])
+            item.setData(Qt.UserRole, entry['sha256'])
+            item.setData(Qt.UserRole + 1, entry['name'])
+            item.setToolTip(f"{entry['name']}, {entry['size'] // 1024} КБ, добавлен {entry['added']}")
+            
+            pixmap = self.thumbnail_cache.get(entry['sha256'])
+            item.setIcon(QIcon(pixmap) if pixmap is not None else file_icon)
+            if pixmap is None and DocumentArchive.is_image(entry):
+                self.request_thumbnail(entry['sha256'])
+            self.attachment_list.addItem(item)
+    
+    def request_thumbnail(self, digest: str):
+        """Постановка миниатюры в очередь пула потоков"""
+        if digest in self.thumbnail_pending:
+            return
+        self.thumbnail_pending.add(digest)
+        self.report_pool.start(ThumbnailTask(
+            digest, self.document_archive.object_path(digest),
+            self.document_archive.thumbnail_path(digest), self.thumbnail_signals
+        ))
+    
+    def on_thumbnail_ready(self, digest: str, image: QImage):
+        """Миниатюра готова: в кэш и в открытую карточку"""
+        self.thumbnail_pending.discard(digest)
+        if image.isNull():
+            return
+        pixmap = QPixmap.fromImage(image)
+        self.thumbnail_cache.put(digest, pixmap)
+        if self.attachment_list is None:
+            return
+        for row in range(self.attachment_list.count()):
+            item = self.attachment_list.item(row)
+            if item.data(Qt.UserRole) == digest:
+                item.setIcon(QIcon(pixmap))
+    
+    def attach_files(self, body_id: int):
+        """Прикрепление файлов к телу"""
+        paths, _ = QFileDialog.getOpenFileNames(self, 'Прикрепить документы', '',
+                                                'Изображения и документы (*.jpg *.jpeg *.png *.bmp *.tif *.tiff *.pdf);;Все файлы (*)')
+        if not paths:
+            return
+        
+        staff_id = self.edit_staff_input.currentData()
+        for path in paths:
+            try:
+                self.document_archive.attach(body_id, path, staff_id=staff_id)
+            except OSError as e:
+                QMessageBox.warning(self, 'Ошибка', f'Не удалось прикрепить {path}: {e}')
+        self.fill_attachment_list(body_id)
+    
+    def open_attachment(self, item):
+        """Открытие вложения во внешней программе"""
+        target = os.path.join(tempfile.gettempdir(), item.data(Qt.UserRole + 1))
+        self.document_archive.export(item.data(Qt.UserRole), target)
+        QDesktopServices.openUrl(QUrl.fromLocalFile(target))
     
     def save_body_edit(self, body_id, dialog):
         """Сохранение изменений тела"""
         new_status = self.status_combo.currentText()
         notes = self.edit_notes_input.toPlainText().strip()
         
-        if self.body_manager.update_body_status(body_id, new_status, notes):
+        staff_id = self.edit_staff_input.currentData()
+        
+        if self.body_manager.update_body_status(body_id, new_status, notes, staff_id):
             QMessageBox.information(self, 'Успешно', 'Статус обновлен')
             dialog.accept()
             self.refresh_body_table()
@@ -747,6 +2349,12 @@ class MainWindow(QMainWindow):
         self.check_type_input.addItems(['Ежедневная', 'Еженедельная', 'Внеплановая', 'Специальная'])
         form_layout.addRow('Тип проверки:', self.check_type_input)
         
+        self.check_chamber_input = QComboBox()
+        self.check_chamber_input.addItem('Все помещения', None)
+        for chamber in self.body_manager.storage.chamber_names():
+            self.check_chamber_input.addItem(chamber, chamber)
+        form_layout.addRow('Помещение:', self.check_chamber_input)
+        
         self.temperature_input = QDoubleSpinBox()
         self.temperature_input.setRange(-10, 30)
         self.temperature_input.setValue(4.0)
@@ -758,7 +2366,7 @@ class MainWindow(QMainWindow):
         self.cleanliness_input.setValue(8)
         form_layout.addRow('Оценка чистоты (1-10):', self.cleanliness_input)
         
-        self.inspector_input = QLineEdit()
+        self.inspector_input = self.create_staff_combo(editable=True)
         form_layout.addRow('Инспектор:', self.inspector_input)
         
         self.check_notes_input = QTextEdit()
@@ -784,7 +2392,9 @@ class MainWindow(QMainWindow):
         check_type = self.check_type_input.currentText()
         temperature = self.temperature_input.value()
         cleanliness = self.cleanliness_input.value()
-        inspector = self.inspector_input.text().strip()
+        inspector = self.inspector_input.currentText().strip()
+        if inspector == '—':
+            inspector = ''
         notes = self.check_notes_input.toPlainText().strip()
         
         if not inspector:
@@ -792,7 +2402,9 @@ class MainWindow(QMainWindow):
             return
         
         check = self.sanitary_control.record_check(
-            check_type, temperature, cleanliness, inspector, notes
+            check_type, temperature, cleanliness, inspector, notes,
+            self.staff_manager.find_employee_id(inspector),
+            self.check_chamber_input.currentData()
         )
         
         if check:
@@ -800,6 +2412,319 @@ class MainWindow(QMainWindow):
             dialog.accept()
             self.refresh_sanitary_table()
     
+    def current_minute(self) -> int:
+        """Текущее время в минутах (единицы колонок дат)"""
+        return parse_date(datetime.datetime.now().strftime("%Y-%m-%d %H:%M"))
+    
+    def on_sanitary_event(self, event: str, check: Dict):
+        """Сдвиг графика проверок и дорисовка графика температуры после новой проверки"""
+        if event == "check_recorded":
+            self.check_scheduler.on_check_recorded(check)
+            self.arm_schedule_timer()
+            self.append_chart_point(check)
+    
+    def arm_schedule_timer(self):
+        """Запуск таймера до ближайшего срока проверки"""
+        alert_time = self.check_scheduler.next_alert_time()
+        if alert_time is None:
+            self.schedule_timer.stop()
+            return
+        
+        now = datetime.datetime.now()
+        delay_ms = (alert_time - self.current_minute()) * 60000 - now.second * 1000
+        # Не более суток ожидания: по срабатыванию таймер просто перезапускается
+        self.schedule_timer.start(max(0, min(delay_ms, 24 * 60 * 60000)))
+    
+    def on_schedule_timer(self):
+        """Оповещение о просроченных проверках"""
+        overdue = self.check_scheduler.pop_overdue(self.current_minute())
+        if overdue:
+            lines = []
+            for item in overdue:
+                place = item['chamber'] or 'все помещения'
+                lines.append(f"{item['check_type']} проверка ({place}): срок {format_date(item['due'], with_time=True)}")
+            self.notify_user('Просроченные санитарные проверки', '\n'.join(lines))
+        self.arm_schedule_timer()
+    
+    def notify_user(self, title: str, message: str):
+        """Уведомление в системном трее (или в строке состояния)"""
+        if QSystemTrayIcon.isSystemTrayAvailable():
+            if self.tray_icon is None:
+                self.tray_icon = QSystemTrayIcon(self.windowIcon(), self)
+                self.tray_icon.show()
+            self.tray_icon.showMessage(title, message, QSystemTrayIcon.Warning)
+        self.statusBar().showMessage(f'⚠️ {title}: {message.splitlines()[0]}')
+    
+    def show_check_schedule(self):
+        """Отображение графика санитарных проверок"""
+        now = self.current_minute()
+        
+        report = "📅 ГРАФИК САНИТАРНЫХ ПРОВЕРОК\n"
+        report += "=" * 50 + "\n\n"
+        for row in self.check_scheduler.schedule_rows():
+            place = row['chamber'] or 'Все помещения'
+            mark = '⚠️ ПРОСРОЧЕНО' if row['due_minutes'] <= now else 'по графику'
+            report += f"  • {row['check_type']} — {place}\n"
+            report += f"    Срок: {row['due']} ({mark})\n"
+            report += f"    Последняя проверка: {row['last_check'] or 'не проводилась'}\n"
+        
+        self.report_text.setPlainText(report)
+        self.tab_widget.setCurrentIndex(4)
+    
+    def compact_check_history(self):
+        """Свертка старых проверок в дневные итоги"""
+        horizon, ok = QInputDialog.getInt(
+            self, 'Сжатие истории проверок',
+            'Свернуть в дневные итоги проверки старше (дней):\n'
+            'нарушения сохраняются полностью, итоги учитываются в отчетах',
+            check_rollups.DEFAULT_HORIZON_DAYS, 1, 3650
+        )
+        if not ok:
+            return
+        
+        count = self.sanitary_control.compact(horizon)
+        if count:
+            self.refresh_sanitary_table()
+            QMessageBox.information(
+                self, 'Сжатие истории',
+                f'Свернуто проверок: {count}\nДневных итогов: {len(self.sanitary_control.rollups)}'
+            )
+        else:
+            QMessageBox.information(self, 'Сжатие истории', f'Нет проверок старше {horizon} дн.')
+    
+    def telemetry_limits(self):
+        """Допустимый диапазон температуры в камерах"""
+        return self.telemetry_service.limits if self.telemetry_service else DEFAULT_LIMITS
+    
+    def chart_version(self, chamber: str) -> int:
+        """Версия данных графика: версия журнала проверок
+        
+        Показания датчиков в версию не входят: их версией служит конец
+        диапазона, округленный до RANGE_STEP_MS, поэтому новые показания
+        появляются на графике со сдвигом диапазона, а частые показания не
+        сбрасывают кэш изображений и дорисовку точек проверок.
+        """
+        return self.sanitary_control.version
+    
+    def on_tab_changed(self, index: int):
+        if self.tab_widget.widget(index) is self.chart_tab:
+            self.request_chart()
+        # Скрытая таблица не заполнялась: ее видимая область стала известна только сейчас
+        self.fill_body_table()
+        self.fill_sanitary_table()
+    
+    def request_chart(self):
+        """Показ графика из кэша или запуск отрисовки в пуле потоков"""
+        chamber = self.chart_chamber_combo.currentText()
+        if not chamber:
+            return
+        hours = charts.RANGES_HOURS[self.chart_range_combo.currentText()]
+        start_ms, end_ms = charts.range_bounds(hours, int(datetime.datetime.now().timestamp() * 1000))
+        key = (chamber, start_ms, end_ms, self.chart_version(chamber))
+        self.chart_key = key
+        
+        image = self.chart_cache.get_image(key)
+        if image is not None:
+            self.chart_label.setPixmap(QPixmap.fromImage(image))
+            return
+        if self.chart_pending == key:
+            return
+        
+        # Проверки берутся по индексу дат, показания датчиков читаются в потоке пула
+        start_date = datetime.datetime.fromtimestamp(start_ms / 1000).strftime('%Y-%m-%d')
+        end_date = datetime.datetime.fromtimestamp(end_ms / 1000).strftime('%Y-%m-%d')
+        points = charts.check_points(self.sanitary_control.checks_in_period(start_date, end_date),
+                                     chamber, start_ms, end_ms)
+        self.chart_pending = key
+        self.chart_stale = False
+        self.statusBar().showMessage('Построение графика температуры...')
+        self.report_pool.start(ChartTask(key, self.chart_cache, self.telemetry_store, self.telemetry_limits(),
+                                         points, False, self.chart_signals))
+    
+    def append_chart_point(self, check: Dict):
+        """Дорисовка точки новой проверки на открытом графике (blitting)"""
+        if self.chart_key is None or self.tab_widget.currentWidget() is not self.chart_tab:
+            return
+        chamber, start_ms, end_ms, _ = self.chart_key
+        points = charts.check_points([check], chamber, start_ms, end_ms)
+        if not points:
+            return
+        # Идет полная отрисовка без этой точки: повторим ее по готовности
+        if self.chart_pending is not None:
+            self.chart_stale = True
+            return
+        
+        # Фигура диапазона вытеснена из кэша - график строится заново
+        if self.chart_cache.existing_chart(chamber, start_ms, end_ms) is None:
+            self.request_chart()
+            return
+        
+        self.chart_key = (chamber, start_ms, end_ms, self.chart_version(chamber))
+        self.report_pool.start(ChartTask(self.chart_key, self.chart_cache, self.telemetry_store,
+                                         self.telemetry_limits(), points, True, self.chart_signals))
+    
+    def on_chart_ready(self, key: tuple, image: QImage):
+        """Готовое изображение графика: в кэш и на экран, если оно еще нужно"""
+        self.chart_cache.put_image(key, image)
+        if key == self.chart_pending:
+            self.chart_pending = None
+            self.statusBar().showMessage('График температуры построен')
+        if key == self.chart_key:
+            self.chart_label.setPixmap(QPixmap.fromImage(image))
+        if self.chart_stale and self.chart_pending is None:
+            self.request_chart()
+    
+    def on_chart_failed(self, key: tuple, error: str):
+        if key == self.chart_pending:
+            self.chart_pending = None
+        if key == self.chart_key:
+            self.chart_label.setText(error)
+    
+    def start_telemetry(self):
+        """Запуск приема показаний датчиков"""
+        try:
+            self.telemetry_service.start()
+        except OSError as e:
+            self.telemetry_service = None
+            self.statusBar().showMessage(f'Прием телеметрии недоступен: {e}')
+    
+    def on_telemetry_alert(self, chamber: str, temperature: float, ts: int):
+        """Автоматическая проверка с нарушением при выходе температуры из диапазона"""
+        low, high = self.telemetry_limits()
+        reading_time = datetime.datetime.fromtimestamp(ts / 1000).strftime('%Y-%m-%d %H:%M:%S')
+        
+        check = self.sanitary_control.record_check(
+            'Телеметрия', round(temperature, 1), None, 'Датчик температуры',
+            f'Автоматическая запись: показание датчика {reading_time}', None, chamber
+        )
+        self.sanitary_control.add_violation(
+            check['id'],
+            f'Температура {temperature:.1f}°C вне допустимого диапазона {low}–{high}°C',
+            'Проверить холодильное оборудование'
+        )
+        
+        self.refresh_sanitary_table()
+        self.notify_user('Нарушение температурного режима', 
+                         f'{chamber}: {temperature:.1f}°C ({reading_time})')
+    
+    def start_replication_service(self):
+        """Раздача своей ленты по TCP и таймер обмена (если настроены)"""
+        if self.replication_error:
+            self.statusBar().showMessage(f'Обмен с другими станциями отключен: {self.replication_error}')
+            return
+        listen = replication.listen_address(self.replication_config)
+        if listen:
+            try:
+                self.replication_server = replication.FeedServer(self.replicator.feed,
+                                                                 self.replication_config['token'], *listen)
+                self.replication_server.start()
+            except OSError as e:
+                self.replication_server = None
+                self.statusBar().showMessage(f'Раздача изменений недоступна: {e}')
+        if self.replication_transports:
+            self.replication_timer.start(self.replication_config.get('interval_seconds', 30) * 1000)
+    
+    def start_replication(self):
+        """Запуск обмена с другими станциями (не более одного одновременно)"""
+        if self.replication_running or not self.replication_transports:
+            return
+        self.replication_running = True
+        self.report_pool.start(ReplicationTask(self.replicator.feed, self.replication_transports,
+                                               dict(self.replicator.last_seen), self.replication_signals))
+    
+    def on_replication_pulled(self, entries):
+        """Применение полученных изменений"""
+        self.replication_running = False
+        conflicts = len(self.replicator.conflicts)
+        applied = self.replicator.apply(entries)
+        if len(self.replicator.conflicts) > conflicts:
+            self.notify_user('Конфликт данных между станциями',
+                             f'Не применено записей с ID, занятыми на этой станции: '
+                             f'{len(self.replicator.conflicts) - conflicts}. Проверьте, что '
+                             f'station_number в replication.json у станций разный; записи '
+                             f'сохранены в {self.replicator.state_file}')
+        if applied:
+            self.refresh_body_table()
+            self.refresh_sanitary_table()
+            self.refresh_staff_table()
+            self.refresh_coordination_table()
+            self.statusBar().showMessage(f'Получено изменений с других станций: {applied}')
+    
+    def on_replication_failed(self, error: str):
+        self.replication_running = False
+        self.statusBar().showMessage(f'Ошибка обмена с другими станциями: {error}')
+    
+    def start_latency_monitor(self):
+        """Запуск пульса цикла событий и потока наблюдения"""
+        self.latency_monitor.start()
+        self.latency_timer.start(self.latency_monitor.interval_ms)
+    
+    def show_latency_report(self):
+        """Отчет о задержках интерфейса (строится сразу - данных немного)"""
+        self.tab_widget.setCurrentIndex(4)
+        self.report_text.setPlainText(reports.ui_latency_report(
+            self.latency_monitor.summary(), self.latency_monitor.stall_handlers(),
+            self.latency_monitor.recent_stalls()
+        ))
+    
+    def on_site_selected(self, index: int):
+        """Переключение на выбранное отделение"""
+        name = self.site_combo.itemText(index)
+        if name != self.site['name']:
+            self.switch_site(name)
+    
+    def switch_site(self, name: str):
+        """Открытие окна другого отделения вместо текущего"""
+        # Порты приема телеметрии и раздачи изменений освобождаются до запуска нового окна
+        if self.telemetry_service is not None:
+            self.telemetry_service.stop()
+            self.telemetry_service = None
+        if self.replication_server is not None:
+            self.replication_server.stop()
+            self.replication_server = None
+        self.site_registry.select(name)
+        window = MainWindow(self.site_registry)
+        QApplication.instance().main_window = window
+        window.show()
+        self.close()
+    
+    def show_new_site_dialog(self):
+        """Добавление отделения с отдельным каталогом данных"""
+        name, ok = QInputDialog.getText(self, 'Новое отделение', 'Название отделения:')
+        if not ok or not name.strip():
+            return
+        
+        data_dir = QFileDialog.getExistingDirectory(self, 'Каталог данных отделения')
+        if not data_dir:
+            data_dir = os.path.join('sites', name.strip())
+        try:
+            site = self.site_registry.add_site(name, data_dir)
+        except (ValueError, OSError) as e:
+            QMessageBox.warning(self, 'Ошибка', str(e))
+            return
+        
+        self.site_combo.addItem(site['name'])
+        reply = QMessageBox.question(
+            self, 'Новое отделение',
+            f'Отделение «{site["name"]}» добавлено (данные: {site["data_dir"]}).\nПерейти к нему?',
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            self.switch_site(site['name'])
+    
+    def closeEvent(self, event):
+        """Остановка фоновых служб при закрытии окна"""
+        if self.telemetry_service is not None:
+            self.telemetry_service.stop()
+        if self.replication_server is not None:
+            self.replication_server.stop()
+        self.replication_timer.stop()
+        self.latency_timer.stop()
+        self.latency_monitor.stop()
+        self.report_pool.waitForDone()
+        report_engine.shutdown()
+        super().closeEvent(event)
+    
     def show_add_violation_dialog(self):
         """Диалог добавления нарушения"""
         selected = self.sanitary_table.selectedItems()
@@ -916,6 +2841,193 @@ class MainWindow(QMainWindow):
             dialog.accept()
             self.refresh_staff_table()
     
+    def show_shift_schedule_dialog(self):
+        """График смен на неделю: сотрудники по дням, кто на смене и непокрытые часы"""
+        dialog = QDialog(self)
+        dialog.setWindowTitle('График смен')
+        dialog.setModal(True)
+        dialog.resize(1000, 600)
+        
+        layout = QVBoxLayout(dialog)
+        
+        today = datetime.date.today()
+        self.shift_week_start = today - datetime.timedelta(days=today.weekday())
+        
+        toolbar = QHBoxLayout()
+        btn_previous = QPushButton('◀')
+        btn_previous.clicked.connect(lambda: self.shift_week_step(-7))
+        toolbar.addWidget(btn_previous)
+        self.shift_week_label = QLabel()
+        toolbar.addWidget(self.shift_week_label)
+        btn_next = QPushButton('▶')
+        btn_next.clicked.connect(lambda: self.shift_week_step(7))
+        toolbar.addWidget(btn_next)
+        toolbar.addStretch()
+        
+        toolbar.addWidget(QLabel('Покрытие должности:'))
+        self.shift_position_combo = QComboBox()
+        positions = sorted({employee['position'] for employee in self.staff_manager.staff})
+        self.shift_position_combo.addItems(positions or ['Патологоанатом'])
+        if 'Патологоанатом' in positions:
+            self.shift_position_combo.setCurrentText('Патологоанатом')
+        self.shift_position_combo.currentIndexChanged.connect(self.refresh_shift_week)
+        toolbar.addWidget(self.shift_position_combo)
+        layout.addLayout(toolbar)
+        
+        self.shift_table = QTableWidget()
+        self.shift_table.setColumnCount(7)
+        self.shift_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.shift_table)
+        
+        self.shift_on_duty_label = QLabel()
+        self.shift_on_duty_label.setWordWrap(True)
+        layout.addWidget(self.shift_on_duty_label)
+        self.shift_gaps_label = QLabel()
+        self.shift_gaps_label.setWordWrap(True)
+        layout.addWidget(self.shift_gaps_label)
+        
+        button_layout = QHBoxLayout()
+        btn_add = QPushButton('➕ Смена')
+        btn_add.clicked.connect(lambda: self.show_new_shift_dialog(dialog))
+        button_layout.addWidget(btn_add)
+        btn_remove = QPushButton('🗑 Удалить смену')
+        btn_remove.clicked.connect(lambda: self.remove_selected_shift(dialog))
+        button_layout.addWidget(btn_remove)
+        button_layout.addStretch()
+        btn_close = QPushButton('Закрыть')
+        btn_close.clicked.connect(dialog.accept)
+        button_layout.addWidget(btn_close)
+        layout.addLayout(button_layout)
+        
+        self.refresh_shift_week()
+        dialog.exec_()
+    
+    def shift_week_step(self, days: int):
+        self.shift_week_start += datetime.timedelta(days=days)
+        self.refresh_shift_week()
+    
+    def refresh_shift_week(self):
+        """Заполнение недели графика: запрос к дереву смен только за эту неделю"""
+        week_start = self.shift_week_start
+        days = [week_start + datetime.timedelta(days=offset) for offset in range(7)]
+        start = parse_date(week_start.strftime("%Y-%m-%d"))
+        end = start + 7 * MINUTES_PER_DAY
+        self.shift_week_label.setText(f'{days[0].strftime("%d.%m.%Y")} – {days[-1].strftime("%d.%m.%Y")}')
+        
+        week_shifts = self.staff_manager.schedules.in_period(start, end)
+        # Ячейка (сотрудник, день) -> части смен, попадающие на этот день
+        cells: Dict[tuple, List[str]] = {}
+        cell_shifts: Dict[tuple, List[int]] = {}
+        shift_staff = set()
+        for shift in week_shifts:
+            shift_staff.add(shift['staff_id'])
+            shift_start, shift_end = parse_date(shift['start']), parse_date(shift['end'])
+            for column in range(7):
+                day_start = start + column * MINUTES_PER_DAY
+                day_end = day_start + MINUTES_PER_DAY
+                if shift_start >= day_end or shift_end <= day_start:
+                    continue
+                part_start = max(shift_start, day_start) - day_start
+                part_end = min(shift_end, day_end) - day_start
+                text = (f"#{shift['id']} {part_start // 60:02d}:{part_start % 60:02d}–"
+                        f"{part_end // 60:02d}:{part_end % 60:02d}")
+                cells.setdefault((shift['staff_id'], column), []).append(text)
+                cell_shifts.setdefault((shift['staff_id'], column), []).append(shift['id'])
+        
+        employees = [employee for employee in self.staff_manager.staff
+                     if employee.get('status') == 'активен' or employee['id'] in shift_staff]
+        weekdays = ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс']
+        self.shift_table.setRowCount(len(employees))
+        self.shift_table.setHorizontalHeaderLabels(
+            [f'{weekdays[day.weekday()]} {day.strftime("%d.%m")}' for day in days])
+        self.shift_table.setVerticalHeaderLabels(
+            [f"{employee['full_name']} ({employee['position']})" for employee in employees])
+        for row, employee in enumerate(employees):
+            for column in range(7):
+                item = QTableWidgetItem('\n'.join(cells.get((employee['id'], column), [])))
+                item.setData(Qt.UserRole, cell_shifts.get((employee['id'], column), []))
+                self.shift_table.setItem(row, column, item)
+        self.shift_table.resizeRowsToContents()
+        
+        now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        on_duty = self.staff_manager.on_duty(now)
+        self.shift_on_duty_label.setText(
+            'На смене сейчас: ' + (', '.join(f"{employee['full_name']} ({employee['position']})"
+                                            for employee in on_duty) or 'никого'))
+        
+        position = self.shift_position_combo.currentText()
+        gaps = self.staff_manager.coverage_gaps(position, format_date(start, with_time=True),
+                                                format_date(end, with_time=True))
+        if gaps:
+            self.shift_gaps_label.setText(f'⚠️ Нет сотрудника «{position}» на смене: ' + '; '.join(gaps))
+        else:
+            self.shift_gaps_label.setText(f'✅ Должность «{position}» покрыта всю неделю')
+    
+    def show_new_shift_dialog(self, parent):
+        """Диалог новой смены"""
+        dialog = QDialog(parent)
+        dialog.setWindowTitle('Новая смена')
+        dialog.setModal(True)
+        dialog.resize(400, 200)
+        
+        layout = QVBoxLayout(dialog)
+        form_layout = QFormLayout()
+        
+        self.shift_staff_input = self.create_staff_combo()
+        form_layout.addRow('Сотрудник:', self.shift_staff_input)
+        
+        day = self.shift_week_start.strftime("%Y-%m-%d")
+        self.shift_start_input = QLineEdit(f"{day} 08:00")
+        form_layout.addRow('Начало (ГГГГ-ММ-ДД ЧЧ:ММ):', self.shift_start_input)
+        
+        self.shift_end_input = QLineEdit(f"{day} 20:00")
+        form_layout.addRow('Конец (ГГГГ-ММ-ДД ЧЧ:ММ):', self.shift_end_input)
+        
+        self.shift_notes_input = QLineEdit()
+        form_layout.addRow('Примечание:', self.shift_notes_input)
+        
+        layout.addLayout(form_layout)
+        
+        button_layout = QHBoxLayout()
+        btn_save = QPushButton('Сохранить')
+        btn_save.clicked.connect(lambda: self.save_new_shift(dialog))
+        btn_cancel = QPushButton('Отмена')
+        btn_cancel.clicked.connect(dialog.reject)
+        button_layout.addWidget(btn_save)
+        button_layout.addWidget(btn_cancel)
+        layout.addLayout(button_layout)
+        
+        dialog.exec_()
+    
+    def save_new_shift(self, dialog):
+        """Сохранение смены с проверкой пересечений"""
+        staff_id = self.shift_staff_input.currentData()
+        if staff_id is None:
+            QMessageBox.warning(dialog, 'Ошибка', 'Выберите сотрудника')
+            return
+        try:
+            self.staff_manager.add_shift(staff_id, self.shift_start_input.text().strip(),
+                                         self.shift_end_input.text().strip(),
+                                         self.shift_notes_input.text().strip())
+        except ValueError as error:
+            QMessageBox.warning(dialog, 'Ошибка', str(error))
+            return
+        dialog.accept()
+        self.refresh_shift_week()
+    
+    def remove_selected_shift(self, parent):
+        """Удаление смены из выбранной ячейки (ID уточняется, если смен несколько)"""
+        item = self.shift_table.currentItem()
+        shift_ids = (item.data(Qt.UserRole) if item is not None else None) or []
+        shift_id, ok = QInputDialog.getInt(parent, 'Удаление смены', 'ID смены:',
+                                           shift_ids[0] if shift_ids else 1, 1)
+        if not ok:
+            return
+        if self.staff_manager.remove_shift(shift_id) is None:
+            QMessageBox.warning(parent, 'Ошибка', f'Смена с ID {shift_id} не найдена')
+            return
+        self.refresh_shift_week()
+    
     def show_new_coordination_dialog(self):
         """Диалог новой координации"""
         dialog = QDialog(self)
@@ -929,7 +3041,8 @@ class MainWindow(QMainWindow):
         
         # ID тела
         self.coord_body_id_input = QSpinBox()
-        self.coord_body_id_input.setRange(1, 9999)
+        # ID станций чередуются (см. replication), поэтому верхняя граница - предел QSpinBox
+        self.coord_body_id_input.setRange(1, 2**31 - 1)
         form_layout.addRow('ID тела:', self.coord_body_id_input)
         
         # Ритуальная служба
@@ -990,6 +3103,9 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, 'Ошибка', f'Тело с ID {body_id} не найдено')
             return
         
+        if not self.confirm_release_booking(planned_date):
+            return
+        
         coordination = self.funeral_coordinator.register_coordination(
             body_id, service, contact_person, phone, planned_date, documents_needed
         )
@@ -1001,153 +3117,351 @@ class MainWindow(QMainWindow):
     
     def generate_bodies_report(self):
         """Генерация отчета по телам"""
-        bodies = self.body_manager.list_bodies()
-        
-        report = "📊 ОТЧЕТ ПО ТЕЛАМ\n"
+        self.request_report('bodies', (), (self.body_manager.version,), self.prepare_bodies_report)
+    
+    def prepare_bodies_report(self):
+        """Данные отчета по телам: снимок и последние поступления по индексу дат"""
+        recent_bodies = list(next(self.body_manager.iter_pages(10, 'registration_date', descending=True), []))
+        return reports.bodies_report, (self.body_manager.snapshot(), recent_bodies)
+    
+    def generate_sanitary_report(self):
+        """Генерация отчета по санитарным проверкам"""
+        self.request_report('sanitary', (), (self.sanitary_control.version,), self.prepare_sanitary_report)
+    
+    def prepare_sanitary_report(self):
+        """Данные отчета по проверкам: снимок и последние 10 проверок"""
+        recent_checks = list(next(self.sanitary_control.iter_pages(10, 'date', descending=True), []))
+        return reports.sanitary_report, (self.sanitary_control.snapshot(), recent_checks,
+                                         self.sanitary_control.history_totals())
+    
+    def generate_storage_report(self):
+        """Отчет по загруженности холодильных камер"""
+        report = "🧊 ЗАГРУЖЕННОСТЬ ХОЛОДИЛЬНЫХ КАМЕР\n"
         report += "=" * 50 + "\n\n"
-        
-        report += f"Всего тел в системе: {len(bodies)}\n"
         report += f"Дата генерации: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n"
         
-        # Статистика по статусам
-        statuses = {}
-        for body in bodies:
-            status = body['status']
-            statuses[status] = statuses.get(status, 0) + 1
-        
-        report += "📈 СТАТИСТИКА ПО СТАТУСАМ:\n"
-        for status, count in statuses.items():
-            report += f"  • {status}: {count} тел\n"
-        
-        report += "\n📋 ПОСЛЕДНИЕ 10 ПОСТУПЛЕНИЙ:\n"
-        recent_bodies = sorted(bodies, key=lambda x: x.get('registration_date', ''), reverse=True)[:10]
+        total_capacity = 0
+        total_occupied = 0
+        for chamber in self.body_manager.storage.load_report():
+            total_capacity += chamber['capacity']
+            total_occupied += chamber['occupied']
+            report += f"  • {chamber['name']}: занято {chamber['occupied']} из {chamber['capacity']} "
+            report += f"({chamber['load']:.1f}%), свободно {chamber['free']}\n"
         
-        for body in recent_bodies:
-            report += f"\nID: {body['id']}\n"
-            report += f"  ФИО: {body['full_name']}\n"
-            report += f"  Дата поступления: {body['arrival_date']}\n"
-            report += f"  Статус: {body['status']}\n"
-            report += f"  Место хранения: {body['storage_location']}\n"
+        total_load = (total_occupied / total_capacity * 100) if total_capacity > 0 else 0
+        report += f"\n📊 ВСЕГО: занято {total_occupied} из {total_capacity} ({total_load:.1f}%)\n"
         
         self.report_text.setPlainText(report)
-        self.tab_widget.setCurrentIndex(4)  # Переход на вкладку отчетов
+        self.tab_widget.setCurrentIndex(4)
     
-    def generate_sanitary_report(self):
-        """Генерация отчета по санитарным проверкам"""
-        checks = self.sanitary_control.checks
+    def generate_staff_report(self):
+        """Аналитика по работе сотрудников (по накопленным итогам)"""
+        month = datetime.datetime.now().strftime("%Y-%m")
+        rows = self.staff_analytics.report_rows(self.staff_manager.staff, month)
         
-        report = "🧼 ОТЧЕТ ПО САНИТАРНЫМ ПРОВЕРКАМ\n"
+        report = "👥 АНАЛИТИКА ПО РАБОТЕ СОТРУДНИКОВ\n"
         report += "=" * 50 + "\n\n"
-        
-        report += f"Всего проверок: {len(checks)}\n"
         report += f"Дата генерации: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n"
         
-        # Последние 10 проверок
-        recent_checks = sorted(checks, key=lambda x: x['date'], reverse=True)[:10]
+        for row in rows:
+            cleanliness = row['average_cleanliness']
+            cleanliness_text = f"{cleanliness:.1f}/10" if cleanliness is not None else "—"
+            report += f"ID: {row['id']} — {row['full_name']} ({row['position']})\n"
+            report += f"  Проведено проверок: {row['checks']}\n"
+            report += f"  Выявлено нарушений: {row['violations']}\n"
+            report += f"  Средняя оценка чистоты: {cleanliness_text}\n"
+            report += f"  Операций с телами: {row['body_operations']} (за {month}: {row['period_operations']})\n\n"
         
-        report += "📋 ПОСЛЕДНИЕ 10 ПРОВЕРОК:\n"
-        for check in recent_checks:
-            report += f"\nID: {check['id']}\n"
-            report += f"  Дата: {check['date']}\n"
-            report += f"  Тип: {check['check_type']}\n"
-            report += f"  Температура: {check['temperature']}°C\n"
-            report += f"  Оценка чистоты: {check['cleanliness_score']}/10\n"
-            report += f"  Инспектор: {check['inspector']}\n"
-            report += f"  Нарушений: {len(check.get('violations', []))}\n"
-        
-        # Статистика по нарушениям
-        total_violations = sum(len(check.get('violations', [])) for check in checks)
-        report += f"\n⚠️ ВСЕГО НАРУШЕНИЙ: {total_violations}\n"
+        unassigned = self.staff_analytics.unassigned
+        if unassigned.checks:
+            report += f"⚠️ Проверок без привязки к сотруднику: {unassigned.checks}\n"
         
         self.report_text.setPlainText(report)
         self.tab_widget.setCurrentIndex(4)
     
+    def get_data_versions(self) -> tuple:
+        """Версии данных всех менеджеров"""
+        return (self.body_manager.version, self.sanitary_control.version,
+                self.staff_manager.version, self.funeral_coordinator.version)
+    
+    def generate_duplicates_report(self):
+        """Отчет о возможных дубликатах по всему реестру"""
+        self.request_report(
+            'duplicates', (), (self.body_manager.version,),
+            lambda: (reports.duplicates_report, (self.body_manager.snapshot(),))
+        )
+    
+    def generate_network_report(self):
+        """Сводный отчет за сегодня по всем отделениям"""
+        today = datetime.datetime.now().strftime("%Y-%m-%d")
+        site_list = [dict(site) for site in self.site_registry.sites]
+        # Версии - подписи файлов отделений: данные других отделений
+        # меняются вне этого окна
+        versions = tuple(sites.file_signature(site['data_dir']) for site in site_list)
+        self.request_report(
+            'network', (today,), versions,
+            lambda: (sites.network_daily_report, (site_list, today, self.site_summary_cache))
+        )
+    
     def show_statistics(self):
         """Показать общую статистику"""
-        bodies_count = len(self.body_manager.bodies)
-        checks_count = len(self.sanitary_control.checks)
-        staff_count = len(self.staff_manager.staff)
-        coord_count = len(self.funeral_coordinator.coordinations)
-        
-        # Статистика по статусам тел
-        status_stats = {}
-        for body in self.body_manager.bodies:
-            status = body['status']
-            status_stats[status] = status_stats.get(status, 0) + 1
-        
-        report = "📈 ОБЩАЯ СТАТИСТИКА\n"
-        report += "=" * 50 + "\n\n"
+        self.request_report('statistics', (), self.get_data_versions(), self.prepare_statistics)
+    
+    def prepare_statistics(self):
+        """Данные общей статистики: снимок тел, копии колонок дат и сводка сжатой истории"""
+        history = self.sanitary_control.history_totals()
+        return reports.statistics_report, (
+            self.body_manager.snapshot(),
+            len(self.sanitary_control.checks) + history['checks'],
+            len(self.staff_manager.staff),
+            len(self.funeral_coordinator.coordinations),
+            self.body_manager.date_columns.snapshot(('arrival_date', 'release_date', 'registration_date')),
+            self.sanitary_control.date_columns.snapshot(),
+            history['first_date']
+        )
+    
+    def generate_daily_report(self):
+        """Генерация ежедневного отчета"""
+        today = datetime.datetime.now().strftime("%Y-%m-%d")
+        self.request_report(
+            'daily', (today,),
+            (self.body_manager.version, self.sanitary_control.version),
+            lambda: self.prepare_daily_report(today)
+        )
+    
+    def prepare_daily_report(self, today: str):
+        """Данные ежедневного отчета по индексам дат"""
+        return reports.daily_report, (
+            today,
+            self.body_manager.bodies_in_period('arrival_date', today, today),
+            self.sanitary_control.checks_in_period(today, today)
+        )
+    
+    def request_report(self, report_type: str, params: tuple, versions: tuple, prepare):
+        """Показ отчета из кэша или запуск построения в пуле потоков
         
-        report += f"📊 ОСНОВНЫЕ ПОКАЗАТЕЛИ:\n"
-        report += f"  • Зарегистрировано тел: {bodies_count}\n"
-        report += f"  • Проведено санитарных проверок: {checks_count}\n"
-        report += f"  • Сотрудников в системе: {staff_count}\n"
-        report += f"  • Координаций с ритуальными службами: {coord_count}\n\n"
+        prepare выполняется в потоке интерфейса и возвращает функцию построения
+        и ее аргументы: снимки и выборки по индексам, снятые на версиях versions.
+        """
+        self.tab_widget.setCurrentIndex(4)  # Переход на вкладку отчетов
+        self.requested_report = (report_type, params, versions)
         
-        report += "📋 СТАТУСЫ ТЕЛ:\n"
-        for status, count in status_stats.items():
-            percentage = (count / bodies_count * 100) if bodies_count > 0 else 0
-            report += f"  • {status}: {count} ({percentage:.1f}%)\n"
+        report = self.report_cache.get(report_type, params, versions)
+        if report is not None:
+            self.report_text.setPlainText(report)
+            return
         
-        report += f"\n📅 СИСТЕМА АКТИВНА С: {self.get_system_start_date()}\n"
+        self.report_text.setPlainText('⏳ Формирование отчета...')
+        if self.requested_report in self.report_tasks:
+            return
         
-        self.report_text.setPlainText(report)
-        self.tab_widget.setCurrentIndex(4)
+        builder, args = prepare()
+        task = ReportTask(report_type, params, versions, builder, args)
+        task.signals.finished.connect(self.on_report_finished)
+        task.signals.failed.connect(self.on_report_failed)
+        # Пул забирает задачу себе, поэтому хранится объект сигналов
+        self.report_tasks[self.requested_report] = task.signals
+        self.report_pool.start(task)
     
-    def generate_daily_report(self):
-        """Генерация ежедневного отчета"""
-        today = datetime.datetime.now().strftime("%Y-%m-%d")
+    def on_report_finished(self, report_type: str, params: tuple, versions: tuple, report: str):
+        """Отчет построен: сохранение в кэш и показ, если он еще ожидается"""
+        self.report_tasks.pop((report_type, params, versions), None)
+        self.report_cache.put(report_type, params, versions, report)
+        if self.requested_report == (report_type, params, versions):
+            self.report_text.setPlainText(report)
+    
+    def on_report_failed(self, report_type: str, error: str):
+        """Ошибка построения отчета"""
+        for key in [key for key in self.report_tasks if key[0] == report_type]:
+            del self.report_tasks[key]
+        QMessageBox.warning(self, 'Ошибка', f'Не удалось построить отчет: {error}')
+    
+    def get_export_dataset(self, dataset: str):
+        """Заголовок, колонки и записи для выбранного набора данных"""
+        # Тела и проверки экспортируются по снимку: изменения во время
+        # экспорта заменяют записи копиями и не затрагивают снимок
+        if dataset == 'Тела':
+            return ('Реестр тел', report_export.BODY_EXPORT_COLUMNS,
+                    self.body_manager.snapshot())
+        if dataset == 'Санитарные проверки':
+            return ('Санитарные проверки', report_export.CHECK_EXPORT_COLUMNS,
+                    self.sanitary_control.snapshot())
+        # Копируется только список ссылок на записи, чтобы регистрация
+        # новых записей во время экспорта не меняла итерируемый список
+        if dataset == 'Сотрудники':
+            return ('Сотрудники', report_export.STAFF_EXPORT_COLUMNS,
+                    list(self.staff_manager.staff))
+        return ('Координации с ритуальными службами', report_export.COORDINATION_EXPORT_COLUMNS,
+                list(self.funeral_coordinator.coordinations))
+    
+    def start_export(self, export_format: str):
+        """Запуск экспорта в фоновом потоке"""
+        if self.export_thread is not None:
+            QMessageBox.warning(self, 'Внимание', 'Экспорт уже выполняется')
+            return
         
-        # Тела, поступившие сегодня
-        todays_bodies = [b for b in self.body_manager.bodies 
-                        if b['arrival_date'].startswith(today)]
+        dataset = self.export_dataset_input.currentText()
+        title, columns, records = self.get_export_dataset(dataset)
         
-        # Проверки за сегодня
-        todays_checks = [c for c in self.sanitary_control.checks 
-                        if c['date'].startswith(today)]
+        default_name = f"{title}_{datetime.datetime.now().strftime('%Y-%m-%d')}.{export_format}"
+        file_filter = 'Excel (*.xlsx)' if export_format == 'xlsx' else 'PDF (*.pdf)'
+        path, _ = QFileDialog.getSaveFileName(self, 'Экспорт отчета', default_name, file_filter)
+        if not path:
+            return
         
-        report = f"📅 ЕЖЕДНЕВНЫЙ ОТЧЕТ НА {today}\n"
-        report += "=" * 50 + "\n\n"
+        self.export_progress = QProgressDialog(f'Экспорт: {title}', 'Отмена', 0, 100, self)
+        self.export_progress.setWindowTitle('Экспорт отчета')
+        self.export_progress.setWindowModality(Qt.NonModal)
+        self.export_progress.setAutoClose(False)
+        self.export_progress.setAutoReset(False)
+        
+        self.export_thread = QThread(self)
+        self.export_worker = ExportWorker(export_format, path, title, columns, records)
+        self.export_worker.moveToThread(self.export_thread)
+        
+        self.export_thread.started.connect(self.export_worker.run)
+        self.export_worker.progress.connect(self.export_progress.setValue)
+        self.export_worker.finished.connect(self.on_export_finished)
+        self.export_worker.failed.connect(self.on_export_failed)
+        self.export_worker.cancelled.connect(self.on_export_cancelled)
+        # Флаг отмены выставляется напрямую, так как поток занят экспортом
+        self.export_progress.canceled.connect(self.export_worker.cancel, Qt.DirectConnection)
+        
+        self.export_progress.show()
+        self.export_thread.start()
+        self.statusBar().showMessage(f'Экспорт запущен: {path}')
+    
+    def finish_export(self):
+        """Остановка потока экспорта и закрытие индикатора"""
+        self.export_progress.close()
+        self.export_thread.quit()
+        self.export_thread.wait()
+        self.export_thread = None
+        self.export_worker = None
+    
+    def on_export_finished(self, path: str, written: int):
+        """Экспорт завершен"""
+        self.finish_export()
+        self.statusBar().showMessage(f'Экспортировано строк: {written} в {path}')
+        QMessageBox.information(self, 'Успешно', f'Отчет сохранен: {path}')
+    
+    def on_export_failed(self, error: str):
+        """Ошибка экспорта"""
+        self.finish_export()
+        QMessageBox.warning(self, 'Ошибка', f'Не удалось выполнить экспорт: {error}')
+    
+    def on_export_cancelled(self):
+        """Экспорт отменен"""
+        self.finish_export()
+        self.statusBar().showMessage('Экспорт отменен')
+    
+    def document_context(self, kind: str, body: Dict) -> Dict:
+        """Данные документа: тело, его координация и ответственный сотрудник"""
+        coordination = None
+        if body.get('funeral_service') is not None:
+            coordination = self.funeral_coordinator.get_coordination_by_id(body['funeral_service'])
+        staff_id = documents.responsible_staff_id(kind, body)
+        staff = self.staff_manager.get_employee_by_id(staff_id) if staff_id is not None else None
+        return documents.document_context(kind, body, coordination, staff, self.format_storage_place(body))
+    
+    def create_document(self, kind: str, body_id: int):
+        """Формирование документа по одному телу"""
+        body = self.body_manager.get_body_by_id(body_id)
+        if body is None:
+            return
         
-        report += f"📊 СВОДКА ЗА ДЕНЬ:\n"
-        report += f"  • Поступило тел: {len(todays_bodies)}\n"
-        report += f"  • Проведено проверок: {len(todays_checks)}\n\n"
+        default_name = documents.document_file_name(kind, body)
+        path, _ = QFileDialog.getSaveFileName(self, documents.DOCUMENT_KINDS[kind], default_name, 'PDF (*.pdf)')
+        if not path:
+            return
         
-        if todays_bodies:
-            report += "📋 ТЕЛА, ПОСТУПИВШИЕ СЕГОДНЯ:\n"
-            for body in todays_bodies:
-                report += f"  • ID: {body['id']}, ФИО: {body['full_name']}, Источник: {body['source']}\n"
-        else:
-            report += "📋 ТЕЛА, ПОСТУПИВШИЕ СЕГОДНЯ: нет\n"
+        self.start_documents([(kind, self.document_context(kind, body), path)], path)
+    
+    def generate_release_acts(self):
+        """Акты выдачи для всех тел, выданных сегодня"""
+        today = datetime.datetime.now().strftime("%Y-%m-%d")
+        released = self.body_manager.bodies_in_period('release_date', today, today)
+        if not released:
+            QMessageBox.information(self, 'Информация', 'Сегодня тела не выдавались')
+            return
         
-        if todays_checks:
-            report += "\n🧼 ПРОВЕРКИ ЗА СЕГОДНЯ:\n"
-            for check in todays_checks:
-                violations = len(check.get('violations', []))
-                report += f"  • {check['date'][11:]}, Тип: {check['check_type']}, Нарушений: {violations}\n"
+        directory = QFileDialog.getExistingDirectory(self, 'Каталог для актов выдачи')
+        if not directory:
+            return
         
-        self.report_text.setPlainText(report)
-        self.tab_widget.setCurrentIndex(4)
+        jobs = [('release', self.document_context('release', body),
+                 os.path.join(directory, documents.document_file_name('release', body)))
+                for body in released]
+        self.start_documents(jobs, directory)
     
-    def get_system_start_date(self):
-        """Получение даты начала работы системы"""
-        dates = []
+    def start_documents(self, jobs, target: str):
+        """Запуск формирования документов в фоновом потоке"""
+        if self.document_thread is not None:
+            QMessageBox.warning(self, 'Внимание', 'Документы уже формируются')
+            return
         
-        if self.body_manager.bodies:
-            dates.extend([b.get('registration_date', '') for b in self.body_manager.bodies])
-        if self.sanitary_control.checks:
-            dates.extend([c['date'] for c in self.sanitary_control.checks])
+        self.document_thread = QThread(self)
+        self.document_worker = DocumentWorker(jobs, target)
+        self.document_worker.moveToThread(self.document_thread)
         
-        if dates:
-            valid_dates = [d for d in dates if d]
-            if valid_dates:
-                return min(valid_dates)[:10]
+        self.document_thread.started.connect(self.document_worker.run)
+        self.document_worker.finished.connect(self.on_documents_finished)
+        self.document_worker.failed.connect(self.on_documents_failed)
         
-        return datetime.datetime.now().strftime("%Y-%m-%d")
+        self.document_thread.start()
+        self.statusBar().showMessage(f'Формирование документов: {len(jobs)}')
+    
+    def finish_documents(self):
+        """Остановка потока формирования документов"""
+        self.document_thread.quit()
+        self.document_thread.wait()
+        self.document_thread = None
+        self.document_worker = None
+    
+    def on_documents_finished(self, count: int, target: str):
+        """Документы сформированы"""
+        self.finish_documents()
+        self.statusBar().showMessage(f'Сформировано документов: {count} ({target})')
+        QMessageBox.information(self, 'Успешно', f'Сформировано документов: {count}\n{target}')
+    
+    def on_documents_failed(self, error: str):
+        """Ошибка формирования документов"""
+        self.finish_documents()
+        QMessageBox.warning(self, 'Ошибка', f'Не удалось сформировать документы: {error}')
+    
+    def generate_period_report(self):
+        """Генерация статистики за выбранный период"""
+        start = self.period_start_input.date().toString('yyyy-MM-dd')
+        end = self.period_end_input.date().toString('yyyy-MM-dd')
+        if start > end:
+            QMessageBox.warning(self, 'Ошибка', 'Дата начала периода позже даты окончания')
+            return
+        
+        self.request_report(
+            'period', (start, end),
+            (self.body_manager.version, self.sanitary_control.version),
+            lambda: self.prepare_period_report(start, end)
+        )
+    
+    def prepare_period_report(self, start: str, end: str):
+        """Данные статистики за период по индексам дат"""
+        released_positions = self.body_manager.date_columns.positions_in_period('release_date', start, end)
+        columns = self.body_manager.date_columns
+        arrival_column = columns.column('arrival_date')
+        release_column = columns.column('release_date')
+        return reports.period_report, (
+            start, end,
+            self.body_manager.bodies_in_period('arrival_date', start, end),
+            array('q', (arrival_column[i] for i in released_positions)),
+            array('q', (release_column[i] for i in released_positions)),
+            self.sanitary_control.checks_in_period(start, end),
+            self.sanitary_control.history_totals(start, end)
+        )
     
     def create_test_data(self):
-        """Создание тестовых данных при первом запуске"""
-        if not os.path.exists("bodies.json"):
+        """Создание тестовых данных при первом запуске (только для основного отделения)"""
+        is_default_site = self.site['data_dir'] == sites.DEFAULT_SITE['data_dir']
+        if is_default_site and not os.path.exists(self.site_path('bodies')):
             # Тестовые тела
             test_bodies = [
                 {
@@ -1192,14 +3506,24 @@ class MainWindow(QMainWindow):
 
 def main():
     """Запуск приложения"""
+    # Процессы пула отчетов в сборке PyInstaller запускаются тем же exe
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
     
+    # Недоступный формат хранения обнаруживается до открытия данных, а не при первом сохранении
+    try:
+        storage_codecs.get_codec(STORAGE_CODEC)
+    except ValueError as e:
+        QMessageBox.critical(None, 'Формат хранения', f"MORGUE_STORAGE_CODEC={STORAGE_CODEC}: {e}")
+        sys.exit(1)
+    
     # Установка иконки приложения
     app.setWindowIcon(QIcon.fromTheme('applications-science'))
     
-    window = MainWindow()
-    window.show()
+    # Ссылка на окно хранится в приложении: при смене отделения окно заменяется
+    app.main_window = MainWindow()
+    app.main_window.show()
     
     sys.exit(app.exec_())
 
@@ -0,0 +1,126 @@
+import base64
+import bisect
+import json
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Постраничная выдача записей менеджеров с курсором продолжения.
+# Порядок задается либо естественным порядком списка (по ID), либо
+# отсортированным индексом дат (date_columns.SortedDateIndex). Курсор -
+# непрозрачная строка с ключом сортировки, значением и ID последней записи,
+# поэтому продолжение начинается бисекцией, без перебора пройденных записей.
+
+DEFAULT_PAGE_SIZE = 100
+
+class InvalidCursor(ValueError):
+    """Курсор поврежден или выдан для другого порядка сортировки"""
+
+class Page:
+    """Страница записей и курсор следующей страницы (None - страниц больше нет)"""
+    
+    def __init__(self, items: List[Dict], next_cursor: Optional[str]):
+        self.items = items
+        self.next_cursor = next_cursor
+    
+    def __iter__(self):
+        return iter(self.items)
+    
+    def __len__(self):
+        return len(self.items)
+
+def encode_cursor(sort_key: str, descending: bool, value: int, record_id: int) -> str:
+    """Кодирование позиции продолжения"""
+    raw = json.dumps([sort_key, descending, value, record_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor: str, sort_key: str, descending: bool):
+    """Разбор курсора: (значение ключа, ID записи)"""
+    try:
+        key, cursor_descending, value, record_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    if key != sort_key or cursor_descending != descending:
+        raise InvalidCursor(cursor)
+    return value, record_id
+
+def iter_pages(records: List[Dict],
+               positions: Dict[int, int],
+               page_size: int = DEFAULT_PAGE_SIZE,
+               sort_key: str = "id",
+               index=None,
+               cursor: Optional[str] = None,
+               predicate: Callable[[Dict], bool] = None,
+               descending: bool = False) -> Iterator[Page]:
+    """Генератор страниц записей
+    
+    records - список записей менеджера, positions - индекс ID -> позиция,
+    index - отсортированный индекс дат для sort_key (None для сортировки по ID).
+    """
+    if index is None:
+        keys = None
+        count = len(records)
+    else:
+        keys = index.keys
+        count = len(index)
+    
+    # Позиция в порядке обхода, с которой продолжается выдача
+    if cursor is None:
+        start = count - 1 if descending else 0
+    else:
+        value, record_id = decode_cursor(cursor, sort_key, descending)
+        position = positions.get(record_id)
+        if keys is None:
+            # Запись могла исчезнуть (сжатие истории): ищем по ID бисекцией
+            if position is None:
+                ids = _IdView(records)
+                position = bisect.bisect_right(ids, record_id) - (1 if descending else 0)
+                start = position
+            else:
+                start = position - 1 if descending else position + 1
+        else:
+            start = _resume_in_index(index, value, position, descending)
+    
+    step = -1 if descending else 1
+    items = []
+    i = start
+    while 0 <= i < count:
+        position = i if keys is None else index.positions[i]
+        record = records[position]
+        i += step
+        if predicate is not None and not predicate(record):
+            continue
+        items.append(record)
+        if len(items) == page_size:
+            if not 0 <= i < count:
+                break
+            value = 0 if keys is None else keys[i - step]
+            yield Page(items, encode_cursor(sort_key, descending, value, record["id"]))
+            items = []
+    if items:
+        yield Page(items, None)
+
+def _resume_in_index(index, value: int, position: Optional[int], descending: bool) -> int:
+    """Следующий элемент индекса после пары (значение, позиция)
+    
+    Записи с одинаковым значением упорядочены в индексе по позиции, поэтому
+    продолжение внутри них ищется бисекцией (позиция None - запись исчезла).
+    """
+    low, high = index.run(value)
+    if descending:
+        if position is None:
+            return high - 1
+        return bisect.bisect_left(index.positions, position, low, high) - 1
+    if position is None:
+        return high
+    return bisect.bisect_right(index.positions, position, low, high)
+
+class _IdView:
+    """Последовательность ID записей (для bisect по списку, упорядоченному по ID)"""
+    
+    def __init__(self, records: List[Dict]):
+        self.records = records
+    
+    def __len__(self):
+        return len(self.records)
+    
+    def __getitem__(self, index: int) -> int:
+        return self.records[index]["id"]
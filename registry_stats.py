@@ -0,0 +1,103 @@
+import datetime
+from array import array
+from collections import Counter
+from typing import Dict, Optional, Sequence
+
+from date_columns import MINUTES_PER_DAY, NO_DATE
+
+# Статистика по колонкам дат реестра (см. date_columns).
+# Если установлен numpy, колонки оборачиваются без копирования
+# (np.frombuffer) и считаются векторно; иначе - одним проходом на Python.
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PERCENTILES = (25, 50, 75, 90)
+
+def percentile(sorted_values: Sequence[float], percent: float) -> float:
+    """Перцентиль с линейной интерполяцией (как numpy.percentile)"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
+def storage_durations_days(arrival: array, release: array):
+    """Сроки хранения выданных тел в днях"""
+    if np is not None and len(arrival):
+        arrival_values = np.frombuffer(arrival, dtype=np.int64)
+        release_values = np.frombuffer(release, dtype=np.int64)
+        mask = (arrival_values != NO_DATE) & (release_values != NO_DATE) & (release_values >= arrival_values)
+        return (release_values[mask] - arrival_values[mask]) / MINUTES_PER_DAY
+    
+    return [(released - arrived) / MINUTES_PER_DAY
+            for arrived, released in zip(arrival, release)
+            if arrived != NO_DATE and released != NO_DATE and released >= arrived]
+
+def storage_duration_stats(arrival: array, release: array) -> Dict:
+    """Средний, медианный срок хранения и перцентили (в днях)"""
+    return duration_summary(storage_durations_days(arrival, release))
+
+def duration_summary(durations) -> Dict:
+    """Сводка по срокам хранения (список или массив numpy)"""
+    count = len(durations)
+    if count == 0:
+        return {"count": 0, "mean": 0.0, "min": 0.0, "max": 0.0,
+                "percentiles": {p: 0.0 for p in PERCENTILES}}
+    
+    if np is not None and not isinstance(durations, list):
+        values = np.percentile(durations, PERCENTILES)
+        return {
+            "count": int(count),
+            "mean": float(durations.mean()),
+            "min": float(durations.min()),
+            "max": float(durations.max()),
+            "percentiles": {p: float(v) for p, v in zip(PERCENTILES, values)}
+        }
+    
+    durations.sort()
+    return {
+        "count": count,
+        "mean": sum(durations) / count,
+        "min": durations[0],
+        "max": durations[-1],
+        "percentiles": {p: percentile(durations, p) for p in PERCENTILES}
+    }
+
+def period_key(day: int, period: str = "month") -> str:
+    """Ключ периода для порядкового номера дня"""
+    date = datetime.date.fromordinal(day)
+    if period == "day":
+        return date.strftime("%Y-%m-%d")
+    if period == "year":
+        return str(date.year)
+    return date.strftime("%Y-%m")
+
+def counts_per_period(column: array, period: str = "month") -> Dict[str, int]:
+    """Количество событий (поступлений, выдач) по периодам"""
+    if np is not None and len(column):
+        values = np.frombuffer(column, dtype=np.int64)
+        days, counts = np.unique(values[values != NO_DATE] // MINUTES_PER_DAY, return_counts=True)
+        day_counts = zip(days.tolist(), counts.tolist())
+    else:
+        day_counts = Counter(value // MINUTES_PER_DAY for value in column if value != NO_DATE).items()
+    
+    # Сначала группировка по дням, затем ключ периода считается один раз на день
+    result = Counter()
+    for day, count in day_counts:
+        result[period_key(day, period)] += count
+    return dict(sorted(result.items()))
+
+def earliest(column: array) -> Optional[int]:
+    """Самая ранняя дата в колонке"""
+    if np is not None and len(column):
+        values = np.frombuffer(column, dtype=np.int64)
+        values = values[values != NO_DATE]
+        return int(values.min()) if values.size else None
+    
+    values = [value for value in column if value != NO_DATE]
+    return min(values) if values else None
@@ -0,0 +1,148 @@
+import bisect
+from typing import Dict, List, Optional, Set, Tuple
+
+from date_columns import NO_DATE, format_date, parse_date
+
+# Календарь выдач тел по координациям с ритуальными службами. Действующие
+# координации раскладываются по дню planned_date; для каждого дня
+# поддерживаются число записей, число координаций с полным комплектом
+# документов (готовы к выдаче) и число недостающих документов. Счетчики
+# меняются при каждом изменении координации, поэтому загрузка дня,
+# превышение лимита и список "готовы к выдаче сегодня" отвечаются без
+# обхода координаций, а календарь за период - бисекцией по дням.
+
+# Выдач в день по умолчанию
+DEFAULT_DAILY_CAPACITY = 8
+
+# Координации с этим статусом занимают место в календаре
+ACTIVE_STATUS = "в процессе"
+COMPLETED_STATUS = "завершено"
+CANCELLED_STATUS = "отменено"
+STATUSES = (ACTIVE_STATUS, COMPLETED_STATUS, CANCELLED_STATUS)
+
+def release_day(planned_date: Optional[str]) -> Optional[str]:
+    """День выдачи ГГГГ-ММ-ДД (None - дата не указана или не разобрана)"""
+    minutes = parse_date((planned_date or "")[:10])
+    if minutes == NO_DATE:
+        return None
+    return format_date(minutes)
+
+def outstanding_documents(coordination: Dict) -> List[str]:
+    """Необходимые документы, которые еще не предоставлены"""
+    provided = set(coordination.get("documents_provided", []))
+    return [document for document in coordination.get("documents_needed", []) if document not in provided]
+
+class ReleaseCalendar:
+    """Индекс действующих координаций по дню выдачи со счетчиками документов"""
+    
+    def __init__(self, capacity: int = DEFAULT_DAILY_CAPACITY):
+        self.capacity = capacity
+        # Отсортированные дни, на которые есть записи
+        self.days: List[str] = []
+        # День -> {ID координации: недостающих документов}
+        self.by_day: Dict[str, Dict[int, int]] = {}
+        self.ready_by_day: Dict[str, Set[int]] = {}
+        self.outstanding_by_day: Dict[str, int] = {}
+        # ID координации -> (день или None, недостающих документов)
+        self.entries: Dict[int, Tuple[Optional[str], int]] = {}
+        # Итоги по всем действующим координациям
+        self.outstanding_total = 0
+        self.incomplete = 0
+    
+    def add(self, coordination: Dict):
+        """Учет координации (не действующие не учитываются)"""
+        if coordination["status"] != ACTIVE_STATUS:
+            return
+        day = release_day(coordination.get("planned_date"))
+        missing = len(outstanding_documents(coordination))
+        self.entries[coordination["id"]] = (day, missing)
+        self.outstanding_total += missing
+        if missing:
+            self.incomplete += 1
+        if day is None:
+            return
+        
+        bookings = self.by_day.get(day)
+        if bookings is None:
+            bookings = self.by_day[day] = {}
+            self.ready_by_day[day] = set()
+            self.outstanding_by_day[day] = 0
+            bisect.insort(self.days, day)
+        bookings[coordination["id"]] = missing
+        self.outstanding_by_day[day] += missing
+        if not missing:
+            self.ready_by_day[day].add(coordination["id"])
+    
+    def remove(self, coordination_id: int):
+        """Снятие координации с учета"""
+        entry = self.entries.pop(coordination_id, None)
+        if entry is None:
+            return
+        day, missing = entry
+        self.outstanding_total -= missing
+        if missing:
+            self.incomplete -= 1
+        if day is None:
+            return
+        
+        bookings = self.by_day[day]
+        del bookings[coordination_id]
+        self.ready_by_day[day].discard(coordination_id)
+        self.outstanding_by_day[day] -= missing
+        if not bookings:
+            del self.by_day[day]
+            del self.ready_by_day[day]
+            del self.outstanding_by_day[day]
+            self.days.pop(bisect.bisect_left(self.days, day))
+    
+    def update(self, coordination: Dict):
+        """Пересчет координации после изменения"""
+        self.remove(coordination["id"])
+        self.add(coordination)
+    
+    def booked(self, day: str) -> int:
+        """Число выдач, запланированных на день"""
+        return len(self.by_day.get(day, ()))
+    
+    def free(self, day: str) -> int:
+        """Свободные места дня (отрицательное значение - перебор)"""
+        return self.capacity - self.booked(day)
+    
+    def booking_conflict(self, planned_date: str, coordination_id: int = None) -> bool:
+        """Запись на день превысит лимит (при переносе своя запись не считается)"""
+        day = release_day(planned_date)
+        if day is None:
+            return False
+        bookings = self.by_day.get(day, {})
+        return len(bookings) - (coordination_id in bookings) >= self.capacity
+    
+    def ready(self, day: str) -> List[int]:
+        """ID координаций дня с полным комплектом документов"""
+        return sorted(self.ready_by_day.get(day, ()))
+    
+    def not_ready(self, day: str) -> List[int]:
+        """ID координаций дня, по которым не хватает документов"""
+        ready = self.ready_by_day.get(day, set())
+        return sorted(coordination_id for coordination_id in self.by_day.get(day, ())
+                      if coordination_id not in ready)
+    
+    def overview(self, start_day: str, end_day: str) -> List[Dict]:
+        """Загрузка дней периода (ГГГГ-ММ-ДД включительно), на которые есть записи"""
+        low = bisect.bisect_left(self.days, start_day)
+        high = bisect.bisect_right(self.days, end_day)
+        return [{
+            "date": day,
+            "booked": len(self.by_day[day]),
+            "capacity": self.capacity,
+            "ready": len(self.ready_by_day[day]),
+            "outstanding_documents": self.outstanding_by_day[day]
+        } for day in self.days[low:high]]
+    
+    def overbooked(self, start_day: str = None) -> List[str]:
+        """Дни с числом выдач больше лимита"""
+        low = bisect.bisect_left(self.days, start_day) if start_day else 0
+        return [day for day in self.days[low:] if len(self.by_day[day]) > self.capacity]
+    
+    def undated(self) -> List[int]:
+        """ID действующих координаций без разобранной даты выдачи"""
+        return sorted(coordination_id for coordination_id, (day, _) in self.entries.items() if day is None)
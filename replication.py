@@ -0,0 +1,410 @@
+import hmac
+import json
+import os
+import socket
+import socketserver
+import threading
+import uuid
+from array import array
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+# Репликация данных между рабочими станциями через ленту изменений.
+# Каждое изменение в менеджерах (событие из их listeners) дописывается
+# строкой JSON в журнал changes.jsonl станции с возрастающим номером seq.
+# Станция запоминает последний примененный номер каждой станции-источника
+# и запрашивает только более новые записи, поэтому объем и время обмена
+# зависят от числа изменений, а не от размера реестров. Повторно
+# полученная запись пропускается по номеру - применение идемпотентно.
+# Смещения строк журнала индексируются, поэтому выборка "после seq"
+# читает с диска только новые строки.
+#
+# Транспорт:
+#   DirectoryTransport - общий сетевой каталог, в котором у каждой станции
+#                        свой файл ленты <ID станции>.jsonl;
+#   SocketTransport    - запрос ленты у FeedServer других станций по TCP.
+# Лента содержит персональные данные, поэтому FeedServer отвечает только
+# на запросы с общим для станций токеном (token в replication.json) и по
+# умолчанию слушает только 127.0.0.1; адрес в сети задается явно.
+# Станция передает только собственные изменения (полученные не
+# пересылаются), поэтому каждая станция должна опрашивать все остальные.
+#
+# Записи передаются целиком и применяются как вставка или замена по ID
+# (побеждает последнее примененное изменение). Пространства ID станций не
+# пересекаются: станция с номером station_number из station_count
+# назначает новым записям только ID, у которых ID % station_count ==
+# station_number % station_count (наименьший такой ID после наибольшего
+# известного), поэтому одновременная регистрация на разных станциях не
+# дает одинаковых ID, а ID остаются небольшими целыми числами. Каждая
+# запись хранит станцию-автора (поле station); запись другой станции с
+# занятым ID (одинаковые номера станций в настройках) не заменяет
+# местную, а откладывается в conflicts состояния репликации. Занятая на этой станции ячейка хранения
+# назначается полученному телу заново. Полученные смены персонала не
+# проверяются на пересечения. Сжатие истории проверок (checks_compacted)
+# не реплицируется - каждая станция сжимает свою; изменения проверок,
+# уже сжатых на этой станции, в журнал не возвращаются.
+
+# События менеджеров, передаваемые другим станциям
+REPLICATED_EVENTS = {
+    "body_registered", "body_updated", "coordination_linked",
+    "check_recorded", "violation_added",
+    "employee_added", "shift_added", "shift_removed",
+    "coordination_registered", "coordination_updated",
+}
+
+# Пространство ID без обмена: (номер станции, число станций)
+LOCAL_ID_SPACE = (0, 1)
+
+# Число записей ленты в одном ответе
+PULL_BATCH = 1000
+SOCKET_TIMEOUT = 10.0
+# Адрес FeedServer, если в настройках указан только порт
+DEFAULT_LISTEN_HOST = '127.0.0.1'
+# Наибольшая длина строки запроса к FeedServer
+MAX_REQUEST_BYTES = 64 * 1024
+
+class ReplicationConflict(Exception):
+    """ID полученной записи занят на этой станции записью другой станции"""
+
+def check_conflict(existing: Optional[Dict], incoming: Dict):
+    """ReplicationConflict, если запись с тем же ID создана другой станцией"""
+    if existing is not None and existing.get("station") != incoming.get("station"):
+        raise ReplicationConflict(f"ID {incoming['id']} занят записью другой станции")
+
+def next_record_id(after: int, space: Tuple[int, int] = LOCAL_ID_SPACE) -> int:
+    """Наименьший ID станции больше after"""
+    number, count = space
+    candidate = after + 1
+    return candidate + (number - candidate) % count
+
+def encode_entry(entry: Dict) -> bytes:
+    return (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+
+class ChangeFeed:
+    """Журнал изменений станции: строки JSON с индексом смещений по seq"""
+    
+    def __init__(self, path: str, origin: str = None):
+        self.path = path
+        self.origin = origin
+        self.lock = threading.Lock()
+        # offsets[seq - 1] - смещение строки записи с номером seq
+        self.offsets = array('q')
+        self.end = 0
+        self.refresh()
+    
+    @property
+    def last_seq(self) -> int:
+        return len(self.offsets)
+    
+    def refresh(self):
+        """Индексация строк, дописанных с прошлого раза (в том числе другой станцией)"""
+        if not os.path.exists(self.path):
+            return
+        with self.lock, open(self.path, 'rb') as f:
+            f.seek(self.end)
+            for line in f:
+                # Незавершенная строка - запись прервана или еще идет
+                if not line.endswith(b'\n'):
+                    break
+                self.offsets.append(self.end)
+                self.end += len(line)
+    
+    def write(self, entries: List[Dict]):
+        """Дописывание записей в журнал (вызывается под self.lock)"""
+        with open(self.path, 'ab') as f:
+            # Отбрасываем хвост прерванной записи
+            if f.tell() != self.end:
+                f.truncate(self.end)
+            for entry in entries:
+                raw = encode_entry(entry)
+                f.write(raw)
+                self.offsets.append(self.end)
+                self.end += len(raw)
+    
+    def append(self, collection: str, event: str, record: Dict) -> Dict:
+        """Новая запись о локальном изменении"""
+        with self.lock:
+            entry = {"seq": self.last_seq + 1, "origin": self.origin,
+                     "collection": collection, "event": event, "record": record}
+            self.write([entry])
+        return entry
+    
+    def extend(self, entries: List[Dict]):
+        """Копирование записей другой ленты с сохранением номеров"""
+        with self.lock:
+            entries = [entry for entry in entries if entry["seq"] > self.last_seq]
+            if entries and entries[0]["seq"] != self.last_seq + 1:
+                raise ValueError(f"Пропуск в ленте {self.path}: после {self.last_seq} идет {entries[0]['seq']}")
+            self.write(entries)
+    
+    def since(self, seq: int, limit: int = PULL_BATCH) -> List[Dict]:
+        """Записи с номерами больше seq (не более limit)"""
+        with self.lock:
+            if seq >= self.last_seq:
+                return []
+            count = min(limit, self.last_seq - seq)
+            with open(self.path, 'rb') as f:
+                f.seek(self.offsets[seq])
+                return [json.loads(f.readline()) for _ in range(count)]
+
+class Replicator:
+    """Запись локальных изменений в ленту и применение изменений других станций"""
+    
+    def __init__(self, feed_file: str, state_file: str, id_space: Tuple[int, int] = LOCAL_ID_SPACE):
+        self.state_file = state_file
+        self.id_space = id_space
+        state = self.load_state()
+        self.station_id: str = state.get("station_id") or uuid.uuid4().hex
+        # Станция-источник -> последний примененный seq
+        self.last_seen: Dict[str, int] = state.get("last_seen", {})
+        # Записи, не примененные из-за совпадения ID (с описанием в error)
+        self.conflicts: List[Dict] = state.get("conflicts", [])
+        self.feed = ChangeFeed(feed_file, self.station_id)
+        self.targets: Dict[str, object] = {}
+        self.applying = False
+        if not state:
+            self.save_state()
+    
+    def load_state(self) -> Dict:
+        if os.path.exists(self.state_file):
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+    
+    def save_state(self):
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump({"station_id": self.station_id, "last_seen": self.last_seen,
+                       "conflicts": self.conflicts}, f, ensure_ascii=False, indent=2)
+    
+    def track(self, collection: str, manager):
+        """Подписка на изменения менеджера (manager.apply_replicated применяет чужие)
+        
+        Новые записи менеджера получают ID станции в поле station и ID из
+        пространства станции.
+        """
+        manager.station_id = self.station_id
+        manager.id_space = self.id_space
+        manager.add_listener(partial(self.on_change, collection))
+        self.targets[collection] = manager
+    
+    def on_change(self, collection: str, event: str, record: Dict):
+        # Полученные изменения не записываются в собственную ленту
+        if self.applying or event not in REPLICATED_EVENTS:
+            return
+        self.feed.append(collection, event, record)
+    
+    def apply(self, entries: List[Dict]) -> int:
+        """Применение записей других станций по порядку, возвращает число примененных
+        
+        Записи с занятым другой станцией ID не применяются и добавляются в conflicts.
+        """
+        applied = 0
+        received = False
+        # Файлы данных менеджеров сохраняются один раз на пакет записей
+        touched = []
+        for entry in entries:
+            origin = entry["origin"]
+            if origin == self.station_id or entry["seq"] <= self.last_seen.get(origin, 0):
+                continue
+            if entry["seq"] != self.last_seen.get(origin, 0) + 1:
+                # Пропуск в ленте: остальное будет запрошено заново
+                continue
+            manager = self.targets.get(entry["collection"])
+            if manager is not None:
+                self.applying = True
+                try:
+                    manager.apply_replicated(entry["event"], entry["record"], save=False)
+                    applied += 1
+                except ReplicationConflict as e:
+                    self.conflicts.append(dict(entry, error=str(e)))
+                finally:
+                    self.applying = False
+                if manager not in touched:
+                    touched.append(manager)
+            else:
+                applied += 1
+            self.last_seen[origin] = entry["seq"]
+            received = True
+        for manager in touched:
+            manager.save_data()
+        if received:
+            self.save_state()
+        return applied
+    
+    def sync(self, transport) -> int:
+        """Полный цикл обмена в текущем потоке (для тестов и сценариев)"""
+        transport.push(self.feed)
+        return self.apply(transport.pull(dict(self.last_seen)))
+
+class DirectoryTransport:
+    """Обмен через общий каталог"""
+    
+    def __init__(self, root: str, station_id: str):
+        self.root = root
+        self.station_id = station_id
+        os.makedirs(root, exist_ok=True)
+        # Станция -> лента в общем каталоге (индекс смещений накапливается)
+        self.feeds: Dict[str, ChangeFeed] = {}
+    
+    def peer_feed(self, origin: str) -> ChangeFeed:
+        feed = self.feeds.get(origin)
+        if feed is None:
+            feed = self.feeds[origin] = ChangeFeed(os.path.join(self.root, f"{origin}.jsonl"), origin)
+        else:
+            feed.refresh()
+        return feed
+    
+    def push(self, feed: ChangeFeed):
+        """Копирование новых локальных записей в свой файл общего каталога"""
+        mirror = self.peer_feed(self.station_id)
+        while True:
+            entries = feed.since(mirror.last_seq)
+            if not entries:
+                break
+            mirror.extend(entries)
+    
+    def pull(self, last_seen: Dict[str, int]) -> List[Dict]:
+        """Новые записи всех остальных станций"""
+        entries = []
+        for name in sorted(os.listdir(self.root)):
+            origin, extension = os.path.splitext(name)
+            if extension != '.jsonl' or origin == self.station_id:
+                continue
+            feed = self.peer_feed(origin)
+            seq = last_seen.get(origin, 0)
+            while True:
+                batch = feed.since(seq)
+                if not batch:
+                    break
+                entries.extend(batch)
+                seq = batch[-1]["seq"]
+        return entries
+
+def token_matches(request: Dict, token: str) -> bool:
+    """Токен запроса совпадает с токеном станции (сравнение за постоянное время)"""
+    received = request.get("token") if isinstance(request, dict) else None
+    return isinstance(received, str) and hmac.compare_digest(received.encode('utf-8'), token.encode('utf-8'))
+
+class FeedRequestHandler(socketserver.StreamRequestHandler):
+    """Ответ на запрос {"token": ..., "since": {станция: seq}}: записи ленты строками JSON
+    
+    Запрос без верного токена или неразобранный закрывается без ответа.
+    """
+    
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline(MAX_REQUEST_BYTES) or b'{}')
+        except ValueError:
+            return
+        if not token_matches(request, self.server.token):
+            return
+        feed: ChangeFeed = self.server.feed
+        seq = request.get("since", {}).get(feed.origin, 0)
+        for entry in feed.since(seq, request.get("limit", PULL_BATCH)):
+            self.wfile.write(encode_entry(entry))
+
+class FeedServer(socketserver.ThreadingTCPServer):
+    """Раздача ленты станции другим станциям по TCP"""
+    
+    daemon_threads = True
+    allow_reuse_address = True
+    
+    def __init__(self, feed: ChangeFeed, token: str, host: str = DEFAULT_LISTEN_HOST, port: int = 0):
+        if not token:
+            raise ValueError("FeedServer требует токен")
+        super().__init__((host, port), FeedRequestHandler)
+        self.feed = feed
+        self.token = token
+        self.thread: Optional[threading.Thread] = None
+    
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.server_address[:2]
+    
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, name='replication', daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+class SocketTransport:
+    """Запрос лент у FeedServer других станций"""
+    
+    def __init__(self, peers: List[Tuple[str, int]], token: str, timeout: float = SOCKET_TIMEOUT):
+        self.peers = peers
+        self.token = token
+        self.timeout = timeout
+    
+    def push(self, feed: ChangeFeed):
+        """Своя лента раздается FeedServer - передавать нечего"""
+    
+    def fetch(self, peer: Tuple[str, int], since: Dict[str, int]) -> List[Dict]:
+        with socket.create_connection(peer, timeout=self.timeout) as connection:
+            connection.sendall(encode_entry({"token": self.token, "since": since, "limit": PULL_BATCH}))
+            with connection.makefile('rb') as stream:
+                return [json.loads(line) for line in stream]
+    
+    def pull(self, last_seen: Dict[str, int]) -> List[Dict]:
+        """Новые записи всех станций (недоступные станции пропускаются)"""
+        entries = []
+        for peer in self.peers:
+            since = dict(last_seen)
+            while True:
+                try:
+                    batch = self.fetch(peer, since)
+                except OSError:
+                    break
+                entries.extend(batch)
+                if len(batch) < PULL_BATCH:
+                    break
+                since[batch[-1]["origin"]] = batch[-1]["seq"]
+        return entries
+
+def load_config(path: str) -> Dict:
+    """Настройки репликации отделения (файла нет - обмен выключен)
+    
+    {"station_number": 1, "station_count": 3, "directory": "//server/share/morgue",
+     "listen": ["192.168.1.10", 8766], "peers": [["192.168.1.20", 8766]],
+     "token": "<общий для станций секрет>", "interval_seconds": 30}
+    
+    "listen": 8766 (только порт) - раздача на 127.0.0.1.
+    """
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+def check_config(config: Dict) -> Tuple[int, int]:
+    """Проверка настроек, возвращает пространство ID станции
+    
+    ValueError - номер станции не задан или неверен, обмен по TCP без токена.
+    """
+    if not (config.get("directory") or config.get("peers") or config.get("listen")):
+        return LOCAL_ID_SPACE
+    number, count = config.get("station_number"), config.get("station_count")
+    if not isinstance(number, int) or not isinstance(count, int) or not 1 <= number <= count:
+        raise ValueError("в replication.json нужно указать station_number от 1 до station_count "
+                         "(у каждой станции свой номер)")
+    if (config.get("peers") or config.get("listen")) and not config.get("token"):
+        raise ValueError("для обмена по сети в replication.json нужен общий для станций token")
+    return number, count
+
+def listen_address(config: Dict) -> Optional[Tuple[str, int]]:
+    """Адрес раздачи ленты (None - раздача не настроена)"""
+    listen = config.get("listen")
+    if not listen:
+        return None
+    if isinstance(listen, int):
+        return DEFAULT_LISTEN_HOST, listen
+    return tuple(listen)
+
+def make_transports(config: Dict, station_id: str) -> list:
+    """Транспорты по настройкам"""
+    transports = []
+    if config.get("directory"):
+        transports.append(DirectoryTransport(config["directory"], station_id))
+    if config.get("peers"):
+        transports.append(SocketTransport([tuple(peer) for peer in config["peers"]], config["token"]))
+    return transports
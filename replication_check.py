@@ -0,0 +1,142 @@
+import argparse
+import os
+import tempfile
+from typing import Dict, List
+
+import kp_pi
+import replication
+
+# Проверка репликации на двух локальных станциях: обмен через общий
+# каталог (DirectoryTransport) и по TCP на 127.0.0.1 (FeedServer и
+# SocketTransport). Станции между обменами одновременно регистрируют
+# тела, проверки и сотрудников; после обмена данные станций должны
+# совпасть без конфликтов ID, изменения чужих записей - дойти до
+# станции-автора, а повторное применение тех же записей ничего не
+# менять. Запрос к FeedServer с неверным токеном не получает записей.
+# Пример: python replication_check.py --transport socket
+
+TOKEN = 'replication-check'
+TRANSPORTS = ('directory', 'socket')
+CHAMBER = kp_pi.StorageRegistry.DEFAULT_CHAMBERS[0]["name"]
+
+class Station:
+    """Станция: менеджеры с файлами в своем каталоге и Replicator"""
+    
+    def __init__(self, directory: str, number: int, count: int = 2):
+        os.makedirs(directory)
+        path = lambda name: os.path.join(directory, name)
+        self.bodies = kp_pi.BodyManagement(path('bodies.json'), path('storage.json'))
+        self.checks = kp_pi.SanitaryControl(path('sanitary.json'), rollup_file=path('sanitary_daily.json'))
+        self.staff = kp_pi.StaffManagement(path('staff.json'), schedules_file=path('shifts.json'))
+        self.coordinations = kp_pi.FuneralServiceCoordination(path('funeral_services.json'), self.bodies)
+        self.replicator = replication.Replicator(path('changes.jsonl'), path('replication_state.json'),
+                                                 (number, count))
+        for collection, manager in (('bodies', self.bodies), ('checks', self.checks),
+                                    ('staff', self.staff), ('coordinations', self.coordinations)):
+            self.replicator.track(collection, manager)
+        self.server = None
+        self.transport = None
+    
+    def state(self) -> Dict[str, Dict]:
+        """Данные станции для сравнения (ячейка хранения назначается каждой станцией своя)"""
+        return {
+            "bodies": {body["id"]: dict(body, storage_slot=None) for body in self.bodies.bodies},
+            "checks": {check["id"]: check for check in self.checks.checks},
+            "staff": {employee["id"]: employee for employee in self.staff.staff},
+            "shifts": {shift["id"]: shift for shift in self.staff.schedules.records()},
+            "coordinations": {item["id"]: item for item in self.coordinations.coordinations},
+        }
+
+def connect(stations: List[Station], kind: str, root: str):
+    """Транспорт каждой станции: общий каталог или FeedServer остальных станций"""
+    if kind == 'directory':
+        shared = os.path.join(root, 'shared')
+        for station in stations:
+            station.transport = replication.DirectoryTransport(shared, station.replicator.station_id)
+        return
+    for station in stations:
+        station.server = replication.FeedServer(station.replicator.feed, TOKEN)
+        station.server.start()
+    for station in stations:
+        peers = [other.server.address for other in stations if other is not station]
+        station.transport = replication.SocketTransport(peers, TOKEN)
+
+def exchange(stations: List[Station]):
+    """Два круга обмена: каталог получает ленту станции только при ее push"""
+    for _ in range(2):
+        for station in stations:
+            station.replicator.sync(station.transport)
+
+def assert_same(stations: List[Station], step: str):
+    first = stations[0].state()
+    for station in stations[1:]:
+        assert station.state() == first, f"{step}: данные станций различаются"
+    for station in stations:
+        assert not station.replicator.conflicts, f"{step}: конфликты {station.replicator.conflicts}"
+
+def run_check(kind: str) -> Dict[str, int]:
+    """Сценарий на двух станциях с транспортом kind, возвращает итоги"""
+    with tempfile.TemporaryDirectory() as root:
+        a = Station(os.path.join(root, 'a'), 1)
+        b = Station(os.path.join(root, 'b'), 2)
+        stations = [a, b]
+        connect(stations, kind, root)
+        try:
+            # Одновременная регистрация между обменами
+            registered = []
+            for station in stations:
+                for name in ('Первый', 'Второй'):
+                    registered.append(station.bodies.register_body(
+                        f'{name} {station.replicator.id_space[0]}', '2026-10-19 10:00', 'Скорая помощь',
+                        CHAMBER, ['Паспорт'])["id"])
+                station.checks.record_check('Температурный режим', 3.5, 5, 'Инспектор', chamber=CHAMBER)
+                station.staff.add_employee(f'Сотрудник {station.replicator.id_space[0]}', 'Санитар', '', [])
+            assert len(set(registered)) == len(registered), f"совпавшие ID тел: {registered}"
+            exchange(stations)
+            assert_same(stations, 'одновременная регистрация')
+            assert len(a.bodies.bodies) == len(registered)
+            
+            # Изменения записей, созданных другой станцией
+            a_body = a.bodies.bodies[0]["id"]
+            b_check = b.checks.checks[-1]["id"]
+            b_employee = b.staff.staff[-1]["id"]
+            b.bodies.update_body_status(a_body, 'подготовлено')
+            a.checks.add_violation(b_check, 'Превышение температуры', 'Проверить камеру')
+            a.staff.add_shift(b_employee, '2026-10-20 08:00', '2026-10-20 20:00')
+            b.coordinations.register_coordination(a_body, 'Ритуальная служба', 'Контакт', '+7-900-000-00-00',
+                                                  '2026-10-21', ['Паспорт'])
+            exchange(stations)
+            assert_same(stations, 'изменение чужих записей')
+            assert a.bodies.get_body_by_id(a_body)["status"] == 'подготовлено'
+            assert b.checks.checks[-1]["violations"], "нарушение не дошло до станции-автора проверки"
+            assert a.bodies.get_body_by_id(a_body)["funeral_service"] is not None
+            
+            # Повторное применение тех же записей ничего не меняет
+            entries = a.replicator.feed.since(0) + b.replicator.feed.since(0)
+            for station in stations:
+                before = station.state()
+                assert station.replicator.apply(entries) == 0, "повторно примененные записи"
+                assert station.state() == before, "повторное применение изменило данные"
+            
+            if kind == 'socket':
+                intruder = replication.SocketTransport([a.server.address], 'неверный токен')
+                assert intruder.pull({}) == [], "FeedServer ответил на запрос с неверным токеном"
+            
+            return {"entries": len(entries), "bodies": len(a.bodies.bodies),
+                    "checks": len(a.checks.checks), "staff": len(a.staff.staff)}
+        finally:
+            for station in stations:
+                if station.server is not None:
+                    station.server.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description='Проверка репликации на двух локальных станциях')
+    parser.add_argument('--transport', choices=TRANSPORTS + ('all',), default='all')
+    args = parser.parse_args()
+    for kind in (TRANSPORTS if args.transport == 'all' else (args.transport,)):
+        totals = run_check(kind)
+        print(f"{kind}: OK (записей ленты {totals['entries']}, тел {totals['bodies']}, "
+              f"проверок {totals['checks']}, сотрудников {totals['staff']})")
+
+if __name__ == '__main__':
+    main()
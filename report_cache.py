@@ -0,0 +1,45 @@
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+# Кэш готовых отчетов. Каждая запись хранит версии коллекций данных,
+# на которых она построена: при изменении любой из них (менеджер
+# увеличивает свой счетчик version) запись считается устаревшей.
+# Отчеты строятся в пуле потоков, поэтому построение не входит в кэш:
+# get отвечает из кэша (с учетом попаданий и промахов), а готовый
+# результат сохраняется через put.
+
+class ReportCache:
+    """Кэш отчетов с проверкой версий данных и LRU-вытеснением"""
+    
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (тип отчета, параметры) -> (версии, результат)
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, report_type: str, params: Tuple, versions: Tuple) -> Optional[Any]:
+        """Получение актуального результата из кэша (None - промах)"""
+        key = (report_type, params)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != versions:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[1]
+    
+    def put(self, report_type: str, params: Tuple, versions: Tuple, value: Any):
+        """Сохранение результата с вытеснением давно не использованных отчетов"""
+        key = (report_type, params)
+        self._entries[key] = (versions, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, report_type: str = None):
+        """Сброс кэша целиком или для одного типа отчетов"""
+        if report_type is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key[0] == report_type]:
+            del self._entries[key]
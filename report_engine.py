@@ -0,0 +1,134 @@
+import itertools
+import multiprocessing
+import os
+import threading
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, List, Sequence
+
+import registry_stats
+
+# Параллельный расчет статистики по большой истории (map-reduce).
+# Реестр делится на диапазоны ID (записи хранятся в порядке ID) по
+# PARTITION_SIZE записей. Для каждого диапазона в процесс пула передаются
+# компактные данные - кортеж статусов и срезы колонок дат array('q'),
+# а не словари записей, - и возвращаются частичные итоги, которые затем
+# сливаются. Небольшие реестры считаются в текущем процессе: запуск
+# процессов и передача данных дороже самого расчета.
+
+# Число записей, начиная с которого расчет выполняется в пуле процессов
+PARALLEL_THRESHOLD = 200000
+PARTITION_SIZE = 50000
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor() -> ProcessPoolExecutor:
+    """Общий пул процессов (создается при первом обращении)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: дочерние процессы не наследуют потоки Qt и телеметрии
+            _executor = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        return _executor
+
+def shutdown():
+    """Остановка пула процессов (при закрытии приложения)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+def map_reduce(mapper: Callable, partitions: Iterable[tuple], merge: Callable[[List], Any],
+               parallel: bool) -> Any:
+    """Применение mapper к разделам и слияние частичных итогов
+    
+    Разделы порождаются лениво и отправляются в пул по мере подготовки,
+    поэтому процессы начинают работу, пока готовятся следующие разделы.
+    """
+    if not parallel:
+        return merge([mapper(*args) for args in partitions])
+    
+    submitted = []
+    try:
+        executor = get_executor()
+        futures = []
+        for args in partitions:
+            submitted.append(args)
+            futures.append(executor.submit(mapper, *args))
+        return merge([future.result() for future in futures])
+    except (OSError, BrokenProcessPool):
+        # Пул недоступен (ограничения среды, упавший процесс): считаем здесь
+        shutdown()
+        return merge([mapper(*args) for args in itertools.chain(submitted, partitions)])
+
+def use_processes(count: int) -> bool:
+    """Стоит ли считать count записей в пуле процессов"""
+    return count >= PARALLEL_THRESHOLD and (os.cpu_count() or 1) > 1
+
+def partition_bounds(count: int, partition_size: int = PARTITION_SIZE) -> List[tuple]:
+    """Границы разделов [начало, конец) для count записей"""
+    return [(start, min(start + partition_size, count)) for start in range(0, count, partition_size)]
+
+def body_partition_stats(statuses: Sequence[str], arrivals: array, releases: array) -> Dict:
+    """Map: итоги диапазона тел (выполняется в процессе пула)"""
+    durations = registry_stats.storage_durations_days(arrivals, releases)
+    # Отсортированные части сливаются быстрее: сортировка слиянием
+    # при объединении находит готовые серии
+    durations = sorted(durations) if isinstance(durations, list) else registry_stats.np.sort(durations)
+    return {
+        "statuses": Counter(statuses),
+        "durations": durations,
+        "arrivals": registry_stats.counts_per_period(arrivals),
+        "releases": registry_stats.counts_per_period(releases)
+    }
+
+def merge_body_stats(parts: List[Dict]) -> Dict:
+    """Reduce: слияние итогов диапазонов тел"""
+    statuses = Counter()
+    arrivals = Counter()
+    releases = Counter()
+    for part in parts:
+        statuses.update(part["statuses"])
+        arrivals.update(part["arrivals"])
+        releases.update(part["releases"])
+    
+    durations = [part["durations"] for part in parts]
+    if registry_stats.np is not None and durations and not isinstance(durations[0], list):
+        durations = registry_stats.np.concatenate(durations)
+    else:
+        durations = list(itertools.chain.from_iterable(durations))
+    
+    return {
+        "statuses": dict(statuses),
+        "duration": registry_stats.duration_summary(durations),
+        "arrivals": dict(sorted(arrivals.items())),
+        "releases": dict(sorted(releases.items()))
+    }
+
+def body_statistics(bodies: Sequence[Dict], columns: Dict[str, array],
+                    parallel: bool = None) -> Dict:
+    """Статусы, сроки хранения и поступления/выдачи по месяцам
+    
+    bodies - снимок тел, columns - колонки arrival_date и release_date,
+    выровненные по позициям снимка.
+    """
+    count = len(bodies)
+    if parallel is None:
+        parallel = use_processes(count)
+    arrivals = columns['arrival_date']
+    releases = columns['release_date']
+    status_of = itemgetter('status')
+    
+    def partitions():
+        records = iter(bodies)
+        for start, end in partition_bounds(count):
+            statuses = tuple(map(status_of, itertools.islice(records, end - start)))
+            yield statuses, arrivals[start:end], releases[start:end]
+    
+    return map_reduce(body_partition_stats, partitions(), merge_body_stats, parallel)
@@ -0,0 +1,242 @@
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Экспорт отчетов в XLSX (openpyxl) и PDF (ReportLab).
+# Строки передаются итератором и записываются порциями, поэтому
+# ни книга Excel, ни список элементов PDF целиком в памяти не хранятся.
+
+EXPORT_CHUNK_ROWS = 500
+
+# Колонки выгрузки для каждого набора данных: (ключ записи, заголовок)
+BODY_EXPORT_COLUMNS = [
+    ("id", "ID"),
+    ("full_name", "ФИО"),
+    ("arrival_date", "Дата поступления"),
+    ("source", "Источник"),
+    ("storage_location", "Место хранения"),
+    ("status", "Статус"),
+    ("documents", "Документы"),
+    ("registration_date", "Дата регистрации"),
+    ("preparation_date", "Дата подготовки"),
+    ("release_date", "Дата выдачи"),
+    ("notes", "Примечания"),
+]
+
+CHECK_EXPORT_COLUMNS = [
+    ("id", "ID"),
+    ("date", "Дата"),
+    ("check_type", "Тип проверки"),
+    ("temperature", "Температура"),
+    ("cleanliness_score", "Оценка чистоты"),
+    ("inspector", "Инспектор"),
+    ("violations", "Нарушения"),
+    ("notes", "Примечания"),
+]
+
+STAFF_EXPORT_COLUMNS = [
+    ("id", "ID"),
+    ("full_name", "ФИО"),
+    ("position", "Должность"),
+    ("contact", "Контакты"),
+    ("hire_date", "Дата приема"),
+    ("status", "Статус"),
+]
+
+COORDINATION_EXPORT_COLUMNS = [
+    ("id", "ID"),
+    ("body_id", "ID тела"),
+    ("service_name", "Ритуальная служба"),
+    ("contact_person", "Контактное лицо"),
+    ("contact_phone", "Телефон"),
+    ("planned_date", "Запланированная дата"),
+    ("status", "Статус"),
+    ("documents_needed", "Документы"),
+]
+
+# Пути к шрифтам с кириллицей (Windows, Linux, macOS)
+PDF_FONT_CANDIDATES = [
+    "C:\\Windows\\Fonts\\arial.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+]
+
+_pdf_font_name = None
+
+class ExportCancelled(Exception):
+    """Экспорт прерван пользователем"""
+
+def format_cell(value) -> str:
+    """Преобразование значения поля в текст ячейки"""
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        # Нарушения хранятся списком словарей, документы - списком строк
+        if value and isinstance(value[0], dict):
+            return str(len(value))
+        return ", ".join(str(item) for item in value)
+    return str(value)
+
+def iter_rows(records: Iterable[Dict], columns: Sequence[Tuple[str, str]]):
+    """Генератор строк выгрузки из записей менеджера"""
+    keys = [key for key, _ in columns]
+    for record in records:
+        yield [format_cell(record.get(key)) for key in keys]
+
+def _check_progress(done: int,
+                    total: Optional[int],
+                    progress: Optional[Callable[[int], None]],
+                    is_cancelled: Optional[Callable[[], bool]]):
+    """Проверка отмены и передача прогресса (в процентах)"""
+    if is_cancelled and is_cancelled():
+        raise ExportCancelled()
+    if progress and total:
+        progress(min(100, done * 100 // total))
+
+def export_xlsx(path: str,
+                title: str,
+                header: List[str],
+                rows: Iterable[List],
+                total: Optional[int] = None,
+                progress: Optional[Callable[[int], None]] = None,
+                is_cancelled: Optional[Callable[[], bool]] = None) -> int:
+    """Потоковая запись строк в XLSX в режиме write-only"""
+    from openpyxl import Workbook
+    
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=title[:31])
+    sheet.append(header)
+    
+    written = 0
+    try:
+        for row in rows:
+            sheet.append(row)
+            written += 1
+            if written % EXPORT_CHUNK_ROWS == 0:
+                _check_progress(written, total, progress, is_cancelled)
+        _check_progress(written, total, progress, is_cancelled)
+        workbook.save(path)
+    except ExportCancelled:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return written
+
+def get_pdf_font() -> str:
+    """Регистрация шрифта с кириллицей (один раз на процесс)"""
+    global _pdf_font_name
+    if _pdf_font_name is None:
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+        
+        _pdf_font_name = "Helvetica"
+        for font_path in PDF_FONT_CANDIDATES:
+            if os.path.exists(font_path):
+                pdfmetrics.registerFont(TTFont("ReportFont", font_path))
+                _pdf_font_name = "ReportFont"
+                break
+    return _pdf_font_name
+
+def export_pdf(path: str,
+               title: str,
+               header: List[str],
+               rows: Iterable[List],
+               total: Optional[int] = None,
+               progress: Optional[Callable[[int], None]] = None,
+               is_cancelled: Optional[Callable[[], bool]] = None) -> int:
+    """Потоковая запись строк в PDF порциями таблиц ReportLab"""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import (BaseDocTemplate, Frame, PageTemplate,
+                                    Paragraph, Spacer, Table, TableStyle)
+    
+    font_name = get_pdf_font()
+    
+    doc = BaseDocTemplate(path, pagesize=landscape(A4), title=title,
+                          leftMargin=20, rightMargin=20, topMargin=20, bottomMargin=20)
+    frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id='normal')
+    doc.addPageTemplates([PageTemplate(id='report', frames=[frame])])
+    
+    title_style = getSampleStyleSheet()['Title']
+    title_style.fontName = font_name
+    table_style = TableStyle([
+        ('FONTNAME', (0, 0), (-1, -1), font_name),
+        ('FONTSIZE', (0, 0), (-1, -1), 7),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4CAF50')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#dddddd')),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ])
+    
+    def flush(flowables):
+        # Элементы сразу раскладываются по страницам и освобождаются.
+        # Как в BaseDocTemplate.build: перед каждым элементом выполняются
+        # отложенные действия (начало страницы и т.п.)
+        while flowables:
+            doc.clean_hanging()
+            doc.handle_flowable(flowables)
+    
+    def flush_rows(chunk):
+        # Каждая порция строк - отдельная таблица
+        flush([Table([header] + chunk, repeatRows=1, style=table_style)])
+    
+    written = 0
+    chunk = []
+    # Сборка документа по частям повторяет BaseDocTemplate.build,
+    # которому нужен весь список элементов сразу
+    doc._startBuild()
+    canv = doc.canv
+    saved_info = canv._doc.info
+    canv._doctemplate = doc
+    try:
+        flush([Paragraph(title, title_style), Spacer(1, 12)])
+        
+        for row in rows:
+            chunk.append(row)
+            written += 1
+            if len(chunk) >= EXPORT_CHUNK_ROWS:
+                flush_rows(chunk)
+                chunk = []
+                _check_progress(written, total, progress, is_cancelled)
+        if chunk:
+            flush_rows(chunk)
+        _check_progress(written, total, progress, is_cancelled)
+    except ExportCancelled:
+        del canv._doctemplate
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    del canv._doctemplate
+    canv._doc.info = saved_info
+    doc._endBuild()
+    return written
+
+EXPORTERS = {
+    "xlsx": export_xlsx,
+    "pdf": export_pdf,
+}
+
+def self_check(rows: int = 3000) -> Dict[str, int]:
+    """Проверка экспорта синтетического отчета во все форматы: {формат: размер файла}"""
+    import tempfile
+    
+    records = [{"id": number, "full_name": f"Иванов Иван {number}", "arrival_date": "2024-01-15 10:00",
+                "source": "Городская больница №1", "storage_location": "Холодильная камера 1",
+                "status": "поступило", "documents": ["Паспорт"]} for number in range(1, rows + 1)]
+    header = [caption for _, caption in BODY_EXPORT_COLUMNS]
+    sizes = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for export_format, exporter in EXPORTERS.items():
+            path = os.path.join(directory, f"report.{export_format}")
+            written = exporter(path, "Проверка экспорта", header,
+                               iter_rows(records, BODY_EXPORT_COLUMNS), rows)
+            assert written == rows, f"{export_format}: записано {written} строк из {rows}"
+            sizes[export_format] = os.path.getsize(path)
+            assert sizes[export_format] > 0, f"{export_format}: пустой файл"
+    return sizes
+
+if __name__ == '__main__':
+    # python report_export.py - проверка экспорта отчета на 3000 строк
+    for export_format, size in self_check().items():
+        print(f"{export_format}: {size / 1024:.0f} КБ")
@@ -0,0 +1,287 @@
+import datetime
+from array import array
+from collections import Counter
+from operator import itemgetter
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import registry_stats
+import report_engine
+from date_columns import format_date, parse_date
+from duplicates import DuplicateDetector
+
+# Построение текстов отчетов. Функции не обращаются к менеджерам и
+# интерфейсу: все данные передаются аргументами (снимки записей, колонки дат),
+# поэтому отчеты можно строить в пуле потоков, пока интерфейс принимает
+# новые записи.
+
+def generation_time() -> str:
+    """Время формирования отчета"""
+    return datetime.datetime.now().strftime('%Y-%m-%d %H:%M')
+
+def format_storage_place(body: Dict) -> str:
+    """Место хранения с номером ячейки"""
+    if body.get('storage_slot'):
+        return f"{body['storage_location']}, ячейка {body['storage_slot']}"
+    return body['storage_location']
+
+def count_statuses(bodies: Iterable[Dict]) -> Dict[str, int]:
+    """Количество тел по статусам"""
+    return dict(Counter(map(itemgetter('status'), bodies)))
+
+def bodies_report(bodies: Sequence[Dict], recent_bodies: List[Dict]) -> str:
+    """Отчет по телам (recent_bodies - последние поступления)"""
+    report = "📊 ОТЧЕТ ПО ТЕЛАМ\n"
+    report += "=" * 50 + "\n\n"
+    
+    report += f"Всего тел в системе: {len(bodies)}\n"
+    report += f"Дата генерации: {generation_time()}\n\n"
+    
+    report += "📈 СТАТИСТИКА ПО СТАТУСАМ:\n"
+    for status, count in count_statuses(bodies).items():
+        report += f"  • {status}: {count} тел\n"
+    
+    report += "\n📋 ПОСЛЕДНИЕ 10 ПОСТУПЛЕНИЙ:\n"
+    for body in recent_bodies:
+        report += f"\nID: {body['id']}\n"
+        report += f"  ФИО: {body['full_name']}\n"
+        report += f"  Дата поступления: {body['arrival_date']}\n"
+        report += f"  Статус: {body['status']}\n"
+        report += f"  Место хранения: {format_storage_place(body)}\n"
+    
+    return report
+
+def sanitary_report(checks: Sequence[Dict], recent_checks: List[Dict], history: Dict = None) -> str:
+    """Отчет по санитарным проверкам (history - сводка CheckRollups.totals)"""
+    history_checks = history['checks'] if history else 0
+    report = "🧼 ОТЧЕТ ПО САНИТАРНЫМ ПРОВЕРКАМ\n"
+    report += "=" * 50 + "\n\n"
+    
+    report += f"Всего проверок: {len(checks) + history_checks}\n"
+    if history_checks:
+        report += (f"  в т.ч. в сжатой истории: {history_checks} "
+                   f"({history['first_date']} — {history['last_date']}, дней: {history['days']})\n")
+        if history['mean_temperature'] is not None:
+            report += (f"  температура: {history['temperature_min']}…{history['temperature_max']}°C, "
+                       f"средняя {history['mean_temperature']:.1f}°C\n")
+        if history['mean_cleanliness'] is not None:
+            report += f"  средняя оценка чистоты: {history['mean_cleanliness']:.1f}/10\n"
+    report += f"Дата генерации: {generation_time()}\n\n"
+    
+    report += "📋 ПОСЛЕДНИЕ 10 ПРОВЕРОК:\n"
+    for check in recent_checks:
+        report += f"\nID: {check['id']}\n"
+        report += f"  Дата: {check['date']}\n"
+        report += f"  Тип: {check['check_type']}\n"
+        report += f"  Температура: {check['temperature']}°C\n"
+        if check['cleanliness_score'] is not None:
+            report += f"  Оценка чистоты: {check['cleanliness_score']}/10\n"
+        report += f"  Инспектор: {check['inspector']}\n"
+        report += f"  Нарушений: {len(check.get('violations', []))}\n"
+    
+    total_violations = sum(len(check.get('violations', [])) for check in checks)
+    if history:
+        total_violations += history['violations']
+    report += f"\n⚠️ ВСЕГО НАРУШЕНИЙ: {total_violations}\n"
+    
+    return report
+
+def statistics_report(bodies: Sequence[Dict],
+                      checks_count: int,
+                      staff_count: int,
+                      coord_count: int,
+                      body_columns: Dict[str, array],
+                      check_columns: Dict[str, array],
+                      history_start: str = None) -> str:
+    """Общая статистика (колонки дат - копии DateColumns.snapshot)"""
+    bodies_count = len(bodies)
+    # Статусы, сроки хранения и помесячные итоги - одним расчетом по
+    # разделам реестра (для большой истории - в пуле процессов)
+    stats = report_engine.body_statistics(bodies, body_columns)
+    status_stats = stats['statuses']
+    
+    report = "📈 ОБЩАЯ СТАТИСТИКА\n"
+    report += "=" * 50 + "\n\n"
+    
+    report += f"📊 ОСНОВНЫЕ ПОКАЗАТЕЛИ:\n"
+    report += f"  • Зарегистрировано тел: {bodies_count}\n"
+    report += f"  • Проведено санитарных проверок: {checks_count}\n"
+    report += f"  • Сотрудников в системе: {staff_count}\n"
+    report += f"  • Координаций с ритуальными службами: {coord_count}\n\n"
+    
+    report += "📋 СТАТУСЫ ТЕЛ:\n"
+    for status, count in status_stats.items():
+        percentage = (count / bodies_count * 100) if bodies_count > 0 else 0
+        report += f"  • {status}: {count} ({percentage:.1f}%)\n"
+    
+    duration = stats['duration']
+    percentiles = duration['percentiles']
+    
+    report += "\n⏱ СРОК ХРАНЕНИЯ (выдано тел: {}):\n".format(duration['count'])
+    report += f"  • Средний: {duration['mean']:.1f} дн.\n"
+    report += f"  • Медиана: {percentiles[50]:.1f} дн.\n"
+    report += f"  • 25% / 75% / 90%: {percentiles[25]:.1f} / {percentiles[75]:.1f} / {percentiles[90]:.1f} дн.\n"
+    report += f"  • Минимум / максимум: {duration['min']:.1f} / {duration['max']:.1f} дн.\n"
+    
+    arrivals = stats['arrivals']
+    releases = stats['releases']
+    if arrivals or releases:
+        report += "\n📆 ПОСТУПЛЕНИЯ / ВЫДАЧИ ПО МЕСЯЦАМ:\n"
+        for month in sorted(set(arrivals) | set(releases)):
+            report += f"  • {month}: {arrivals.get(month, 0)} / {releases.get(month, 0)}\n"
+    
+    report += f"\n📅 СИСТЕМА АКТИВНА С: {system_start_date(body_columns, check_columns, history_start)}\n"
+    
+    return report
+
+def system_start_date(body_columns: Dict[str, array], check_columns: Dict[str, array],
+                      history_start: str = None) -> str:
+    """Дата начала работы системы: самая ранняя регистрация или проверка"""
+    dates = [
+        registry_stats.earliest(body_columns['registration_date']),
+        registry_stats.earliest(check_columns['date'])
+    ]
+    if history_start:
+        dates.append(parse_date(history_start))
+    valid_dates = [d for d in dates if d is not None]
+    if valid_dates:
+        return format_date(min(valid_dates))
+    
+    return datetime.datetime.now().strftime("%Y-%m-%d")
+
+def daily_report(today: str, todays_bodies: List[Dict], todays_checks: List[Dict]) -> str:
+    """Ежедневный отчет за указанный день"""
+    report = f"📅 ЕЖЕДНЕВНЫЙ ОТЧЕТ НА {today}\n"
+    report += "=" * 50 + "\n\n"
+    
+    report += f"📊 СВОДКА ЗА ДЕНЬ:\n"
+    report += f"  • Поступило тел: {len(todays_bodies)}\n"
+    report += f"  • Проведено проверок: {len(todays_checks)}\n\n"
+    
+    if todays_bodies:
+        report += "📋 ТЕЛА, ПОСТУПИВШИЕ СЕГОДНЯ:\n"
+        for body in todays_bodies:
+            report += f"  • ID: {body['id']}, ФИО: {body['full_name']}, Источник: {body['source']}\n"
+    else:
+        report += "📋 ТЕЛА, ПОСТУПИВШИЕ СЕГОДНЯ: нет\n"
+    
+    if todays_checks:
+        report += "\n🧼 ПРОВЕРКИ ЗА СЕГОДНЯ:\n"
+        for check in todays_checks:
+            violations = len(check.get('violations', []))
+            report += f"  • {check['date'][11:]}, Тип: {check['check_type']}, Нарушений: {violations}\n"
+    
+    return report
+
+def period_report(start: str,
+                  end: str,
+                  arrived: List[Dict],
+                  released_arrivals: array,
+                  released_dates: array,
+                  checks: List[Dict],
+                  history: Dict = None) -> str:
+    """Статистика за период (released_* - даты поступления и выдачи выданных тел)"""
+    duration = registry_stats.storage_duration_stats(released_arrivals, released_dates)
+    
+    report = f"📆 СТАТИСТИКА ЗА ПЕРИОД {start} — {end}\n"
+    report += "=" * 50 + "\n\n"
+    
+    report += "📊 ОСНОВНЫЕ ПОКАЗАТЕЛИ:\n"
+    report += f"  • Поступило тел: {len(arrived)}\n"
+    report += f"  • Выдано тел: {len(released_dates)}\n"
+    report += f"  • Средний срок хранения выданных: {duration['mean']:.1f} дн.\n"
+    report += f"  • Медиана срока хранения: {duration['percentiles'][50]:.1f} дн.\n"
+    violations = sum(len(c.get('violations', [])) for c in checks)
+    checks_count = len(checks)
+    if history:
+        checks_count += history['checks']
+        violations += history['violations']
+    report += f"  • Проведено проверок: {checks_count}\n"
+    report += f"  • Выявлено нарушений: {violations}\n"
+    
+    sources = {}
+    for body in arrived:
+        sources[body['source']] = sources.get(body['source'], 0) + 1
+    if sources:
+        report += "\n📋 ПОСТУПЛЕНИЯ ПО ИСТОЧНИКАМ:\n"
+        for source, count in sorted(sources.items(), key=lambda x: -x[1]):
+            report += f"  • {source}: {count}\n"
+    
+    return report
+
+def duplicates_report(bodies: Sequence[Dict]) -> str:
+    """Возможные дубликаты в реестре (индекс блоков строится по снимку)"""
+    detector = DuplicateDetector()
+    detector.rebuild(bodies)
+    pairs = detector.duplicate_pairs(bodies)
+    by_id = {body['id']: body for body in bodies}
+    
+    report = "🔍 ВОЗМОЖНЫЕ ДУБЛИКАТЫ\n"
+    report += "=" * 50 + "\n\n"
+    report += f"Дата генерации: {generation_time()}\n"
+    report += f"Окно по дате поступления: ±{detector.window_days} дн., "
+    report += f"порог схожести ФИО: {detector.threshold:.0%}\n\n"
+    
+    if not pairs:
+        report += "Возможных дубликатов не найдено\n"
+        return report
+    
+    report += f"Найдено пар: {len(pairs)}\n"
+    for first_id, second_id, score in sorted(pairs, key=lambda pair: -pair[2]):
+        report += f"\n  • Схожесть {score:.0%}\n"
+        for body in (by_id[first_id], by_id[second_id]):
+            report += f"    ID {body['id']}: {body['full_name']}, поступление {body['arrival_date']}, "
+            report += f"{body['source']}, статус: {body['status']}\n"
+    
+    return report
+
+def network_daily_report(day: str, summaries: List[Tuple[str, Dict]]) -> str:
+    """Сводный отчет по отделениям за день (summaries - пары отделение, итоги)"""
+    report = f"🌐 СВОДКА ПО ОТДЕЛЕНИЯМ НА {day}\n"
+    report += "=" * 50 + "\n\n"
+    report += f"Дата генерации: {generation_time()}\n"
+    report += f"Отделений: {len(summaries)}\n"
+    
+    totals = Counter()
+    statuses = Counter()
+    for name, summary in summaries:
+        report += f"\n🏥 {name}:\n"
+        report += f"  • Поступило / выдано за день: {summary['arrived']} / {summary['released']}\n"
+        report += f"  • На хранении: {summary['in_storage']} (всего в реестре: {summary['bodies']})\n"
+        report += f"  • Проверок за день: {summary['checks']}, нарушений: {summary['violations']}\n"
+        totals.update({key: summary[key] for key in
+                       ('arrived', 'released', 'in_storage', 'bodies', 'checks', 'violations')})
+        statuses.update(summary['statuses'])
+    
+    report += "\n📊 ИТОГО ПО СЕТИ:\n"
+    report += f"  • Поступило / выдано за день: {totals['arrived']} / {totals['released']}\n"
+    report += f"  • На хранении: {totals['in_storage']} (всего в реестрах: {totals['bodies']})\n"
+    report += f"  • Проверок за день: {totals['checks']}, нарушений: {totals['violations']}\n"
+    if statuses:
+        report += "\n📋 СТАТУСЫ ТЕЛ:\n"
+        for status, count in statuses.most_common():
+            report += f"  • {status}: {count}\n"
+    
+    return report
+
+def ui_latency_report(summary: Dict, handlers: List[Tuple[str, int, float]], stalls: List[Dict]) -> str:
+    """Отчет об отзывчивости интерфейса (итоги LatencyMonitor)"""
+    report = "⏱ ОТЗЫВЧИВОСТЬ ИНТЕРФЕЙСА\n"
+    report += "=" * 50 + "\n\n"
+    report += f"Дата генерации: {generation_time()}\n"
+    report += f"Замеров цикла событий: {summary['samples']}\n"
+    report += f"  • Задержка p50: {summary['p50_ms']:.1f} мс\n"
+    report += f"  • Задержка p99: {summary['p99_ms']:.1f} мс\n"
+    report += f"  • Наибольшая: {summary['max_ms']:.1f} мс\n"
+    report += f"Задержек дольше {summary['threshold_ms']} мс: {summary['stalls']}\n"
+    
+    if handlers:
+        report += "\n🐢 ОБРАБОТЧИКИ ЗАДЕРЖЕК:\n"
+        for handler, count, duration in handlers:
+            report += f"  • {handler}: {count} раз, всего {duration:.0f} мс\n"
+    
+    if stalls:
+        report += "\n📋 ПОСЛЕДНИЕ ЗАДЕРЖКИ:\n"
+        for stall in stalls:
+            report += f"  • {stall['time']}: {stall['duration_ms']:.0f} мс — {stall['stack'] or stall['handler']}\n"
+    
+    return report
@@ -0,0 +1,55 @@
+import argparse
+import json
+import random
+import socket
+import time
+
+from telemetry import DEFAULT_HOST, DEFAULT_PORT
+
+# Имитатор датчиков температуры холодильных камер.
+# Пример: python sensor_simulator.py --interval 2 --anomaly 0.05
+
+CHAMBERS = ['Холодильная камера 1', 'Холодильная камера 2', 'Холодильная камера 3']
+
+def make_reading(chamber: str, anomaly_rate: float) -> bytes:
+    """Показание датчика в формате сервиса приема"""
+    temperature = random.gauss(4.0, 0.5)
+    if random.random() < anomaly_rate:
+        temperature = random.uniform(9.0, 14.0)
+    return json.dumps({
+        "chamber": chamber,
+        "temperature": round(temperature, 2),
+        "ts": time.time()
+    }, ensure_ascii=False).encode('utf-8')
+
+def main():
+    parser = argparse.ArgumentParser(description='Имитатор датчиков температуры')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--protocol', choices=['udp', 'tcp'], default='udp')
+    parser.add_argument('--interval', type=float, default=3.0, help='Период опроса, с')
+    parser.add_argument('--anomaly', type=float, default=0.02, help='Доля показаний вне диапазона')
+    parser.add_argument('--count', type=int, default=0, help='Число циклов (0 - бесконечно)')
+    args = parser.parse_args()
+    
+    if args.protocol == 'udp':
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        send = lambda payload: sock.sendto(payload, (args.host, args.port))
+    else:
+        sock = socket.create_connection((args.host, args.port))
+        send = lambda payload: sock.sendall(payload + b'\n')
+    
+    cycle = 0
+    try:
+        while not args.count or cycle < args.count:
+            for chamber in CHAMBERS:
+                send(make_reading(chamber, args.anomaly))
+            cycle += 1
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from date_columns import NO_DATE, format_date, parse_date
+
+# График смен персонала. Смена - запись {"id", "staff_id", "start", "end",
+# "notes"} с временем "ГГГГ-ММ-ДД ЧЧ:ММ" (конец не включается, ночная
+# смена заканчивается на следующий день). Смены хранятся в дереве
+# интервалов: AVL-дерево по началу смены, в каждом узле которого записан
+# наибольший конец смен поддерева. Запрос пересечений с периодом отсекает
+# поддеревья, целиком закончившиеся до периода или начавшиеся после него,
+# поэтому проверка конфликтов, "кто на смене" и покрытие должности за
+# неделю не зависят от того, сколько лет смен накоплено.
+# Кроме общего дерева, у каждого сотрудника свое - для проверки пересечений.
+
+# Интервал в минутах от начала летоисчисления (см. date_columns)
+Interval = Tuple[int, int]
+
+class _Node:
+    __slots__ = ('start', 'end', 'key', 'value', 'left', 'right', 'height', 'max_end')
+    
+    def __init__(self, start: int, end: int, key: int, value: Dict):
+        self.start = start
+        self.end = end
+        self.key = key
+        self.value = value
+        self.left: Optional[_Node] = None
+        self.right: Optional[_Node] = None
+        self.height = 1
+        self.max_end = end
+
+def _height(node: Optional[_Node]) -> int:
+    return node.height if node is not None else 0
+
+def _update(node: _Node):
+    """Пересчет высоты и наибольшего конца узла по потомкам"""
+    node.height = 1 + max(_height(node.left), _height(node.right))
+    node.max_end = node.end
+    if node.left is not None and node.left.max_end > node.max_end:
+        node.max_end = node.left.max_end
+    if node.right is not None and node.right.max_end > node.max_end:
+        node.max_end = node.right.max_end
+
+def _rotate_right(node: _Node) -> _Node:
+    top = node.left
+    node.left = top.right
+    top.right = node
+    _update(node)
+    _update(top)
+    return top
+
+def _rotate_left(node: _Node) -> _Node:
+    top = node.right
+    node.right = top.left
+    top.left = node
+    _update(node)
+    _update(top)
+    return top
+
+def _balance(node: _Node) -> _Node:
+    """Восстановление баланса AVL после вставки или удаления в поддереве"""
+    _update(node)
+    skew = _height(node.left) - _height(node.right)
+    if skew > 1:
+        if _height(node.left.left) < _height(node.left.right):
+            node.left = _rotate_left(node.left)
+        return _rotate_right(node)
+    if skew < -1:
+        if _height(node.right.right) < _height(node.right.left):
+            node.right = _rotate_right(node.right)
+        return _rotate_left(node)
+    return node
+
+class IntervalTree:
+    """Дерево интервалов [начало, конец) с уникальным ключом (ID смены)"""
+    
+    def __init__(self):
+        self.root: Optional[_Node] = None
+        self.size = 0
+    
+    def __len__(self):
+        return self.size
+    
+    def insert(self, start: int, end: int, key: int, value: Dict):
+        """Вставка интервала: O(log n)"""
+        self.root = self._insert(self.root, _Node(start, end, key, value))
+        self.size += 1
+    
+    def _insert(self, node: Optional[_Node], new: _Node) -> _Node:
+        if node is None:
+            return new
+        if (new.start, new.key) < (node.start, node.key):
+            node.left = self._insert(node.left, new)
+        else:
+            node.right = self._insert(node.right, new)
+        return _balance(node)
+    
+    def remove(self, start: int, key: int) -> bool:
+        """Удаление интервала по началу и ключу: O(log n)"""
+        size = self.size
+        self.root = self._remove(self.root, (start, key))
+        return self.size < size
+    
+    def _remove(self, node: Optional[_Node], target: Tuple[int, int]) -> Optional[_Node]:
+        if node is None:
+            return None
+        current = (node.start, node.key)
+        if target < current:
+            node.left = self._remove(node.left, target)
+        elif target > current:
+            node.right = self._remove(node.right, target)
+        else:
+            self.size -= 1
+            if node.left is None:
+                return node.right
+            if node.right is None:
+                return node.left
+            # Узел заменяется наименьшим узлом правого поддерева
+            successor = node.right
+            while successor.left is not None:
+                successor = successor.left
+            node.right = self._remove_min(node.right)
+            successor.left = node.left
+            successor.right = node.right
+            node = successor
+        return _balance(node)
+    
+    def _remove_min(self, node: _Node) -> Optional[_Node]:
+        if node.left is None:
+            return node.right
+        node.left = self._remove_min(node.left)
+        return _balance(node)
+    
+    def overlapping(self, start: int, end: int) -> List[Dict]:
+        """Интервалы, пересекающиеся с [start, end), по возрастанию начала
+        
+        Поддеревья с max_end <= start пропускаются, обход прекращается на
+        первом интервале, начинающемся не раньше end: O(k log n) для k найденных.
+        """
+        result = []
+        stack = []
+        node = self.root
+        while True:
+            while node is not None and node.max_end > start:
+                stack.append(node)
+                node = node.left
+            if not stack:
+                break
+            node = stack.pop()
+            if node.start >= end:
+                break
+            if node.end > start:
+                result.append(node.value)
+            node = node.right
+        return result
+    
+    def at(self, moment: int) -> List[Dict]:
+        """Интервалы, содержащие момент"""
+        return self.overlapping(moment, moment + 1)
+
+def shift_interval(shift: Dict) -> Interval:
+    """Смена в минутах"""
+    return parse_date(shift["start"]), parse_date(shift["end"])
+
+def merge_gaps(intervals: Iterable[Interval], start: int, end: int) -> List[Interval]:
+    """Непокрытые части [start, end) для интервалов, упорядоченных по началу"""
+    gaps = []
+    cursor = start
+    for interval_start, interval_end in intervals:
+        if interval_start > cursor:
+            gaps.append((cursor, min(interval_start, end)))
+        cursor = max(cursor, interval_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+def format_interval(interval: Interval) -> str:
+    """Интервал для отображения: 'ГГГГ-ММ-ДД ЧЧ:ММ – ЧЧ:ММ' (или с датой конца)"""
+    start, end = (format_date(value, with_time=True) for value in interval)
+    if start[:10] == end[:10]:
+        return f"{start} – {end[11:]}"
+    return f"{start} – {end}"
+
+class ShiftSchedule:
+    """Смены персонала с деревьями интервалов: общим и по сотрудникам"""
+    
+    def __init__(self, shifts: Iterable[Dict] = ()):
+        self.by_id: Dict[int, Dict] = {}
+        self.tree = IntervalTree()
+        self.by_staff: Dict[int, IntervalTree] = {}
+        self.last_id = 0
+        for shift in shifts:
+            self.add(shift)
+    
+    def __len__(self):
+        return len(self.by_id)
+    
+    def records(self) -> List[Dict]:
+        """Смены для сохранения"""
+        return list(self.by_id.values())
+    
+    def get(self, shift_id: int) -> Optional[Dict]:
+        return self.by_id.get(shift_id)
+    
+    @staticmethod
+    def validate(start: str, end: str) -> Interval:
+        """Разбор времени смены (ValueError - неверный формат или конец не позже начала)"""
+        interval = parse_date(start), parse_date(end)
+        if NO_DATE in interval or len(start) < 16 or len(end) < 16:
+            raise ValueError("Время смены указывается в формате ГГГГ-ММ-ДД ЧЧ:ММ")
+        if interval[1] <= interval[0]:
+            raise ValueError("Конец смены должен быть позже начала")
+        return interval
+    
+    def add(self, shift: Dict):
+        """Добавление смены без проверки пересечений"""
+        start, end = shift_interval(shift)
+        self.by_id[shift["id"]] = shift
+        self.last_id = max(self.last_id, shift["id"])
+        self.tree.insert(start, end, shift["id"], shift)
+        staff_tree = self.by_staff.get(shift["staff_id"])
+        if staff_tree is None:
+            staff_tree = self.by_staff[shift["staff_id"]] = IntervalTree()
+        staff_tree.insert(start, end, shift["id"], shift)
+    
+    def remove(self, shift_id: int) -> Optional[Dict]:
+        """Удаление смены, возвращает удаленную смену"""
+        shift = self.by_id.pop(shift_id, None)
+        if shift is None:
+            return None
+        start, _ = shift_interval(shift)
+        self.tree.remove(start, shift_id)
+        self.by_staff[shift["staff_id"]].remove(start, shift_id)
+        return shift
+    
+    def conflicts(self, staff_id: int, start: int, end: int, exclude_id: int = None) -> List[Dict]:
+        """Смены сотрудника, пересекающиеся с [start, end)"""
+        staff_tree = self.by_staff.get(staff_id)
+        if staff_tree is None:
+            return []
+        return [shift for shift in staff_tree.overlapping(start, end) if shift["id"] != exclude_id]
+    
+    def in_period(self, start: int, end: int) -> List[Dict]:
+        """Смены, пересекающиеся с периодом, по возрастанию начала"""
+        return self.tree.overlapping(start, end)
+    
+    def on_duty(self, moment: int) -> List[Dict]:
+        """Смены, идущие в момент времени"""
+        return self.tree.at(moment)
+    
+    def coverage_gaps(self, start: int, end: int,
+                      include: Callable[[int], bool]) -> List[Interval]:
+        """Части периода, когда на смене нет ни одного сотрудника, отобранного include(ID)"""
+        intervals = (shift_interval(shift) for shift in self.in_period(start, end)
+                     if include(shift["staff_id"]))
+        return merge_gaps(intervals, start, end)
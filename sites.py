@@ -0,0 +1,211 @@
+import json
+import os
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import report_engine
+import reports
+import storage_codecs
+from check_rollups import CheckRollups
+
+# Несколько отделений (площадок): у каждого свой каталог данных с тем же
+# набором файлов, что и у одиночной установки. Окно приложения работает
+# с одним выбранным отделением. Сводные отчеты по сети загружают файлы
+# отделений параллельно (report_engine.map_reduce), а итоги каждого
+# отделения кэшируются по подписи файлов (время изменения и размер):
+# отделение, данные которого не менялись, повторно не разбирается.
+
+SITES_FILE = "sites.json"
+SUMMARY_CACHE_FILE = "site_summaries.json"
+
+DEFAULT_SITE = {"name": "Основное отделение", "data_dir": "."}
+
+# Файлы и каталоги данных отделения
+SITE_FILES = {
+    "bodies": "bodies.json",
+    "storage": "storage.json",
+    "sanitary": "sanitary.json",
+    "sanitary_daily": "sanitary_daily.json",
+    "staff": "staff.json",
+    "shifts": "shifts.json",
+    "funeral_services": "funeral_services.json",
+    "check_schedule": "check_schedule.json",
+    "telemetry": "telemetry",
+    "archive": "archive",
+    "changes": "changes.jsonl",
+    "replication": "replication.json",
+    "replication_state": "replication_state.json",
+    "ui_stalls": "ui_stalls.jsonl",
+}
+
+# Файлы, от которых зависят итоги отделения
+SUMMARY_SOURCES = ("bodies", "sanitary", "sanitary_daily")
+
+def site_path(data_dir: str, name: str) -> str:
+    """Путь файла данных отделения"""
+    return os.path.join(data_dir, SITE_FILES[name])
+
+def file_signature(data_dir: str) -> Tuple:
+    """Подпись файлов итогов отделения: 'время изменения:размер' каждого файла"""
+    signature = []
+    for name in SUMMARY_SOURCES:
+        try:
+            stat = os.stat(site_path(data_dir, name))
+            signature.append(f"{stat.st_mtime_ns}:{stat.st_size}")
+        except OSError:
+            signature.append("")
+    return tuple(signature)
+
+class SiteRegistry:
+    """Список отделений и выбранное отделение"""
+    
+    def __init__(self, data_file: str = SITES_FILE):
+        self.data_file = data_file
+        data = self.load_data()
+        self.sites: List[Dict] = data.get("sites") or [dict(DEFAULT_SITE)]
+        self.current: str = data.get("current") or self.sites[0]["name"]
+        if self.get(self.current) is None:
+            self.current = self.sites[0]["name"]
+    
+    def load_data(self) -> Dict:
+        if os.path.exists(self.data_file):
+            with open(self.data_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+    
+    def save_data(self):
+        with open(self.data_file, 'w', encoding='utf-8') as f:
+            json.dump({"current": self.current, "sites": self.sites}, f, ensure_ascii=False, indent=2)
+    
+    def get(self, name: str) -> Optional[Dict]:
+        """Отделение по названию"""
+        for site in self.sites:
+            if site["name"] == name:
+                return site
+        return None
+    
+    def current_site(self) -> Dict:
+        return self.get(self.current)
+    
+    def names(self) -> List[str]:
+        return [site["name"] for site in self.sites]
+    
+    def add_site(self, name: str, data_dir: str) -> Dict:
+        """Добавление отделения (каталог данных создается при необходимости)"""
+        name = name.strip()
+        if not name:
+            raise ValueError("Не указано название отделения")
+        if self.get(name) is not None:
+            raise ValueError(f"Отделение «{name}» уже есть")
+        os.makedirs(data_dir, exist_ok=True)
+        site = {"name": name, "data_dir": data_dir}
+        self.sites.append(site)
+        self.save_data()
+        return site
+    
+    def select(self, name: str):
+        """Выбор текущего отделения"""
+        if self.get(name) is None:
+            raise ValueError(f"Неизвестное отделение: {name}")
+        self.current = name
+        self.save_data()
+
+def site_summary(data_dir: str, day: str) -> Dict:
+    """Map: итоги отделения за день (выполняется в процессе пула)"""
+    bodies = storage_codecs.load_file(site_path(data_dir, "bodies"), [])
+    checks = storage_codecs.load_file(site_path(data_dir, "sanitary"), [])
+    history = CheckRollups(storage_codecs.load_file(site_path(data_dir, "sanitary_daily"), []))
+    
+    statuses = Counter()
+    arrived = 0
+    released = 0
+    for body in bodies:
+        statuses[body["status"]] += 1
+        if (body.get("arrival_date") or "")[:10] == day:
+            arrived += 1
+        if (body.get("release_date") or "")[:10] == day:
+            released += 1
+    
+    day_checks = 0
+    violations = 0
+    for check in checks:
+        if check["date"][:10] == day:
+            day_checks += 1
+            violations += len(check.get("violations", []))
+    # День может оказаться в сжатой истории проверок
+    day_history = history.totals(day, day)
+    
+    return {
+        "bodies": len(bodies),
+        "in_storage": len(bodies) - statuses.get("выдано", 0),
+        "statuses": dict(statuses),
+        "arrived": arrived,
+        "released": released,
+        "checks": day_checks + day_history["checks"],
+        "violations": violations + day_history["violations"],
+    }
+
+class SiteSummaryCache:
+    """Итоги отделений по подписи файлов (хранятся между запусками)"""
+    
+    def __init__(self, data_file: str = SUMMARY_CACHE_FILE):
+        self.data_file = data_file
+        self.lock = threading.Lock()
+        # Каталог данных -> {"day", "signature", "summary"}
+        self.entries: Dict[str, Dict] = self.load_data()
+    
+    def load_data(self) -> Dict[str, Dict]:
+        if os.path.exists(self.data_file):
+            with open(self.data_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+    
+    def save_data(self):
+        with self.lock:
+            with open(self.data_file, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=2)
+    
+    def get(self, data_dir: str, day: str, signature: Tuple) -> Optional[Dict]:
+        """Итоги, если файлы отделения не менялись"""
+        key = os.path.abspath(data_dir)
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is None or entry["day"] != day or entry["signature"] != list(signature):
+            return None
+        return entry["summary"]
+    
+    def put(self, data_dir: str, day: str, signature: Tuple, summary: Dict):
+        with self.lock:
+            self.entries[os.path.abspath(data_dir)] = {"day": day, "signature": list(signature),
+                                                       "summary": summary}
+
+def collect_summaries(sites: List[Dict], day: str, cache: SiteSummaryCache,
+                      parallel: bool = None) -> List[Tuple[str, Dict]]:
+    """Итоги всех отделений: из кэша или параллельной загрузкой файлов"""
+    signatures = {site["name"]: file_signature(site["data_dir"]) for site in sites}
+    summaries = {}
+    pending = []
+    for site in sites:
+        summary = cache.get(site["data_dir"], day, signatures[site["name"]])
+        if summary is None:
+            pending.append(site)
+        else:
+            summaries[site["name"]] = summary
+    
+    if pending:
+        if parallel is None:
+            parallel = len(pending) > 1 and (os.cpu_count() or 1) > 1
+        computed = report_engine.map_reduce(
+            site_summary, [(site["data_dir"], day) for site in pending], list, parallel
+        )
+        for site, summary in zip(pending, computed):
+            cache.put(site["data_dir"], day, signatures[site["name"]], summary)
+            summaries[site["name"]] = summary
+        cache.save_data()
+    
+    return [(site["name"], summaries[site["name"]]) for site in sites]
+
+def network_daily_report(sites: List[Dict], day: str, cache: SiteSummaryCache) -> str:
+    """Построение сводного отчета по отделениям за день (в пуле потоков отчетов)"""
+    return reports.network_daily_report(day, collect_summaries(sites, day, cache))
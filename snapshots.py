@@ -0,0 +1,71 @@
+from typing import Dict, Iterator, List
+
+# Неизменяемые снимки данных менеджеров для фоновых отчетов.
+# Список записей делится на блоки по SNAPSHOT_CHUNK_SIZE; снимок - кортеж
+# блоков-кортежей. Новый снимок пересобирает только блоки, в которых были
+# изменения, а остальные разделяет с предыдущим снимком. Для этого менеджеры
+# не меняют записи на месте, а заменяют их измененными копиями
+# (копирование при записи) и отмечают позицию через mark_dirty.
+
+SNAPSHOT_CHUNK_SIZE = 1024
+
+class Snapshot:
+    """Согласованный неизменяемый снимок записей на момент версии version"""
+    
+    def __init__(self, version: int, chunks: tuple, length: int, chunk_size: int):
+        self.version = version
+        self.chunks = chunks
+        self.length = length
+        self.chunk_size = chunk_size
+    
+    def __len__(self):
+        return self.length
+    
+    def __getitem__(self, index: int) -> Dict:
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError(index)
+        return self.chunks[index // self.chunk_size][index % self.chunk_size]
+    
+    def __iter__(self) -> Iterator[Dict]:
+        for chunk in self.chunks:
+            yield from chunk
+
+class SnapshotStore:
+    """Построитель снимков с разделением неизмененных блоков"""
+    
+    def __init__(self, chunk_size: int = SNAPSHOT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.chunks: List[tuple] = []
+        self.dirty = set()
+        self.current = None
+    
+    def mark_dirty(self, position: int):
+        """Отметка измененной или добавленной записи"""
+        self.dirty.add(position // self.chunk_size)
+    
+    def reset(self):
+        """Сброс после замены списка записей целиком"""
+        self.chunks = []
+        self.dirty.clear()
+        self.current = None
+    
+    def snapshot(self, records: List[Dict], version: int) -> Snapshot:
+        """Снимок текущего списка записей (вызывается в потоке интерфейса)"""
+        if self.current is not None and self.current.version == version and not self.dirty:
+            return self.current
+        
+        size = self.chunk_size
+        chunk_count = (len(records) + size - 1) // size
+        del self.chunks[chunk_count:]
+        for index in self.dirty:
+            if index < len(self.chunks):
+                self.chunks[index] = tuple(records[index * size:(index + 1) * size])
+        while len(self.chunks) < chunk_count:
+            index = len(self.chunks)
+            self.chunks.append(tuple(records[index * size:(index + 1) * size]))
+        self.dirty.clear()
+        
+        self.current = Snapshot(version, tuple(self.chunks), len(records), size)
+        return self.current
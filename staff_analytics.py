@@ -0,0 +1,107 @@
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+# Аналитика по работе сотрудников. Итоги по каждому сотруднику
+# пересчитываются один раз при загрузке, а затем обновляются
+# инкрементально по событиям менеджеров данных, поэтому отчет
+# не зависит от размера истории проверок и операций с телами.
+
+class EmployeeRollup:
+    """Накопленные показатели одного сотрудника"""
+    
+    def __init__(self):
+        self.checks = 0
+        self.violations = 0
+        self.cleanliness_sum = 0
+        self.cleanliness_count = 0
+        self.body_operations = 0
+        self.bodies_by_period = Counter()
+    
+    @property
+    def average_cleanliness(self) -> Optional[float]:
+        if not self.cleanliness_count:
+            return None
+        return self.cleanliness_sum / self.cleanliness_count
+
+class StaffAnalytics:
+    """Инкрементальные итоги по сотрудникам"""
+    
+    def __init__(self):
+        self.rollups: Dict[int, EmployeeRollup] = {}
+        # Проверки, выполненные без привязки к сотруднику
+        self.unassigned = EmployeeRollup()
+    
+    def rollup(self, staff_id: Optional[int]) -> EmployeeRollup:
+        """Итоги сотрудника (создаются при первом обращении)"""
+        if staff_id is None:
+            return self.unassigned
+        if staff_id not in self.rollups:
+            self.rollups[staff_id] = EmployeeRollup()
+        return self.rollups[staff_id]
+    
+    def rebuild(self, checks: Iterable[Dict], bodies: Iterable[Dict], check_rollups: Iterable[Dict] = ()):
+        """Полный пересчет итогов при загрузке данных (с учетом сжатой истории)"""
+        self.rollups = {}
+        self.unassigned = EmployeeRollup()
+        for daily in check_rollups:
+            for entry in daily["inspectors"]:
+                rollup = self.rollup(entry["inspector_id"])
+                rollup.checks += entry["checks"]
+                rollup.cleanliness_sum += entry["cleanliness_sum"]
+                rollup.cleanliness_count += entry["cleanliness_count"]
+                rollup.violations += entry["violations"]
+        for check in checks:
+            self.add_check(check)
+            self.add_violations(check, len(check.get("violations", [])))
+        for body in bodies:
+            for operation in body.get("history", []):
+                self.add_body_operation(operation)
+    
+    def add_check(self, check: Dict):
+        """Учет новой проверки"""
+        rollup = self.rollup(check.get("inspector_id"))
+        rollup.checks += 1
+        if check.get("cleanliness_score") is not None:
+            rollup.cleanliness_sum += check["cleanliness_score"]
+            rollup.cleanliness_count += 1
+    
+    def add_violations(self, check: Dict, count: int = 1):
+        """Учет нарушений, выявленных проверкой"""
+        self.rollup(check.get("inspector_id")).violations += count
+    
+    def add_body_operation(self, operation: Dict):
+        """Учет операции с телом (регистрация, смена статуса)"""
+        if operation.get("staff_id") is None:
+            return
+        rollup = self.rollup(operation["staff_id"])
+        rollup.body_operations += 1
+        rollup.bodies_by_period[operation["date"][:7]] += 1
+    
+    def on_sanitary_event(self, event: str, check: Dict):
+        """Обработчик событий санитарного контроля"""
+        if event == "check_recorded":
+            self.add_check(check)
+        elif event == "violation_added":
+            self.add_violations(check)
+    
+    def on_body_event(self, event: str, body: Dict):
+        """Обработчик событий учета тел (последняя запись истории - новая)"""
+        if event in ("body_registered", "body_updated") and body.get("history"):
+            self.add_body_operation(body["history"][-1])
+    
+    def report_rows(self, staff: List[Dict], period: str = None) -> List[Dict]:
+        """Строки отчета по сотрудникам (period - месяц ГГГГ-ММ)"""
+        rows = []
+        for employee in staff:
+            rollup = self.rollups.get(employee["id"], EmployeeRollup())
+            rows.append({
+                "id": employee["id"],
+                "full_name": employee["full_name"],
+                "position": employee["position"],
+                "checks": rollup.checks,
+                "violations": rollup.violations,
+                "average_cleanliness": rollup.average_cleanliness,
+                "body_operations": rollup.body_operations,
+                "period_operations": rollup.bodies_by_period.get(period, 0) if period else None
+            })
+        return rows
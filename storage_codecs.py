@@ -0,0 +1,207 @@
+import json
+import os
+import struct
+import tempfile
+from typing import Any, Dict
+
+# Форматы хранения файлов данных менеджеров.
+#   json         - JSON с отступами (прежний формат, удобен для просмотра);
+#   json-compact - JSON без отступов; если установлен orjson - через него;
+#   msgpack      - двоичный MessagePack; доступен только с пакетом msgpack.
+#                  Встроенный разбор на Python в разы медленнее JSON, поэтому
+#                  без пакета msgpack только читает уже записанные файлы.
+# Формат файла при загрузке определяется по содержимому, поэтому смена
+# формата не требует преобразования: файл перезапишется при сохранении.
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+DEFAULT_CODEC = "json"
+
+class PrettyJsonCodec:
+    """JSON с отступами"""
+    
+    name = "json"
+    
+    def encode(self, data: Any) -> bytes:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+    
+    def decode(self, raw: bytes) -> Any:
+        return json.loads(raw.decode('utf-8'))
+
+class CompactJsonCodec:
+    """JSON без пробелов (orjson, если установлен)"""
+    
+    name = "json-compact"
+    
+    def encode(self, data: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(data)
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    
+    def decode(self, raw: bytes) -> Any:
+        if orjson is not None:
+            return orjson.loads(raw)
+        return json.loads(raw.decode('utf-8'))
+
+class MsgpackCodec:
+    """Двоичный MessagePack (без пакета msgpack - только чтение)"""
+    
+    name = "msgpack"
+    
+    def encode(self, data: Any) -> bytes:
+        if msgpack is None:
+            raise ValueError(MSGPACK_MISSING)
+        return msgpack.packb(data, use_bin_type=True)
+    
+    def decode(self, raw: bytes) -> Any:
+        if msgpack is not None:
+            return msgpack.unpackb(raw, raw=False, strict_map_key=False)
+        value, offset = _unpack(memoryview(raw), 0)
+        if offset != len(raw):
+            raise ValueError("Лишние данные после MessagePack")
+        return value
+
+MSGPACK_MISSING = "Формат msgpack требует пакет msgpack: pip install msgpack"
+
+# Форматы, доступные для сохранения
+CODECS: Dict[str, Any] = {
+    codec.name: codec for codec in (PrettyJsonCodec(), CompactJsonCodec())
+}
+if msgpack is not None:
+    CODECS["msgpack"] = MsgpackCodec()
+
+def get_codec(name: str):
+    """Кодек по имени"""
+    try:
+        return CODECS[name]
+    except KeyError:
+        if name == MsgpackCodec.name:
+            raise ValueError(MSGPACK_MISSING)
+        raise ValueError(f"Неизвестный формат хранения: {name}")
+
+def detect_codec(raw: bytes):
+    """Определение формата по первому значащему байту
+    
+    Файлы данных - списки или словари: JSON начинается с '[' или '{'
+    (возможно, после пробелов), MessagePack - с байта массива или словаря.
+    """
+    if raw.lstrip()[:1] in (b'[', b'{'):
+        return CODECS["json-compact"]
+    return CODECS.get("msgpack") or MsgpackCodec()
+
+def load_file(path: str, default: Any = None) -> Any:
+    """Загрузка файла данных в любом поддерживаемом формате"""
+    if not os.path.exists(path):
+        return default
+    with open(path, 'rb') as f:
+        raw = f.read()
+    # Файлы, сохраненные в Блокноте Windows, могут начинаться с BOM
+    if raw.startswith(b'\xef\xbb\xbf'):
+        raw = raw[3:]
+    if not raw.strip():
+        return default
+    return detect_codec(raw).decode(raw)
+
+# Маска прав процесса (читается при импорте: os.umask меняет ее для всех потоков)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def save_file(path: str, data: Any, codec_name: str = DEFAULT_CODEC):
+    """Сохранение через временный файл: прерванная запись не портит данные
+    
+    mkstemp создает файл с правами 0600, поэтому временному файлу задаются
+    права заменяемого файла (для нового - обычные права с учетом umask).
+    """
+    raw = get_codec(codec_name).encode(data)
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(raw)
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+# Встроенный разбор MessagePack (подмножество типов JSON и bytes)
+
+# Форматы чисел фиксированной длины: байт типа -> (struct-формат, размер)
+_FIXED = {
+    0xca: ('>f', 4), 0xcb: ('>d', 8),
+    0xcc: ('>B', 1), 0xcd: ('>H', 2), 0xce: ('>I', 4), 0xcf: ('>Q', 8),
+    0xd0: ('>b', 1), 0xd1: ('>h', 2), 0xd2: ('>i', 4), 0xd3: ('>q', 8),
+}
+# Длины строк, двоичных данных, массивов и словарей: байт типа -> (формат, размер)
+_LENGTHS = {
+    0xd9: ('>B', 1), 0xda: ('>H', 2), 0xdb: ('>I', 4),
+    0xc4: ('>B', 1), 0xc5: ('>H', 2), 0xc6: ('>I', 4),
+    0xdc: ('>H', 2), 0xdd: ('>I', 4),
+    0xde: ('>H', 2), 0xdf: ('>I', 4),
+}
+
+def _unpack(data: memoryview, offset: int):
+    """Разбор одного значения: (значение, смещение следующего)"""
+    code = data[offset]
+    offset += 1
+    
+    if code < 0x80:
+        return code, offset
+    if code >= 0xe0:
+        return code - 0x100, offset
+    if 0xa0 <= code <= 0xbf:
+        size = code & 0x1f
+        return str(data[offset:offset + size], 'utf-8'), offset + size
+    if 0x90 <= code <= 0x9f:
+        return _unpack_array(data, offset, code & 0x0f)
+    if 0x80 <= code <= 0x8f:
+        return _unpack_map(data, offset, code & 0x0f)
+    if code == 0xc0:
+        return None, offset
+    if code == 0xc2:
+        return False, offset
+    if code == 0xc3:
+        return True, offset
+    if code in _FIXED:
+        fmt, size = _FIXED[code]
+        return struct.unpack_from(fmt, data, offset)[0], offset + size
+    if code in _LENGTHS:
+        fmt, size = _LENGTHS[code]
+        length = struct.unpack_from(fmt, data, offset)[0]
+        offset += size
+        if code in (0xd9, 0xda, 0xdb):
+            return str(data[offset:offset + length], 'utf-8'), offset + length
+        if code in (0xc4, 0xc5, 0xc6):
+            return bytes(data[offset:offset + length]), offset + length
+        if code in (0xdc, 0xdd):
+            return _unpack_array(data, offset, length)
+        return _unpack_map(data, offset, length)
+    raise ValueError(f"Неподдерживаемый тип MessagePack: 0x{code:02x}")
+
+def _unpack_array(data: memoryview, offset: int, size: int):
+    items = []
+    for _ in range(size):
+        item, offset = _unpack(data, offset)
+        items.append(item)
+    return items, offset
+
+def _unpack_map(data: memoryview, offset: int, size: int):
+    result = {}
+    for _ in range(size):
+        key, offset = _unpack(data, offset)
+        value, offset = _unpack(data, offset)
+        result[key] = value
+    return result, offset
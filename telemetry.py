@@ -0,0 +1,278 @@
+import asyncio
+import bisect
+import heapq
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Прием показаний датчиков температуры холодильных камер.
+# Показания принимаются по UDP (одна датаграмма - одно показание) и по TCP
+# (одно показание на строку) в формате JSON:
+#   {"chamber": "Холодильная камера 1", "temperature": 4.2, "ts": 1700000000.0}
+# Показания накапливаются и записываются пакетами в двоичный файл камеры
+# из записей фиксированной длины, который читается через mmap.
+# Записи файла упорядочены по времени; опоздавшие показания сохраняют
+# свое время и вливаются в хвост файла. Показания камер, которых нет в
+# конфигурации отделения, отклоняются.
+
+# Запись: время в миллисекундах (int64) и температура (float32)
+RECORD = struct.Struct('<qf')
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 9500
+# Допустимый диапазон температуры в камерах, °C
+DEFAULT_LIMITS = (0.0, 8.0)
+
+def chamber_file_name(chamber: str) -> str:
+    """Имя файла показаний камеры"""
+    return re.sub(r'\W+', '_', chamber).strip('_') + '.bin'
+
+class TelemetryStore:
+    """Хранилище показаний: файл записей фиксированной длины на камеру"""
+    
+    def __init__(self, root: str = "telemetry"):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+        self.lock = threading.Lock()
+        # Время последней записи по камерам для сохранения порядка в файле
+        self.last_written: Dict[str, int] = {}
+    
+    def path(self, chamber: str) -> str:
+        return os.path.join(self.root, chamber_file_name(chamber))
+    
+    def append_batch(self, chamber: str, readings: List[Tuple[int, float]]):
+        """Запись пакета показаний
+        
+        Пакет не раньше последней записи дописывается одним вызовом write.
+        Если в пакете есть опоздавшие показания, хвост файла с момента самого
+        раннего из них перезаписывается слиянием с пакетом: показания
+        сохраняют свое время, файл остается упорядоченным для бинарного поиска.
+        """
+        if not readings:
+            return
+        readings = sorted(readings)
+        with self.lock:
+            if chamber not in self.last_written:
+                latest = self.latest(chamber)
+                self.last_written[chamber] = latest[0] if latest else 0
+            
+            last = self.last_written[chamber]
+            if readings[0][0] < last:
+                self._merge_tail(chamber, readings)
+            else:
+                with open(self.path(chamber), 'ab') as f:
+                    f.write(b''.join(RECORD.pack(ts, temperature) for ts, temperature in readings))
+            self.last_written[chamber] = max(last, readings[-1][0])
+    
+    def _merge_tail(self, chamber: str, readings: List[Tuple[int, float]]):
+        """Слияние упорядоченного пакета с записями файла не раньше его начала"""
+        count = self.count(chamber)
+        with open(self.path(chamber), 'r+b') as f:
+            with mmap.mmap(f.fileno(), count * RECORD.size, access=mmap.ACCESS_READ) as mapped:
+                start = bisect.bisect_right(_TimestampView(mapped, count), readings[0][0])
+                tail = [RECORD.unpack_from(mapped, index * RECORD.size) for index in range(start, count)]
+            merged = heapq.merge(tail, readings, key=lambda reading: reading[0])
+            f.seek(start * RECORD.size)
+            f.write(b''.join(RECORD.pack(ts, temperature) for ts, temperature in merged))
+    
+    def count(self, chamber: str) -> int:
+        """Число записей в файле камеры"""
+        path = self.path(chamber)
+        if not os.path.exists(path):
+            return 0
+        return os.path.getsize(path) // RECORD.size
+    
+    def read_range(self, chamber: str, start_ms: int, end_ms: int) -> List[Tuple[int, float]]:
+        """Показания за полуинтервал [start_ms, end_ms)"""
+        # Под блокировкой: слияние опоздавших показаний перезаписывает хвост файла
+        with self.lock:
+            return self._read_range(chamber, start_ms, end_ms)
+    
+    def _read_range(self, chamber: str, start_ms: int, end_ms: int) -> List[Tuple[int, float]]:
+        count = self.count(chamber)
+        if count == 0:
+            return []
+        
+        with open(self.path(chamber), 'rb') as f:
+            with mmap.mmap(f.fileno(), count * RECORD.size, access=mmap.ACCESS_READ) as mapped:
+                # Бинарный поиск по времени прямо в отображенном файле:
+                # записи дописываются в хронологическом порядке
+                keys = _TimestampView(mapped, count)
+                low = bisect.bisect_left(keys, start_ms)
+                high = bisect.bisect_left(keys, end_ms)
+                return [RECORD.unpack_from(mapped, index * RECORD.size) for index in range(low, high)]
+    
+    def latest(self, chamber: str) -> Optional[Tuple[int, float]]:
+        """Последнее показание камеры"""
+        count = self.count(chamber)
+        if count == 0:
+            return None
+        with open(self.path(chamber), 'rb') as f:
+            f.seek((count - 1) * RECORD.size)
+            return RECORD.unpack(f.read(RECORD.size))
+
+class _TimestampView:
+    """Последовательность времен записей поверх mmap (для bisect)"""
+    
+    def __init__(self, mapped: mmap.mmap, count: int):
+        self.mapped = mapped
+        self.count = count
+    
+    def __len__(self):
+        return self.count
+    
+    def __getitem__(self, index: int) -> int:
+        return RECORD.unpack_from(self.mapped, index * RECORD.size)[0]
+
+def parse_reading(payload: bytes) -> Optional[Tuple[str, int, float]]:
+    """Разбор показания: (камера, время в мс, температура)"""
+    try:
+        data = json.loads(payload.decode('utf-8'))
+        chamber = str(data["chamber"])
+        temperature = float(data["temperature"])
+        ts = float(data.get("ts") or time.time())
+    except (ValueError, KeyError, TypeError, UnicodeDecodeError):
+        return None
+    return chamber, int(ts * 1000), temperature
+
+class _UdpProtocol(asyncio.DatagramProtocol):
+    def __init__(self, service: 'TelemetryIngestService'):
+        self.service = service
+    
+    def datagram_received(self, data, addr):
+        self.service.submit(data)
+
+class TelemetryIngestService:
+    """Фоновый сервис приема показаний с пакетной записью"""
+    
+    def __init__(self,
+                 store: TelemetryStore,
+                 host: str = DEFAULT_HOST,
+                 port: int = DEFAULT_PORT,
+                 limits: Tuple[float, float] = DEFAULT_LIMITS,
+                 on_alert: Callable[[str, float, int], None] = None,
+                 chambers: Iterable[str] = None,
+                 batch_size: int = 256,
+                 flush_interval: float = 1.0):
+        self.store = store
+        self.host = host
+        self.port = port
+        self.limits = limits
+        self.on_alert = on_alert
+        # Допустимые названия камер (None - любые): название из показания
+        # становится именем файла, поэтому чужие названия отклоняются
+        self.chambers = set(chambers) if chambers is not None else None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        
+        self.buffer: List[Tuple[str, int, float]] = []
+        # Камеры, температура в которых сейчас вне диапазона: оповещение
+        # отправляется один раз на выход за диапазон, а не на каждое показание
+        self.out_of_range = set()
+        self.received = 0
+        self.rejected = 0
+        
+        self.loop = None
+        self.thread = None
+        self.ready = threading.Event()
+        self.error = None
+        self.stop_event = None
+    
+    def start(self):
+        """Запуск приема в отдельном потоке"""
+        self.thread = threading.Thread(target=self._run, name='telemetry', daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        if self.error:
+            raise self.error
+    
+    def stop(self):
+        """Остановка приема с записью накопленных показаний"""
+        if self.loop is not None and self.stop_event is not None:
+            self.loop.call_soon_threadsafe(self.stop_event.set)
+        if self.thread is not None:
+            self.thread.join()
+    
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._serve())
+        except OSError as e:
+            self.error = e
+            self.ready.set()
+        finally:
+            self.loop.close()
+    
+    async def _serve(self):
+        self.stop_event = asyncio.Event()
+        transport, _ = await self.loop.create_datagram_endpoint(
+            lambda: _UdpProtocol(self), local_addr=(self.host, self.port)
+        )
+        try:
+            server = await asyncio.start_server(self._handle_tcp, self.host, self.port)
+        except OSError:
+            transport.close()
+            raise
+        self.ready.set()
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    await asyncio.wait_for(self.stop_event.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self.flush()
+        finally:
+            transport.close()
+            server.close()
+            await server.wait_closed()
+            self.flush()
+    
+    async def _handle_tcp(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.submit(line)
+        finally:
+            writer.close()
+    
+    def submit(self, payload: bytes):
+        """Прием одного показания (вызывается в потоке сервиса)"""
+        reading = parse_reading(payload)
+        if reading is None or (self.chambers is not None and reading[0] not in self.chambers):
+            self.rejected += 1
+            return
+        self.received += 1
+        self.buffer.append(reading)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+    
+    def flush(self):
+        """Запись накопленного пакета и проверка диапазона температур"""
+        if not self.buffer:
+            return
+        batch, self.buffer = self.buffer, []
+        
+        by_chamber: Dict[str, List[Tuple[int, float]]] = {}
+        for chamber, ts, temperature in batch:
+            by_chamber.setdefault(chamber, []).append((ts, temperature))
+        
+        low, high = self.limits
+        for chamber, readings in by_chamber.items():
+            readings.sort()
+            self.store.append_batch(chamber, readings)
+            
+            for ts, temperature in readings:
+                if low <= temperature <= high:
+                    self.out_of_range.discard(chamber)
+                elif chamber not in self.out_of_range:
+                    self.out_of_range.add(chamber)
+                    if self.on_alert:
+                        self.on_alert(chamber, temperature, ts)
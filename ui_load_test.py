@@ -0,0 +1,268 @@
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+# Без экрана: платформа Qt задается до импорта PyQt5
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication, QDialog, QMessageBox
+
+import benchmark_codecs
+import kp_pi
+import storage_codecs
+import ui_watchdog
+from registry_stats import percentile
+
+# Нагрузочный тест интерфейса на синтетических данных (Qt offscreen).
+# Несколько операторов по очереди, вперемешку и с паузами "на раздумье",
+# регистрируют тела, меняют статусы и заказывают отчеты через те же
+# обработчики, что и кнопки окна. Модальные окна не показываются:
+# диалоги собираются, заполняются и сохраняются сценарием. Время каждого
+# действия в потоке интерфейса и опоздания пульса цикла событий
+# (ui_watchdog) сводятся в p50/p99.
+# Пример: python ui_load_test.py --bodies 50000 --checks 20000 --operators 4 --actions 100
+
+STAFF_POSITIONS = ['Патологоанатом', 'Санитар', 'Администратор']
+CHECK_TYPES = ['Температурный режим', 'Чистота помещений', 'Дезинфекция']
+ACTION_WEIGHTS = {'register': 4, 'edit': 4, 'report': 2}
+REPORTS = ('generate_bodies_report', 'generate_sanitary_report', 'show_statistics',
+           'generate_daily_report', 'generate_storage_report', 'generate_staff_report')
+
+def make_checks(count: int, staff):
+    """Синтетические проверки в формате SanitaryControl за последние полгода"""
+    start = datetime.datetime.now() - datetime.timedelta(days=180)
+    step = datetime.timedelta(days=180) / max(count, 1)
+    checks = []
+    for check_id in range(1, count + 1):
+        inspector = random.choice(staff)
+        checks.append({
+            "id": check_id,
+            "date": (start + step * check_id).strftime("%Y-%m-%d %H:%M"),
+            "check_type": random.choice(CHECK_TYPES),
+            "temperature": round(random.uniform(1.5, 5.5), 1),
+            "cleanliness_score": random.randint(3, 5),
+            "inspector": inspector["full_name"],
+            "inspector_id": inspector["id"],
+            "chamber": random.choice(benchmark_codecs.CHAMBERS),
+            "notes": "",
+            "violations": []
+        })
+    return checks
+
+def make_staff(count: int):
+    return [{
+        "id": employee_id,
+        "full_name": f"{random.choice(benchmark_codecs.SURNAMES)} {random.choice(benchmark_codecs.NAMES)}",
+        "position": STAFF_POSITIONS[employee_id % len(STAFF_POSITIONS)],
+        "contact": f"+7-900-000-{employee_id:04d}",
+        "qualifications": [],
+        "hire_date": "2020-01-01",
+        "status": "активен"
+    } for employee_id in range(1, count + 1)]
+
+def make_coordinations(bodies, count: int):
+    today = datetime.date.today()
+    coordinations = []
+    for coordination_id, body in enumerate(random.sample(bodies, min(count, len(bodies))), 1):
+        coordinations.append({
+            "id": coordination_id,
+            "body_id": body["id"],
+            "service_name": "Ритуальная служба",
+            "contact_person": "Контактное лицо",
+            "contact_phone": "+7-900-111-22-33",
+            "planned_date": (today + datetime.timedelta(days=random.randint(-30, 14))).strftime("%Y-%m-%d"),
+            "documents_needed": ["Свидетельство о смерти", "Паспорт"],
+            "documents_provided": random.choice([[], ["Паспорт"]]),
+            "coordination_date": today.strftime("%Y-%m-%d"),
+            "status": "в процессе"
+        })
+    return coordinations
+
+def write_data(directory: str, args):
+    """Файлы данных отделения в каталоге теста"""
+    random.seed(args.seed)
+    bodies = benchmark_codecs.make_bodies(args.bodies)
+    staff = make_staff(args.staff)
+    # В камерах хватает места для всех невыданных и регистрируемых в тесте тел
+    capacity = args.bodies + args.operators * args.actions
+    chambers = [{"name": name, "capacity": capacity} for name in benchmark_codecs.CHAMBERS]
+    with open(os.path.join(directory, 'storage.json'), 'w', encoding='utf-8') as f:
+        json.dump(chambers, f, ensure_ascii=False)
+    storage_codecs.save_file(os.path.join(directory, 'bodies.json'), bodies)
+    storage_codecs.save_file(os.path.join(directory, 'staff.json'), staff)
+    storage_codecs.save_file(os.path.join(directory, 'sanitary.json'), make_checks(args.checks, staff))
+    storage_codecs.save_file(os.path.join(directory, 'funeral_services.json'),
+                             make_coordinations(bodies, args.coordinations))
+
+class Operator:
+    """Оператор: последовательность действий с паузами между ними"""
+    
+    def __init__(self, name: str, test: 'LoadTest', actions: int):
+        self.name = name
+        self.test = test
+        self.remaining = actions
+        self.rng = random.Random(f"{test.args.seed}-{name}")
+    
+    def schedule(self):
+        QTimer.singleShot(self.rng.randint(*self.test.args.think_ms), self.act)
+    
+    def act(self):
+        if self.remaining == 0:
+            self.test.operator_done()
+            return
+        self.remaining -= 1
+        action = self.rng.choices(list(ACTION_WEIGHTS), weights=list(ACTION_WEIGHTS.values()))[0]
+        started = time.perf_counter()
+        getattr(self.test, action)(self.rng)
+        self.test.durations.setdefault(action, []).append((time.perf_counter() - started) * 1000)
+        self.schedule()
+
+class LoadTest:
+    """Сценарий операторов против окна приложения"""
+    
+    def __init__(self, app: QApplication, window, args):
+        self.app = app
+        self.window = window
+        self.args = args
+        self.durations = {}
+        self.active = 0
+        self.rejected = Counter()
+        # Диалоги, "открытые" обработчиками (exec_ заменен на запоминание)
+        self.dialogs = []
+    
+    def run(self):
+        QDialog.exec_ = lambda dialog: self.dialogs.append(dialog) or QDialog.Rejected
+        QMessageBox.information = staticmethod(lambda *args, **kwargs: QMessageBox.Ok)
+        QMessageBox.warning = staticmethod(self.on_warning)
+        QMessageBox.question = staticmethod(lambda *args, **kwargs: QMessageBox.Yes)
+        
+        operators = [Operator(f"оператор {number}", self, self.args.actions)
+                     for number in range(1, self.args.operators + 1)]
+        self.active = len(operators)
+        self.window.latency_monitor.reset()
+        for operator in operators:
+            operator.schedule()
+        self.app.exec_()
+    
+    def on_warning(self, parent, title, text, *args, **kwargs):
+        self.rejected[text] += 1
+        return QMessageBox.Ok
+    
+    def operator_done(self):
+        self.active -= 1
+        if self.active == 0:
+            # Дожидаемся отчетов в пуле и последних пульсов
+            self.window.report_pool.waitForDone()
+            QTimer.singleShot(500, self.app.quit)
+    
+    def register(self, rng: random.Random):
+        """Регистрация тела через диалог"""
+        window = self.window
+        window.show_new_body_dialog()
+        dialog = self.dialogs.pop()
+        window.body_name_input.setText(f"{rng.choice(benchmark_codecs.SURNAMES)} "
+                                       f"{rng.choice(benchmark_codecs.NAMES)}")
+        window.body_source_input.setCurrentIndex(rng.randrange(window.body_source_input.count()))
+        window.save_new_body(dialog)
+    
+    def edit(self, rng: random.Random):
+        """Смена статуса тела из таблицы"""
+        window = self.window
+        rows = window.body_table.rowCount()
+        if not rows:
+            return
+        window.body_table.selectRow(rng.randrange(rows))
+        body_id = int(window.body_table.item(window.body_table.currentRow(), 0).text())
+        window.edit_body()
+        dialog = self.dialogs.pop()
+        window.status_combo.setCurrentIndex(rng.randrange(window.status_combo.count()))
+        window.save_body_edit(body_id, dialog)
+    
+    def report(self, rng: random.Random):
+        """Заказ отчета (построение - в пуле потоков)"""
+        getattr(self.window, rng.choice(REPORTS))()
+    
+    def results(self) -> dict:
+        actions = {}
+        for action, values in sorted(self.durations.items()):
+            values = sorted(values)
+            actions[action] = {"count": len(values), "p50_ms": percentile(values, 50),
+                               "p99_ms": percentile(values, 99), "max_ms": values[-1]}
+        monitor = self.window.latency_monitor
+        stacks = Counter(stall["stack"] for stall in monitor.recent_stalls(ui_watchdog.MAX_STALLS)
+                         if stall["stack"])
+        return {
+            "actions": actions,
+            "event_loop": monitor.summary(),
+            "stall_handlers": monitor.stall_handlers(),
+            "stall_stacks": stacks.most_common(),
+            "rejected": dict(self.rejected)
+        }
+
+def print_results(results: dict):
+    print(f"{'Действие':<12}{'Число':>8}{'p50, мс':>10}{'p99, мс':>10}{'Макс, мс':>10}")
+    for action, stats in results["actions"].items():
+        print(f"{action:<12}{stats['count']:>8}{stats['p50_ms']:>10.1f}"
+              f"{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+    loop = results["event_loop"]
+    print(f"\nЦикл событий: замеров {loop['samples']}, задержка p50 {loop['p50_ms']:.1f} мс, "
+          f"p99 {loop['p99_ms']:.1f} мс, макс. {loop['max_ms']:.1f} мс; "
+          f"задержек дольше {loop['threshold_ms']} мс: {loop['stalls']}")
+    for handler, count, duration in results["stall_handlers"][:10]:
+        print(f"  {handler}: {count} раз, всего {duration:.0f} мс")
+    if results["stall_stacks"]:
+        print("Где находился поток интерфейса во время задержек:")
+        for stack, count in results["stall_stacks"][:10]:
+            print(f"  {count:>4}  {stack}")
+    for text, count in results["rejected"].items():
+        print(f"Отклонено ({count}): {text}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Нагрузочный тест интерфейса (Qt offscreen)')
+    parser.add_argument('--bodies', type=int, default=20000, help='Тел в синтетическом реестре')
+    parser.add_argument('--checks', type=int, default=10000, help='Санитарных проверок')
+    parser.add_argument('--staff', type=int, default=30, help='Сотрудников')
+    parser.add_argument('--coordinations', type=int, default=500, help='Координаций')
+    parser.add_argument('--operators', type=int, default=3, help='Число операторов')
+    parser.add_argument('--actions', type=int, default=50, help='Действий каждого оператора')
+    parser.add_argument('--think-ms', type=int, nargs=2, default=(20, 200), metavar=('MIN', 'MAX'),
+                        help='Пауза оператора между действиями, мс')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='Сохранить результаты в JSON-файл')
+    args = parser.parse_args()
+    json_path = os.path.abspath(args.json) if args.json else None
+    
+    app = QApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as directory:
+        write_data(directory, args)
+        # Окно работает с файлами текущего каталога (отделение по умолчанию)
+        previous_dir = os.getcwd()
+        os.chdir(directory)
+        try:
+            started = time.perf_counter()
+            window = kp_pi.MainWindow()
+            window.show()
+            print(f"Тел: {args.bodies}, проверок: {args.checks}; окно открыто за "
+                  f"{time.perf_counter() - started:.2f} с")
+            
+            test = LoadTest(app, window, args)
+            test.run()
+            results = test.results()
+            window.close()
+        finally:
+            os.chdir(previous_dir)
+    
+    print_results(results)
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from registry_stats import percentile
+
+# Контроль отзывчивости интерфейса. Таймер в потоке интерфейса вызывает
+# beat() каждые interval_ms; опоздание очередного вызова - время, на
+# которое цикл событий Qt был занят обработчиком. Отдельный поток следит
+# за пульсом и, если он задерживается дольше порога, снимает стек потока
+# интерфейса (sys._current_frames): так задержка связывается с
+# обработчиком, например "save_new_body → save_data". Задержки сверх
+# порога дописываются строками JSON в журнал ui_stalls.jsonl отделения.
+
+DEFAULT_INTERVAL_MS = 50
+DEFAULT_THRESHOLD_MS = 200
+
+# Хранимые в памяти замеры опоздания пульса и последние задержки
+MAX_SAMPLES = 20000
+MAX_STALLS = 200
+
+# Функции приложения, не являющиеся обработчиками (обертки и точка входа)
+SKIPPED_FUNCTIONS = {"<lambda>", "<module>", "main"}
+
+MODULE_FILE = os.path.abspath(__file__)
+APP_DIR = os.path.dirname(MODULE_FILE)
+
+def app_frames(frame, root: str = APP_DIR) -> List[Tuple[str, str]]:
+    """Функции приложения в стеке (файл, имя) от внешней к текущей"""
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        path = os.path.abspath(code.co_filename)
+        if path.startswith(root) and path != MODULE_FILE and code.co_name not in SKIPPED_FUNCTIONS:
+            frames.append((path, code.co_name))
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+def handler_chain(frames: List[Tuple[str, str]], handler_files: Set[str] = frozenset()) -> Optional[str]:
+    """Цепочка от обработчика события к текущей функции
+    
+    Обработчик - внешняя функция из handler_files (модуль окна); функции,
+    запустившие цикл событий (сценарий теста), в цепочку не входят.
+    """
+    for index, (path, _) in enumerate(frames):
+        if path in handler_files:
+            frames = frames[index:]
+            break
+    if not frames:
+        return None
+    return " → ".join(name for _, name in frames)
+
+class LatencyMonitor:
+    """Опоздания пульса цикла событий и задержки с обработчиками, их вызвавшими"""
+    
+    def __init__(self, interval_ms: int = DEFAULT_INTERVAL_MS, threshold_ms: int = DEFAULT_THRESHOLD_MS,
+                 log_file: str = None, handler_files: Iterable[str] = ()):
+        self.interval_ms = interval_ms
+        self.threshold_ms = threshold_ms
+        self.log_file = log_file
+        self.handler_files = {os.path.abspath(path) for path in handler_files}
+        self.latencies = deque(maxlen=MAX_SAMPLES)
+        self.stalls = deque(maxlen=MAX_STALLS)
+        self.stall_count = 0
+        self.lock = threading.Lock()
+        # Стеки потока интерфейса, снятые во время текущей задержки
+        self.samples = Counter()
+        self.last_beat = None
+        self.gui_thread_id = None
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        """Запуск наблюдения (вызывается из потока интерфейса)"""
+        self.gui_thread_id = threading.get_ident()
+        self.last_beat = time.perf_counter()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.watch, name='ui-watchdog', daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+    
+    def reset(self):
+        """Сброс накопленных замеров (например, перед нагрузочным тестом)"""
+        with self.lock:
+            self.latencies.clear()
+            self.stalls.clear()
+            self.stall_count = 0
+            self.samples.clear()
+            self.last_beat = time.perf_counter()
+    
+    def beat(self):
+        """Пульс из потока интерфейса: учет опоздания с прошлого пульса"""
+        now = time.perf_counter()
+        with self.lock:
+            if self.last_beat is None:
+                self.last_beat = now
+                return
+            elapsed_ms = (now - self.last_beat) * 1000
+            self.last_beat = now
+            latency = max(0.0, elapsed_ms - self.interval_ms)
+            self.latencies.append(latency)
+            samples = self.samples
+            self.samples = Counter()
+        if latency < self.threshold_ms:
+            return
+        
+        # Обработчик - внешняя функция приложения в стеке, стек - чаще всего снятый
+        stack = samples.most_common(1)[0][0] if samples else None
+        stall = {
+            "time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "duration_ms": round(elapsed_ms, 1),
+            "handler": stack.split(" → ")[0] if stack else "неизвестно",
+            "stack": stack
+        }
+        with self.lock:
+            self.stalls.append(stall)
+            self.stall_count += 1
+        if self.log_file:
+            with open(self.log_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(stall, ensure_ascii=False) + '\n')
+    
+    def watch(self):
+        """Поток наблюдения: стек потока интерфейса, пока пульс задерживается"""
+        period = self.interval_ms / 2000
+        while not self.stop_event.wait(period):
+            with self.lock:
+                last_beat = self.last_beat
+            if last_beat is None or (time.perf_counter() - last_beat) * 1000 < self.threshold_ms:
+                continue
+            frame = sys._current_frames().get(self.gui_thread_id)
+            chain = handler_chain(app_frames(frame), self.handler_files)
+            del frame
+            if chain:
+                with self.lock:
+                    self.samples[chain] += 1
+    
+    def summary(self) -> Dict:
+        """Перцентили опоздания пульса и число задержек"""
+        with self.lock:
+            latencies = sorted(self.latencies)
+            stall_count = self.stall_count
+        return {
+            "samples": len(latencies),
+            "p50_ms": percentile(latencies, 50),
+            "p99_ms": percentile(latencies, 99),
+            "max_ms": latencies[-1] if latencies else 0.0,
+            "threshold_ms": self.threshold_ms,
+            "stalls": stall_count
+        }
+    
+    def recent_stalls(self, limit: int = 20) -> List[Dict]:
+        """Последние задержки, новые первыми"""
+        with self.lock:
+            return list(self.stalls)[::-1][:limit]
+    
+    def stall_handlers(self) -> List[tuple]:
+        """Обработчики задержек по убыванию суммарной длительности: (обработчик, число, мс)"""
+        totals = {}
+        with self.lock:
+            for stall in self.stalls:
+                count, duration = totals.get(stall["handler"], (0, 0.0))
+                totals[stall["handler"]] = (count + 1, duration + stall["duration_ms"])
+        return sorted(((handler, count, duration) for handler, (count, duration) in totals.items()),
+                      key=lambda item: -item[2])